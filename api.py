@@ -0,0 +1,216 @@
+"""
+Headless prompt API.
+
+Serves prompt retrieval and rendering over HTTP for production services,
+backed by the process-wide prompt and compiled-template caches. Requests
+are scoped to the tenant in the X-Tenant header (DEFAULT_TENANT when absent).
+
+Run with:
+    uvicorn api:app --host 0.0.0.0 --port 8000 --workers 4
+"""
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Optional
+
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from sqlalchemy import and_, or_
+
+from app.db.session import SessionLocal
+from app.llm.metrics import registry
+from app.models.prompt import Prompt
+from app.models.schemas import PromptSnapshot, content_hash
+from app.services.cache import PartitionedCache
+from app.services.change_feed import ChangeFeed, ChangeSubscriber, invalidate_local_caches
+from app.services.tenants import UnknownTenant, resolve_tenant
+from app.services.template_engine import (
+    PromptRenderService, get_cached_snapshot, render_snapshot, tenant_cache_limits,
+)
+from config.settings import settings
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Follow the change feed so edits made by other processes invalidate our caches
+    subscriber = ChangeSubscriber(ChangeFeed(), invalidate_local_caches,
+                                  interval=settings.CHANGE_FEED_POLL_INTERVAL).start()
+    try:
+        yield
+    finally:
+        subscriber.stop()
+
+
+app = FastAPI(title="Prompt One API", lifespan=lifespan)
+
+# Serialized GET bodies keyed by snapshot ETag, partitioned by tenant like the prompt cache
+_body_cache = PartitionedCache(maxsize=settings.PROMPT_CACHE_SIZE, limits=tenant_cache_limits("prompt"),
+                               max_partitions=settings.MAX_TENANT_PARTITIONS)
+
+
+class RenderRequest(BaseModel):
+    variables: dict[str, Any] = Field(default_factory=dict, description="Template variables")
+    version: Optional[str] = Field(None, description="Pinned version; latest when omitted")
+
+
+class BatchRenderItem(RenderRequest):
+    name: str = Field(..., description="Prompt name")
+
+
+class BatchRenderRequest(BaseModel):
+    items: list[BatchRenderItem] = Field(..., min_length=1, max_length=settings.API_BATCH_LIMIT)
+
+
+def _tenant(x_tenant: str | None) -> str:
+    try:
+        return resolve_tenant(x_tenant)
+    except UnknownTenant as e:
+        raise HTTPException(status_code=403, detail=str(e))
+
+
+def _load_snapshot(name: str, version: str | None, tenant: str) -> PromptSnapshot | None:
+    db = SessionLocal()
+    try:
+        return PromptRenderService(db, tenant).get_snapshot(name, version)
+    finally:
+        db.close()
+
+
+async def _resolve(name: str, version: str | None, tenant: str) -> PromptSnapshot | None:
+    """Cache hit stays on the event loop; only misses go to the DB thread pool."""
+    snapshot = get_cached_snapshot(name, version, tenant)
+    if snapshot is None:
+        snapshot = await run_in_threadpool(_load_snapshot, name, version, tenant)
+    if snapshot is None or not snapshot.is_enabled:
+        return None
+    return snapshot
+
+
+def _render_etag(snapshot: PromptSnapshot, variables: dict[str, Any]) -> str:
+    variables_json = json.dumps(variables, sort_keys=True, separators=(",", ":"), default=str)
+    return f'"{content_hash(snapshot.etag + variables_json)[:32]}"'
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]
+
+
+def _json_response(body: bytes, etag: str) -> Response:
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "no-cache"},
+    )
+
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """LLM call metrics of this process in Prometheus text format"""
+    return PlainTextResponse(registry.to_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+def _list_changed(updated_since: datetime | None, after: tuple[datetime, int] | None, limit: int,
+                  tenant: str) -> list[PromptSnapshot]:
+    db = SessionLocal()
+    try:
+        query = db.query(Prompt).filter(Prompt.tenant == tenant)
+        if updated_since is None:
+            query = query.filter(Prompt.is_enabled == True)
+        else:
+            # Include disabled rows so clients can drop soft-deleted versions
+            query = query.filter(Prompt.updated_at >= updated_since)
+        if after is not None:
+            query = query.filter(or_(Prompt.updated_at > after[0],
+                                     and_(Prompt.updated_at == after[0], Prompt.id > after[1])))
+        rows = query.order_by(Prompt.updated_at, Prompt.id).limit(limit).all()
+        return [PromptSnapshot.from_prompt(p) for p in rows]
+    finally:
+        db.close()
+
+
+@app.get("/prompts")
+async def list_prompts(updated_since: Optional[datetime] = None,
+                       after_updated_at: Optional[datetime] = None, after_id: Optional[int] = None,
+                       limit: int = Query(1000, ge=1, le=10000),
+                       x_tenant: Optional[str] = Header(None)):
+    """Full dump of enabled prompts, or every row changed since ``updated_since``, in (updated_at, id) order.
+
+    A full page carries ``next``: the query parameters of the following page.
+    """
+    after = (after_updated_at, after_id) if after_updated_at is not None and after_id is not None else None
+    snapshots = await run_in_threadpool(_list_changed, updated_since, after, limit, _tenant(x_tenant))
+    body = {"prompts": [s.model_dump(mode="json") for s in snapshots]}
+    if len(snapshots) == limit:
+        last = snapshots[-1]
+        body["next"] = {"after_updated_at": last.updated_at.isoformat(), "after_id": last.id}
+    return body
+
+
+@app.get("/prompts/{name}")
+async def get_prompt(name: str, request: Request, version: Optional[str] = None,
+                     x_tenant: Optional[str] = Header(None)):
+    """Get the latest (or pinned) version of a prompt"""
+    snapshot = await _resolve(name, version, _tenant(x_tenant))
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"Prompt '{name}' version '{version or 'latest'}' not found")
+
+    if _not_modified(request, snapshot.etag):
+        return Response(status_code=304, headers={"ETag": snapshot.etag})
+
+    body = _body_cache.partition(snapshot.tenant).get_or_set(
+        snapshot.etag, lambda: snapshot.model_dump_json().encode("utf-8"))
+    return _json_response(body, snapshot.etag)
+
+
+@app.post("/prompts/{name}/render")
+async def render_prompt(name: str, payload: RenderRequest, request: Request,
+                        x_tenant: Optional[str] = Header(None)):
+    """Render the latest (or pinned) version of a prompt with the given variables"""
+    snapshot = await _resolve(name, payload.version, _tenant(x_tenant))
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"Prompt '{name}' version '{payload.version or 'latest'}' not found")
+
+    etag = _render_etag(snapshot, payload.variables)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    try:
+        rendered = render_snapshot(snapshot, payload.variables)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    body = json.dumps({"name": snapshot.name, "version": snapshot.version, "rendered": rendered}, ensure_ascii=False)
+    return _json_response(body.encode("utf-8"), etag)
+
+
+@app.post("/render/batch")
+async def render_batch(payload: BatchRenderRequest, x_tenant: Optional[str] = Header(None)):
+    """Render many prompts in one round trip. Errors are reported per item."""
+    tenant = _tenant(x_tenant)
+    results = []
+    for item in payload.items:
+        snapshot = await _resolve(item.name, item.version, tenant)
+        if snapshot is None:
+            results.append({"name": item.name, "version": item.version, "error": "not found"})
+            continue
+        try:
+            rendered = render_snapshot(snapshot, item.variables)
+            results.append({"name": snapshot.name, "version": snapshot.version, "rendered": rendered})
+        except ValueError as e:
+            results.append({"name": snapshot.name, "version": snapshot.version, "error": str(e)})
+    return {"results": results}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("api:app", host=settings.API_HOST, port=settings.API_PORT)
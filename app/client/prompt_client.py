@@ -0,0 +1,232 @@
+"""
+In-process prompt client for application services.
+
+Keeps a local snapshot of every enabled prompt, refreshes it in the
+background from `updated_at` deltas and renders without any I/O:
+
+    client = PromptClient(DatabaseSource(), snapshot_path="prompts.snapshot.gz").start()
+    text = client.render("chat_summary", {"content": "..."})
+
+If the source is unreachable, the client keeps serving the last good
+snapshot (loaded from disk at startup).
+"""
+import gzip
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Protocol
+
+from app.models.schemas import PromptSnapshot
+from app.services.template_engine import render_snapshot
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+
+
+class SnapshotSource(Protocol):
+    def fetch_since(self, since: datetime | None) -> list[PromptSnapshot]:
+        """Return every prompt row (enabled or not) updated at or after ``since``."""
+        ...
+
+
+class DatabaseSource:
+    """Reads one tenant's deltas straight from t_prompt."""
+
+    def __init__(self, session_factory: Callable | None = None, tenant: str | None = None):
+        if session_factory is None:
+            from app.db.session import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.tenant = tenant
+
+    def fetch_since(self, since: datetime | None) -> list[PromptSnapshot]:
+        from app.models.prompt import Prompt
+        from config.settings import settings
+
+        db = self.session_factory()
+        try:
+            query = db.query(Prompt).filter(Prompt.tenant == (self.tenant or settings.DEFAULT_TENANT))
+            if since is None:
+                query = query.filter(Prompt.is_enabled == True)
+            else:
+                query = query.filter(Prompt.updated_at >= since)
+            return [PromptSnapshot.from_prompt(p) for p in query.order_by(Prompt.updated_at).all()]
+        finally:
+            db.close()
+
+
+class HttpSource:
+    """Reads deltas from the headless API (`GET /prompts?updated_since=`)."""
+
+    def __init__(self, base_url: str, timeout: float = 5.0, tenant: str | None = None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.tenant = tenant
+
+    def fetch_since(self, since: datetime | None) -> list[PromptSnapshot]:
+        import httpx
+
+        params = {"updated_since": since.isoformat()} if since else {}
+        headers = {"X-Tenant": self.tenant} if self.tenant else {}
+        snapshots = []
+        while True:
+            resp = httpx.get(f"{self.base_url}/prompts", params=params, headers=headers, timeout=self.timeout)
+            resp.raise_for_status()
+            body = resp.json()
+            snapshots.extend(PromptSnapshot(**item) for item in body["prompts"])
+            if not body.get("next"):
+                return snapshots
+            # Follow the server's (updated_at, id) pages until the last one
+            params = {**params, **body["next"]}
+
+
+class PromptClient:
+    def __init__(self,
+                 source: SnapshotSource | None = None,
+                 snapshot_path: str | None = None,
+                 refresh_interval: float = 30.0):
+        self.source = source
+        self.snapshot_path = snapshot_path
+        self.refresh_interval = refresh_interval
+        self.cursor: datetime | None = None
+        # (by (name, version), latest by name). Replaced wholesale on refresh so
+        # readers never need a lock.
+        self._index: tuple[dict, dict] = ({}, {})
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # ---- lifecycle ----
+
+    def start(self, background: bool = True) -> "PromptClient":
+        """Load the local snapshot, try one refresh, then refresh in the background."""
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            self.load_snapshot(self.snapshot_path)
+        if self.source is not None:
+            try:
+                self.refresh()
+            except Exception as e:
+                if not self._index[0]:
+                    raise
+                logger.warning(f"Initial prompt refresh failed, serving local snapshot: {e}")
+            if background:
+                self._thread = threading.Thread(target=self._refresh_loop, name="prompt-client-refresh", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.refresh_interval)
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _refresh_loop(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                if self.refresh() and self.snapshot_path:
+                    self.save_snapshot(self.snapshot_path)
+            except Exception as e:
+                logger.warning(f"Prompt refresh failed, keeping current snapshot: {e}")
+
+    # ---- hot path: no I/O ----
+
+    def get(self, name: str, version: str | None = None) -> PromptSnapshot | None:
+        """Latest enabled version when ``version`` is None."""
+        by_key, latest = self._index
+        if version is None:
+            return latest.get(name)
+        return by_key.get((name, version))
+
+    def render(self, name: str, variables: Dict[str, Any], version: str | None = None) -> str:
+        snapshot = self.get(name, version)
+        if snapshot is None:
+            if version:
+                raise ValueError(f"Prompt '{name}' version '{version}' not found")
+            raise ValueError(f"Prompt not found: {name}")
+        return render_snapshot(snapshot, variables)
+
+    def names(self) -> list[str]:
+        return sorted(self._index[1])
+
+    def __len__(self) -> int:
+        return len(self._index[0])
+
+    # ---- refresh ----
+
+    def refresh(self) -> int:
+        """Apply rows changed since the cursor. Returns the number of rows that changed the snapshot.
+
+        The ``updated_at >= cursor`` delta always includes the rows at the
+        cursor itself (so same-timestamp writes are never missed); rows equal
+        to the copy already held are not counted, so an idle refresh returns 0.
+        """
+        if self.source is None:
+            return 0
+        with self._lock:
+            changed = self.source.fetch_since(self.cursor)
+            return self._apply(changed) if changed else 0
+
+    def _apply(self, changed: list[PromptSnapshot]) -> int:
+        by_key = dict(self._index[0])
+        touched = set()
+        applied = 0
+        for snapshot in changed:
+            if self.cursor is None or snapshot.updated_at > self.cursor:
+                self.cursor = snapshot.updated_at
+            key = (snapshot.name, snapshot.version)
+            if snapshot.is_enabled:
+                if by_key.get(key) == snapshot:
+                    continue
+                by_key[key] = snapshot
+            elif by_key.pop(key, None) is None:
+                continue
+            touched.add(snapshot.name)
+            applied += 1
+        if not applied:
+            return 0
+
+        latest = dict(self._index[1])
+        for name in touched:
+            latest.pop(name, None)
+        for (name, _), snapshot in by_key.items():
+            if name in touched:
+                current = latest.get(name)
+                if current is None or snapshot.created_at > current.created_at:
+                    latest[name] = snapshot
+        self._index = (by_key, latest)
+        return applied
+
+    # ---- local snapshot file ----
+
+    def save_snapshot(self, path: str) -> None:
+        """Write the current snapshot atomically as gzip'd compact JSON."""
+        payload = {
+            "format": SNAPSHOT_FORMAT,
+            "cursor": self.cursor.isoformat() if self.cursor else None,
+            "prompts": [s.model_dump(mode="json") for s in self._index[0].values()],
+        }
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def load_snapshot(self, path: str) -> None:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported snapshot format: {payload.get('format')}")
+        with self._lock:
+            self._index = ({}, {})
+            self.cursor = None
+            self._apply([PromptSnapshot(**item) for item in payload["prompts"]])
+            if payload.get("cursor"):
+                self.cursor = datetime.fromisoformat(payload["cursor"])
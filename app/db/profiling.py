@@ -0,0 +1,154 @@
+"""
+Opt-in SQL query profiling for the service layer.
+
+Engine event listeners record every statement executed inside an active
+profile (tracked per context, so concurrent Streamlit sessions and API
+requests don't mix). When no profile is active the listeners only do a
+context-variable lookup.
+
+    with profile_queries() as stats:
+        service.list_prompts()
+    print(stats.count, stats.total_ms, stats.repeated())
+
+    with assert_query_budget(2):       # in tests
+        page_logic()
+"""
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+@dataclass(slots=True)
+class QueryRecord:
+    statement: str
+    parameters: str
+    duration_s: float
+
+
+@dataclass
+class QueryStats:
+    label: str = ""
+    queries: list[QueryRecord] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(q.duration_s for q in self.queries) * 1000
+
+    def duplicates(self) -> list[tuple[str, str, int]]:
+        """Identical statement + parameters executed more than once (redundant fetches)."""
+        counts = Counter((q.statement, q.parameters) for q in self.queries)
+        return [(stmt, params, n) for (stmt, params), n in counts.most_common() if n > 1]
+
+    def repeated(self, min_count: int = 3) -> list[tuple[str, int]]:
+        """Statement shapes run at least ``min_count`` times — the N+1 signature."""
+        counts = Counter(q.statement for q in self.queries)
+        return [(stmt, n) for stmt, n in counts.most_common() if n >= min_count]
+
+    def slowest(self, n: int = 5) -> list[QueryRecord]:
+        return sorted(self.queries, key=lambda q: q.duration_s, reverse=True)[:n]
+
+    def report(self) -> str:
+        lines = [f"{self.count} queries, {self.total_ms:.1f} ms total"]
+        for stmt, params, n in self.duplicates():
+            lines.append(f"  duplicate x{n}: {_short(stmt)} {params}")
+        for stmt, n in self.repeated():
+            lines.append(f"  repeated x{n}: {_short(stmt)}")
+        for q in self.slowest(3):
+            lines.append(f"  {q.duration_s * 1000:.2f} ms: {_short(q.statement)}")
+        return "\n".join(lines)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def _short(statement: str, width: int = 120) -> str:
+    flat = " ".join(statement.split())
+    return flat if len(flat) <= width else flat[:width - 3] + "..."
+
+
+# Profiles active in the current context (nested profiles all record)
+_active: ContextVar[tuple[QueryStats, ...]] = ContextVar("sql_profiles", default=())
+_instrumented: set[int] = set()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _active.get():
+        conn.info.setdefault("_profile_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profiles = _active.get()
+    if not profiles:
+        return
+    starts = conn.info.get("_profile_start")
+    if not starts:
+        return
+    record = QueryRecord(statement, repr(parameters), time.perf_counter() - starts.pop())
+    for stats in profiles:
+        stats.queries.append(record)
+
+
+def instrument(engine: Engine) -> None:
+    """Attach the profiling listeners to ``engine`` (idempotent)."""
+    if id(engine) in _instrumented:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    _instrumented.add(id(engine))
+
+
+def start_profile(label: str = "", engine: Engine | None = None) -> QueryStats:
+    """Begin a profile that lasts for the rest of the current context (e.g. one Streamlit rerun)."""
+    instrument(engine or _default_engine())
+    stats = QueryStats(label=label)
+    _active.set((stats,))
+    return stats
+
+
+def current_profile() -> QueryStats | None:
+    profiles = _active.get()
+    return profiles[-1] if profiles else None
+
+
+@contextmanager
+def profile_queries(label: str = "", engine: Engine | None = None) -> Iterator[QueryStats]:
+    instrument(engine or _default_engine())
+    stats = QueryStats(label=label)
+    token = _active.set(_active.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def assert_query_budget(max_queries: int,
+                        max_duplicates: int = 0,
+                        engine: Engine | None = None) -> Iterator[QueryStats]:
+    """Fail with QueryBudgetExceeded if the block runs too many (or duplicate) queries."""
+    with profile_queries("budget", engine) as stats:
+        yield stats
+    problems = []
+    if stats.count > max_queries:
+        problems.append(f"expected at most {max_queries} queries, got {stats.count}")
+    duplicate_count = sum(n - 1 for _, _, n in stats.duplicates())
+    if duplicate_count > max_duplicates:
+        problems.append(f"expected at most {max_duplicates} duplicate queries, got {duplicate_count}")
+    if problems:
+        raise QueryBudgetExceeded("; ".join(problems) + "\n" + stats.report())
+
+
+def _default_engine() -> Engine:
+    from app.db.session import engine
+    return engine
@@ -0,0 +1,200 @@
+"""
+Bounded, incrementally built chat state for the Playground and Comparison pages.
+
+A ConversationState keeps an append-only log of ChatEntry objects, each of
+which builds its LangChain message once and caches it. `messages()` returns
+the system prompt plus the most recent `window` entries, so the cost of a
+turn depends on the window size, not on how long the session has been
+running.
+
+Compaction works in batches of `compact_batch`, so its cost is amortized:
+- with a summarizer, entries that fall out of the window are folded into a
+  running summary, which is sent as a second system message;
+- once the log is `compact_batch` entries past `max_entries`, the oldest
+  entries are evicted, which bounds memory.
+
+Comparison sides share user entries: `append_user_to_all()` creates one
+entry, and therefore one HumanMessage, and appends it to every state.
+"""
+from typing import TYPE_CHECKING, Callable, Iterable
+from config.settings import settings
+
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
+
+Summarizer = Callable[[list["ChatEntry"], str | None], str]
+
+
+class ChatEntry:
+    """One chat message. Treated as immutable once appended; safe to share between states."""
+    __slots__ = ("role", "content", "timestamp", "metrics", "turn_id", "_message")
+
+    def __init__(self, role: str, content: str, timestamp: str | None = None, metrics: str | None = None,
+                 turn_id: int | None = None):
+        self.role = role
+        self.content = content
+        self.timestamp = timestamp
+        self.metrics = metrics
+        # t_conversation.id once the exchange is persisted (set on assistant entries)
+        self.turn_id = turn_id
+        self._message = None
+
+    @property
+    def message(self) -> "BaseMessage":
+        """The LangChain message for this entry, built on first use"""
+        if self._message is None:
+            from langchain_core.messages import HumanMessage, AIMessage
+            cls = HumanMessage if self.role == "user" else AIMessage
+            self._message = cls(content=self.content)
+        return self._message
+
+    @property
+    def caption(self) -> str:
+        if not self.timestamp:
+            return ""
+        return f"🕒 {self.timestamp}" + (f" · {self.metrics}" if self.metrics else "")
+
+
+def truncating_summarizer(max_chars: int = 2000, per_entry: int = 200) -> Summarizer:
+    """Summarizer that keeps a clipped transcript of evicted turns (no LLM call)"""
+    def summarize(entries: list[ChatEntry], previous: str | None) -> str:
+        lines = [previous] if previous else []
+        for entry in entries:
+            text = " ".join(entry.content.split())
+            if len(text) > per_entry:
+                text = text[:per_entry - 3] + "..."
+            lines.append(f"{entry.role}: {text}")
+        summary = "\n".join(lines)
+        # Keep the most recent part when over budget
+        return summary[-max_chars:]
+    return summarize
+
+
+class ConversationState:
+    def __init__(self,
+                 system_prompt: str | None = None,
+                 window: int | None = None,
+                 max_entries: int | None = None,
+                 compact_batch: int | None = None,
+                 summarizer: Summarizer | None = None):
+        self.window = window or settings.CHAT_WINDOW_MESSAGES
+        self.max_entries = max(max_entries or settings.CHAT_MAX_ENTRIES, self.window)
+        self.compact_batch = compact_batch or settings.CHAT_COMPACT_BATCH
+        self.summarizer = summarizer
+        self.summary: str | None = None
+        self.evicted = 0
+        self._entries: list[ChatEntry] = []
+        # Retained entries already folded into the summary (a prefix of _entries)
+        self._summarized = 0
+        self._system_prompt: str | None = None
+        self._system_message = None
+        self._summary_message = None
+        self.system_prompt = system_prompt
+
+    @classmethod
+    def from_settings(cls, system_prompt: str | None = None) -> "ConversationState":
+        """State using the CHAT_* settings, with a summarizer when CHAT_COMPACTION is "summary"."""
+        summarizer = truncating_summarizer() if settings.CHAT_COMPACTION == "summary" else None
+        return cls(system_prompt=system_prompt, summarizer=summarizer)
+
+    @property
+    def system_prompt(self) -> str | None:
+        return self._system_prompt
+
+    @system_prompt.setter
+    def system_prompt(self, value: str | None) -> None:
+        if value != self._system_prompt:
+            self._system_prompt = value
+            self._system_message = None
+
+    @property
+    def entries(self) -> list[ChatEntry]:
+        """Retained entries, oldest first (read-only view by convention)"""
+        return self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __bool__(self) -> bool:
+        return bool(self._entries)
+
+    def append(self, entry: ChatEntry) -> ChatEntry:
+        self._entries.append(entry)
+        if self.summarizer is not None and len(self._entries) - self.window - self._summarized >= self.compact_batch:
+            self._fold(len(self._entries) - self.window)
+        if len(self._entries) >= self.max_entries + self.compact_batch:
+            self._evict()
+        return entry
+
+    def append_user(self, content: str, timestamp: str | None = None) -> ChatEntry:
+        return self.append(ChatEntry("user", content, timestamp))
+
+    def append_assistant(self, content: str, timestamp: str | None = None, metrics: str | None = None,
+                         turn_id: int | None = None) -> ChatEntry:
+        return self.append(ChatEntry("assistant", content, timestamp, metrics, turn_id))
+
+    def discard_last(self, role: str | None = None) -> ChatEntry | None:
+        """Drop the newest entry (e.g. a user turn whose LLM call failed)"""
+        if len(self._entries) > self._summarized and (role is None or self._entries[-1].role == role):
+            return self._entries.pop()
+        return None
+
+    def clear(self) -> None:
+        self._entries = []
+        self._summarized = 0
+        self.summary = None
+        self._summary_message = None
+        self.evicted = 0
+
+    def oldest_turn_id(self) -> int | None:
+        """Id of the oldest persisted turn still in memory (cursor for paging older turns)"""
+        return next((entry.turn_id for entry in self._entries if entry.turn_id is not None), None)
+
+    def recent(self, limit: int) -> list[ChatEntry]:
+        """The newest ``limit`` entries, for display"""
+        return self._entries[-limit:] if limit else []
+
+    def messages(self) -> "list[BaseMessage]":
+        """System prompt, running summary and the windowed tail, ready for the LLM"""
+        messages = []
+        if self._system_prompt:
+            if self._system_message is None:
+                from langchain_core.messages import SystemMessage
+                self._system_message = SystemMessage(content=self._system_prompt)
+            messages.append(self._system_message)
+        if self.summary:
+            if self._summary_message is None:
+                from langchain_core.messages import SystemMessage
+                self._summary_message = SystemMessage(
+                    content=f"Summary of the earlier conversation:\n{self.summary}")
+            messages.append(self._summary_message)
+        if self.summarizer is not None:
+            # Everything not yet summarized: at most window + compact_batch entries
+            tail = self._entries[self._summarized:]
+        else:
+            tail = self._entries[-self.window:]
+        messages.extend(entry.message for entry in tail)
+        return messages
+
+    def _fold(self, end: int) -> None:
+        if end <= self._summarized:
+            return
+        self.summary = self.summarizer(self._entries[self._summarized:end], self.summary)
+        self._summary_message = None
+        self._summarized = end
+
+    def _evict(self) -> None:
+        cut = len(self._entries) - self.max_entries
+        if self.summarizer is not None:
+            self._fold(cut)
+        self._entries = self._entries[cut:]
+        self._summarized = max(self._summarized - cut, 0)
+        self.evicted += cut
+
+
+def append_user_to_all(states: Iterable[ConversationState], content: str, timestamp: str | None = None) -> ChatEntry:
+    """Append one shared user entry to several states (e.g. both comparison sides)"""
+    entry = ChatEntry("user", content, timestamp)
+    for state in states:
+        state.append(entry)
+    return entry
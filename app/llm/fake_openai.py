@@ -0,0 +1,303 @@
+"""
+Local OpenAI-compatible stand-in server for load and latency testing.
+
+Implements `POST /v1/chat/completions` (JSON and streaming SSE) and
+`GET /v1/models` with no network or API spend. Point the app at it with
+`OPENAI_API_BASE=http://127.0.0.1:8787/v1` (see scripts/run_fake_openai.py)
+or start it in-process:
+
+    server = start_fake_server(ttft=0.2, tokens_per_second=50, rate_limit_every=10)
+    settings.OPENAI_API_BASE = server.base_url
+
+Replies are deterministic: echo the last user message (default), cycle
+through a script, pick a scripted reply by substring match, or emit a
+fixed number of filler tokens. Failures are injected from a seeded RNG so
+runs are reproducible.
+
+Control endpoints (not part of the OpenAI API):
+    GET  /_fake/stats    request / error / 429 counters
+    GET  /_fake/config   current configuration
+    POST /_fake/config   update configuration fields at runtime
+"""
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+@dataclass
+class FakeServerConfig:
+    # Latency
+    ttft: float = 0.0                      # seconds before the first token
+    token_delay: float = 0.0               # seconds between tokens
+    tokens_per_second: float | None = None  # overrides token_delay when set
+    jitter: float = 0.0                    # +/- fraction applied to every delay
+
+    # Replies
+    mode: str = "echo"                     # echo | script | match | fixed
+    script: list[str] = field(default_factory=list)          # mode=script: replies in order, cycled
+    responses: dict[str, str] = field(default_factory=dict)  # mode=match: substring -> reply
+    default_reply: str = "ok"
+    fixed_tokens: int = 100                # mode=fixed: reply length in tokens
+
+    # Failure injection
+    error_rate: float = 0.0                # probability of HTTP 500 before any output
+    stream_error_rate: float = 0.0         # probability of aborting a stream midway
+    rate_limit_every: int = 0              # every Nth request gets 429 (0 = never)
+    rate_limit_rps: float = 0.0            # token-bucket limit, excess requests get 429 (0 = off)
+    retry_after: float = 1.0               # Retry-After header on 429
+    seed: int = 0
+
+    @property
+    def per_token_delay(self) -> float:
+        if self.tokens_per_second:
+            return 1.0 / self.tokens_per_second
+        return self.token_delay
+
+
+class _State:
+    """Mutable server state shared by handler threads."""
+
+    def __init__(self, config: FakeServerConfig):
+        self.config = config
+        self.lock = threading.Lock()
+        self.rng = random.Random(config.seed)
+        self.requests = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.stream_aborts = 0
+        self.script_index = 0
+        self.bucket_tokens = config.rate_limit_rps
+        self.bucket_updated = time.monotonic()
+
+    def admit(self) -> str | None:
+        """Decide the fate of a request: None (serve), "429" or "500"."""
+        config = self.config
+        with self.lock:
+            self.requests += 1
+            if config.rate_limit_every and self.requests % config.rate_limit_every == 0:
+                self.rate_limited += 1
+                return "429"
+            if config.rate_limit_rps:
+                now = time.monotonic()
+                self.bucket_tokens = min(config.rate_limit_rps,
+                                         self.bucket_tokens + (now - self.bucket_updated) * config.rate_limit_rps)
+                self.bucket_updated = now
+                if self.bucket_tokens < 1:
+                    self.rate_limited += 1
+                    return "429"
+                self.bucket_tokens -= 1
+            if config.error_rate and self.rng.random() < config.error_rate:
+                self.errors += 1
+                return "500"
+        return None
+
+    def abort_stream_at(self, token_count: int) -> int | None:
+        with self.lock:
+            if self.config.stream_error_rate and self.rng.random() < self.config.stream_error_rate:
+                self.stream_aborts += 1
+                return self.rng.randrange(max(token_count, 1))
+        return None
+
+    def delay(self, seconds: float) -> float:
+        if seconds <= 0:
+            return 0.0
+        if self.config.jitter:
+            with self.lock:
+                seconds *= 1 + self.rng.uniform(-self.config.jitter, self.config.jitter)
+        return max(seconds, 0.0)
+
+    def reply_text(self, body: dict) -> str:
+        config = self.config
+        last_user = _last_user_message(body)
+        if config.mode == "script" and config.script:
+            with self.lock:
+                reply = config.script[self.script_index % len(config.script)]
+                self.script_index += 1
+            return reply
+        if config.mode == "match":
+            for needle, reply in config.responses.items():
+                if needle in last_user:
+                    return reply
+            return config.default_reply
+        if config.mode == "fixed":
+            return " ".join(f"tok{i}" for i in range(config.fixed_tokens))
+        return last_user or config.default_reply
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "rate_limited": self.rate_limited,
+                "errors": self.errors,
+                "stream_aborts": self.stream_aborts,
+            }
+
+
+def _last_user_message(body: dict) -> str:
+    messages = body.get("messages") or []
+    content = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+def _tokenize(text: str) -> list[str]:
+    """Whitespace tokens with the leading space kept, so joining restores the text."""
+    words = text.split(" ")
+    return [w if i == 0 else f" {w}" for i, w in enumerate(words)] if text else []
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY,
+    # Nagle + delayed ACK adds ~40ms to every non-streaming response.
+    disable_nagle_algorithm = True
+    state: _State
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: dict | None = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path.endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "fake-model", "object": "model", "owned_by": "local"}]})
+        elif path == "/_fake/stats":
+            self._send_json(200, self.state.stats())
+        elif path == "/_fake/config":
+            self._send_json(200, asdict(self.state.config))
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/_fake/config":
+            updates = self._read_json()
+            known = {f.name for f in fields(FakeServerConfig)}
+            with self.state.lock:
+                for key, value in updates.items():
+                    if key in known:
+                        setattr(self.state.config, key, value)
+            self._send_json(200, asdict(self.state.config))
+            return
+        if not path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        self._chat_completions(self._read_json())
+
+    def _chat_completions(self, body: dict) -> None:
+        state = self.state
+        verdict = state.admit()
+        if verdict == "429":
+            self._send_json(429, {"error": {"message": "Rate limit reached (fake)", "type": "rate_limit_exceeded",
+                                            "code": "rate_limit_exceeded"}},
+                            headers={"Retry-After": f"{state.config.retry_after:g}"})
+            return
+        if verdict == "500":
+            self._send_json(500, {"error": {"message": "Injected server error (fake)", "type": "server_error"}})
+            return
+
+        model = body.get("model", "fake-model")
+        tokens = _tokenize(state.reply_text(body))
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages") or [])
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                 "total_tokens": prompt_tokens + len(tokens)}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        per_token = state.config.per_token_delay
+
+        time.sleep(state.delay(state.config.ttft))
+        if not body.get("stream"):
+            time.sleep(sum(state.delay(per_token) for _ in range(max(len(tokens) - 1, 0))))
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(payload: dict) -> None:
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        def chunk(delta: dict, finish_reason=None) -> dict:
+            return {
+                "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        abort_at = state.abort_stream_at(len(tokens))
+        try:
+            event(chunk({"role": "assistant", "content": ""}))
+            for i, token in enumerate(tokens):
+                if abort_at is not None and i == abort_at:
+                    # Drop the connection mid-stream, as a flaky upstream would
+                    return
+                if i:
+                    time.sleep(state.delay(per_token))
+                event(chunk({"content": token}))
+            event(chunk({}, finish_reason="stop"))
+            if (body.get("stream_options") or {}).get("include_usage"):
+                event({**chunk({}), "choices": [], "usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away (e.g. cancelled stream)
+            pass
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    state: _State
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def config(self) -> FakeServerConfig:
+        return self.state.config
+
+    def stats(self) -> dict:
+        return self.state.stats()
+
+
+def create_fake_server(host: str = "127.0.0.1", port: int = 0, **config) -> FakeOpenAIServer:
+    """Build (but don't start) a server; port 0 picks a free port."""
+    state = _State(FakeServerConfig(**config))
+    handler = type("Handler", (_Handler,), {"state": state})
+    server = FakeOpenAIServer((host, port), handler)
+    server.state = state
+    return server
+
+
+def start_fake_server(host: str = "127.0.0.1", port: int = 0, **config) -> FakeOpenAIServer:
+    """Start the server in a daemon thread; port 0 picks a free port."""
+    server = create_fake_server(host, port, **config)
+    threading.Thread(target=server.serve_forever, name="fake-openai", daemon=True).start()
+    return server
@@ -0,0 +1,119 @@
+"""
+Concurrent fan-out of streaming LLM calls.
+
+`fan_out()` runs one streaming call per job on a thread pool and yields
+their chunks through a single queue as they arrive. The caller (e.g. a
+Streamlit script, whose UI can only be touched from its own thread)
+consumes one iterator and updates a grid of placeholders:
+
+    for event in fan_out(jobs):
+        if event.kind == "chunk":
+            buffers[event.key] += event.text
+        elif event.kind == "done":
+            ...  # event.text is the full response, event.metrics its CallMetrics
+
+Closing the iterator early (rerun, exception) tells the workers to stop
+at their next chunk.
+"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator
+
+from app.llm.metrics import CallMetrics
+from config.settings import settings
+
+
+@dataclass
+class FanoutJob:
+    key: str
+    messages: list
+    model_name: str | None = None
+    temperature: float = 0.7
+
+
+@dataclass
+class FanoutEvent:
+    key: str
+    kind: str  # "chunk", "done" or "error"
+    text: str = ""
+    metrics: CallMetrics | None = None
+    error: BaseException | None = None
+
+
+def _default_client(model_name: str | None, temperature: float, tenant: str | None = None) -> Any:
+    from app.llm.langchain_client import LangChainClient
+    return LangChainClient(model_name=model_name, temperature=temperature, tenant=tenant)
+
+
+def _run_job(job: FanoutJob, events: queue.Queue, stop: threading.Event, client_factory: Callable) -> None:
+    client = None
+    parts = []
+    try:
+        client = client_factory(job.model_name, job.temperature)
+        stream = client.stream(job.messages)
+        try:
+            for chunk in stream:
+                if stop.is_set():
+                    break
+                parts.append(chunk)
+                events.put(FanoutEvent(job.key, "chunk", chunk))
+        finally:
+            # Records metrics even when stopped early
+            stream.close()
+    except Exception as e:
+        events.put(FanoutEvent(job.key, "error", "".join(parts),
+                               metrics=getattr(client, "last_metrics", None), error=e))
+    else:
+        events.put(FanoutEvent(job.key, "done", "".join(parts), metrics=client.last_metrics))
+
+
+def fan_out(jobs: Iterable[FanoutJob],
+            max_workers: int | None = None,
+            client_factory: Callable[[str | None, float], Any] = _default_client,
+            tenant: str | None = None) -> Iterator[FanoutEvent]:
+    """Run all jobs concurrently; yield chunk events as they arrive, then one done/error per job.
+
+    Default clients draw from ``tenant``'s LLM quota, so calls beyond its
+    concurrency limit queue inside their worker.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return
+    if client_factory is _default_client:
+        client_factory = partial(_default_client, tenant=tenant)
+    events: queue.Queue = queue.Queue()
+    stop = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=min(max_workers or settings.COMPARISON_MAX_WORKERS, len(jobs)),
+                                  thread_name_prefix="llm-fanout")
+    try:
+        for job in jobs:
+            executor.submit(_run_job, job, events, stop, client_factory)
+        remaining = len(jobs)
+        while remaining:
+            event = events.get()
+            if event.kind != "chunk":
+                remaining -= 1
+            yield event
+    finally:
+        stop.set()
+        executor.shutdown(wait=False)
+
+
+def aggregate_metrics(metrics: Iterable[CallMetrics | None], wall_s: float | None = None) -> dict:
+    """Totals across one fan-out: calls, errors, wall vs summed time, tokens, slowest TTFT."""
+    metrics = [m for m in metrics if m is not None]
+    ttfts = [m.ttft_s for m in metrics if m.ttft_s is not None]
+    summed = sum(m.duration_s for m in metrics)
+    return {
+        "calls": len(metrics),
+        "errors": sum(1 for m in metrics if m.error_class),
+        "wall_s": wall_s if wall_s is not None else max((m.duration_s for m in metrics), default=0.0),
+        "sum_s": summed,
+        "output_tokens": sum(m.output_tokens or 0 for m in metrics),
+        "input_tokens": sum(m.input_tokens or 0 for m in metrics),
+        "max_ttft_s": max(ttfts, default=None),
+    }
+
@@ -1,51 +1,97 @@
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, BaseMessage
+from typing import TYPE_CHECKING
 from config.settings import settings
+from app.llm.metrics import CallMetrics, CallTimer
+from app.llm.quotas import quotas
 import logging
 
+# langchain_openai/langchain_core cost ~1s to import, so they are only
+# loaded when a client is actually created or messages are built.
+if TYPE_CHECKING:
+    from langchain_core.messages import BaseMessage
+
 logger = logging.getLogger(__name__)
 
+
+def build_messages(system_prompt: str | None, history: list[dict]) -> "list[BaseMessage]":
+    """Convert chat history dicts ({"role", "content"}) into LangChain messages."""
+    from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+
+    messages = [SystemMessage(content=system_prompt)] if system_prompt else []
+    for msg in history:
+        if msg["role"] == "user":
+            messages.append(HumanMessage(content=msg["content"]))
+        elif msg["role"] == "assistant":
+            messages.append(AIMessage(content=msg["content"]))
+    return messages
+
+
 class LangChainClient:
-    def __init__(self, model_name: str | None = None, temperature: float = 0.7):
+    def __init__(self, model_name: str | None = None, temperature: float = 0.7, tenant: str | None = None):
         self.model_name = model_name or settings.DEFAULT_MODEL_NAME
         self.temperature = temperature
+        # Calls wait for a slot of this tenant's LLM quota (see app.llm.quotas)
+        self.tenant = tenant
+        # Metrics of the most recent invoke/stream call (see app.llm.metrics)
+        self.last_metrics: CallMetrics | None = None
         self._init_llm()
 
     def _init_llm(self):
+        from langchain_openai import ChatOpenAI
+
         # Ensure API Key is present (or handle gracefully)
         if not settings.OPENAI_API_KEY:
             logger.warning("OPENAI_API_KEY not set. LLM calls might fail.")
-        
+
         self.llm = ChatOpenAI(
             model=self.model_name,
             openai_api_key=settings.OPENAI_API_KEY,
             openai_api_base=settings.OPENAI_API_BASE,
-            temperature=self.temperature
+            temperature=self.temperature,
+            # Ask for token usage on the final streamed chunk
+            stream_usage=True
         )
 
-    def invoke(self, input_data: str | list[BaseMessage]) -> str:
-        try:
-            if isinstance(input_data, str):
-                messages = [HumanMessage(content=input_data)]
-            else:
-                messages = input_data
-                
-            response = self.llm.invoke(messages)
-            return response.content
-        except Exception as e:
-            logger.error(f"LLM Invoke Error: {e}")
-            raise e
-
-    def stream(self, input_data: str | list[BaseMessage]):
-        try:
-            if isinstance(input_data, str):
-                messages = [HumanMessage(content=input_data)]
-            else:
-                messages = input_data
-                
-            for chunk in self.llm.stream(messages):
-                if chunk.content:
-                    yield chunk.content
-        except Exception as e:
-            logger.error(f"LLM Stream Error: {e}")
-            raise e
+    @staticmethod
+    def _to_messages(input_data: "str | list[BaseMessage]") -> "list[BaseMessage]":
+        if isinstance(input_data, str):
+            from langchain_core.messages import HumanMessage
+            return [HumanMessage(content=input_data)]
+        return input_data
+
+    def invoke(self, input_data: "str | list[BaseMessage]") -> str:
+        with quotas.slot(self.tenant):
+            timer = CallTimer(self.model_name, "invoke")
+            try:
+                messages = self._to_messages(input_data)
+                response = self.llm.invoke(messages)
+                timer.chunk()
+                timer.usage(getattr(response, "usage_metadata", None))
+                self.last_metrics = timer.finish()
+                return response.content
+            except Exception as e:
+                self.last_metrics = timer.finish(e)
+                logger.error(f"LLM Invoke Error: {e}")
+                raise e
+
+    def stream(self, input_data: "str | list[BaseMessage]"):
+        # The slot is held until the stream is exhausted or closed
+        with quotas.slot(self.tenant):
+            timer = CallTimer(self.model_name, "stream")
+            error = None
+            try:
+                messages = self._to_messages(input_data)
+                for chunk in self.llm.stream(messages):
+                    timer.usage(getattr(chunk, "usage_metadata", None))
+                    if chunk.content:
+                        timer.chunk()
+                        yield chunk.content
+            except GeneratorExit:
+                # Consumer stopped reading early
+                error = GeneratorExit()
+                raise
+            except Exception as e:
+                error = e
+                logger.error(f"LLM Stream Error: {e}")
+                raise e
+            finally:
+                self.last_metrics = timer.finish(error)
@@ -0,0 +1,236 @@
+"""
+Per-call LLM instrumentation and an in-process metrics registry.
+
+LangChainClient records a CallMetrics for every invoke/stream call and
+feeds it into the module-level `registry`, which renders the Prometheus
+text exposition format (served by the API's /metrics, or by
+`serve_metrics()` inside a Streamlit process).
+"""
+import bisect
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+
+def _quantile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * (len(ordered) - 1) + 0.5))]
+
+
+@dataclass
+class CallMetrics:
+    model_name: str
+    mode: str  # "invoke" or "stream"
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    ttft_s: float | None = None
+    duration_s: float = 0.0
+    chunk_count: int = 0
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+    # Input tokens the provider served from its prompt cache
+    cached_input_tokens: int | None = None
+    error_class: str | None = None
+    inter_chunk_s: list[float] = field(default_factory=list, repr=False)
+
+    @property
+    def output_tokens_per_second(self) -> float | None:
+        """Decode throughput: output tokens over the time after the first token.
+
+        Falls back to the chunk count when the provider reports no usage, and
+        to the whole duration for non-streaming calls.
+        """
+        tokens = self.output_tokens if self.output_tokens is not None else self.chunk_count
+        generation_s = self.duration_s - (self.ttft_s or 0.0) if self.mode == "stream" else self.duration_s
+        if not tokens or generation_s <= 0:
+            return None
+        return tokens / generation_s
+
+    def as_dict(self) -> dict[str, Any]:
+        """JSON-safe summary, stored in t_conversation.metadata["llm"]."""
+        gaps = sorted(self.inter_chunk_s)
+        tps = self.output_tokens_per_second
+        return {
+            "model": self.model_name,
+            "mode": self.mode,
+            "started_at": self.started_at.isoformat(),
+            "ttft_ms": round(self.ttft_s * 1000, 1) if self.ttft_s is not None else None,
+            "duration_ms": round(self.duration_s * 1000, 1),
+            "chunks": self.chunk_count,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_input_tokens": self.cached_input_tokens,
+            "output_tokens_per_s": round(tps, 2) if tps else None,
+            "inter_chunk_ms": {
+                "p50": round(_quantile(gaps, 0.5) * 1000, 2),
+                "p90": round(_quantile(gaps, 0.9) * 1000, 2),
+                "p99": round(_quantile(gaps, 0.99) * 1000, 2),
+                "max": round(gaps[-1] * 1000, 2) if gaps else 0.0,
+            },
+            "error": self.error_class,
+        }
+
+
+class CallTimer:
+    """Collects CallMetrics while a call runs; `chunk()` on every streamed piece."""
+
+    def __init__(self, model_name: str, mode: str):
+        self.metrics = CallMetrics(model_name=model_name, mode=mode)
+        self._start = time.perf_counter()
+        self._last = self._start
+
+    def chunk(self) -> None:
+        now = time.perf_counter()
+        if self.metrics.ttft_s is None:
+            self.metrics.ttft_s = now - self._start
+        else:
+            self.metrics.inter_chunk_s.append(now - self._last)
+        self._last = now
+        self.metrics.chunk_count += 1
+
+    def usage(self, usage_metadata: dict | None) -> None:
+        if usage_metadata:
+            self.metrics.input_tokens = usage_metadata.get("input_tokens")
+            self.metrics.output_tokens = usage_metadata.get("output_tokens")
+            self.metrics.cached_input_tokens = (usage_metadata.get("input_token_details") or {}).get("cache_read")
+
+    def finish(self, error: BaseException | None = None) -> CallMetrics:
+        self.metrics.duration_s = time.perf_counter() - self._start
+        if error is not None:
+            self.metrics.error_class = type(error).__name__
+        registry.observe(self.metrics)
+        return self.metrics
+
+
+# Latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+THROUGHPUT_BUCKETS = (1, 5, 10, 20, 40, 80, 160, 320)
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[tuple[str, tuple], float] = {}
+        self._histograms: dict[tuple[str, tuple], _Histogram] = {}
+        self._help: dict[str, tuple[str, str]] = {}
+
+    def _inc(self, name: str, labels: dict, value: float = 1.0, help_text: str = "") -> None:
+        key = (name, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0.0) + value
+        self._help.setdefault(name, ("counter", help_text))
+
+    def _observe(self, name: str, labels: dict, value: float, buckets: tuple, help_text: str = "") -> None:
+        key = (name, tuple(sorted(labels.items())))
+        hist = self._histograms.get(key)
+        if hist is None:
+            hist = self._histograms[key] = _Histogram(buckets)
+        hist.observe(value)
+        self._help.setdefault(name, ("histogram", help_text))
+
+    def observe(self, m: CallMetrics) -> None:
+        model = {"model": m.model_name}
+        status = "error" if m.error_class else "ok"
+        with self._lock:
+            self._inc("llm_calls_total", {**model, "mode": m.mode, "status": status}, help_text="LLM calls")
+            if m.error_class:
+                self._inc("llm_call_errors_total", {**model, "error": m.error_class}, help_text="LLM call errors by class")
+            self._observe("llm_call_duration_seconds", {**model, "mode": m.mode}, m.duration_s, LATENCY_BUCKETS,
+                          "Total call duration")
+            if m.ttft_s is not None:
+                self._observe("llm_time_to_first_token_seconds", model, m.ttft_s, LATENCY_BUCKETS,
+                              "Time to first streamed chunk")
+            for gap in m.inter_chunk_s:
+                self._observe("llm_inter_chunk_latency_seconds", model, gap, LATENCY_BUCKETS,
+                              "Gap between consecutive streamed chunks")
+            if m.cached_input_tokens:
+                self._inc("llm_cached_input_tokens_total", model, m.cached_input_tokens,
+                          "Input tokens served from the provider's prompt cache")
+            if m.output_tokens:
+                self._inc("llm_output_tokens_total", model, m.output_tokens, "Output tokens reported by the provider")
+            tps = m.output_tokens_per_second
+            if tps:
+                self._observe("llm_output_tokens_per_second", model, tps, THROUGHPUT_BUCKETS,
+                              "Decode throughput per call")
+
+    def observe_quota_wait(self, tenant: str, wait_s: float, rejected: bool = False) -> None:
+        """Time a call waited for its tenant's LLM quota (see app.llm.quotas)"""
+        labels = {"tenant": tenant}
+        with self._lock:
+            self._observe("llm_quota_wait_seconds", labels, wait_s, LATENCY_BUCKETS,
+                          "Time calls waited for a tenant concurrency/rate slot")
+            if rejected:
+                self._inc("llm_quota_rejections_total", labels, help_text="Calls that gave up waiting for a quota slot")
+
+    def to_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        def fmt_labels(labels: tuple, extra: tuple = ()) -> str:
+            items = labels + extra
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in items) + "}"
+
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in sorted(self._help.items()):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    for (n, labels), value in self._counters.items():
+                        if n == name:
+                            lines.append(f"{name}{fmt_labels(labels)} {value:g}")
+                    continue
+                for (n, labels), hist in self._histograms.items():
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{fmt_labels(labels, (('le', f'{bound:g}'),))} {cumulative}")
+                    lines.append(f"{name}_bucket{fmt_labels(labels, (('le', '+Inf'),))} {hist.count}")
+                    lines.append(f"{name}_sum{fmt_labels(labels)} {hist.sum:g}")
+                    lines.append(f"{name}_count{fmt_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._help.clear()
+
+
+registry = MetricsRegistry()
+
+
+def serve_metrics(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Expose `registry` at http://host:port/metrics from a daemon thread."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="llm-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,140 @@
+"""
+Per-tenant LLM quotas.
+
+Each tenant gets a concurrency limit (calls in flight) and an optional
+token-bucket rate limit (sustained calls per second with bursts), so one
+tenant fanning out many calls queues behind its own limits instead of
+taking every provider connection and rate-limit slot:
+
+    with quotas.slot(tenant):
+        response = llm.invoke(messages)
+
+A call that cannot get a slot within TENANT_LLM_WAIT seconds raises
+QuotaExceeded. Limits come from TENANT_LLM_* settings, overridden per
+tenant by TENANT_LLM_LIMITS. On top of the tenant limits every call
+holds one of LLM_MAX_CONCURRENCY process-wide slots, so tenant names a
+caller makes up cannot add capacity, and at most MAX_TENANT_PARTITIONS
+tenant quotas are kept (least recently used dropped first). Quotas are
+per process: with N workers a tenant can have up to N times the
+configured concurrency.
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.llm.metrics import registry
+from config.settings import settings
+
+
+class QuotaExceeded(RuntimeError):
+    """No concurrency/rate slot became free within the allowed wait."""
+
+
+class TokenBucket:
+    """``rate`` tokens per second, holding at most ``burst``; rate 0 means unlimited"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: float) -> bool:
+        if self.rate <= 0:
+            return True
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class TenantQuota:
+    def __init__(self, tenant: str, concurrency: int, rate: float, burst: float, wait: float,
+                 shared: threading.BoundedSemaphore | None = None):
+        self.tenant = tenant
+        self.concurrency = concurrency
+        self.wait = wait
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._bucket = TokenBucket(rate, burst)
+        self._shared = shared
+
+    @contextmanager
+    def slot(self, timeout: float | None = None) -> Iterator[None]:
+        """Hold one of the tenant's concurrent-call slots for the duration of the block"""
+        started = time.monotonic()
+        deadline = started + (self.wait if timeout is None else timeout)
+        if not self._bucket.acquire(deadline):
+            registry.observe_quota_wait(self.tenant, time.monotonic() - started, rejected=True)
+            raise QuotaExceeded(f"Tenant '{self.tenant}' exceeded its LLM rate limit")
+        if not self._slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            registry.observe_quota_wait(self.tenant, time.monotonic() - started, rejected=True)
+            raise QuotaExceeded(f"Tenant '{self.tenant}' has {self.concurrency} LLM calls in flight")
+        if self._shared is not None and not self._shared.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            self._slots.release()
+            registry.observe_quota_wait(self.tenant, time.monotonic() - started, rejected=True)
+            raise QuotaExceeded(f"{settings.LLM_MAX_CONCURRENCY} LLM calls in flight across all tenants")
+        registry.observe_quota_wait(self.tenant, time.monotonic() - started)
+        try:
+            yield
+        finally:
+            if self._shared is not None:
+                self._shared.release()
+            self._slots.release()
+
+
+class QuotaRegistry:
+    """Lazily creates one TenantQuota per tenant from settings, keeping the most recently used"""
+
+    def __init__(self):
+        self._quotas: OrderedDict[str, TenantQuota] = OrderedDict()
+        self._lock = threading.Lock()
+        self._shared = self._new_shared()
+
+    @staticmethod
+    def _new_shared() -> threading.BoundedSemaphore | None:
+        if settings.LLM_MAX_CONCURRENCY <= 0:
+            return None
+        return threading.BoundedSemaphore(settings.LLM_MAX_CONCURRENCY)
+
+    def get(self, tenant: str | None = None) -> TenantQuota:
+        tenant = tenant or settings.DEFAULT_TENANT
+        with self._lock:
+            quota = self._quotas.get(tenant)
+            if quota is None:
+                limits = settings.TENANT_LLM_LIMITS.get(tenant, {})
+                quota = TenantQuota(
+                    tenant,
+                    concurrency=int(limits.get("concurrency", settings.TENANT_LLM_CONCURRENCY)),
+                    rate=float(limits.get("rate", settings.TENANT_LLM_RATE)),
+                    burst=float(limits.get("burst", settings.TENANT_LLM_BURST)),
+                    wait=float(limits.get("wait", settings.TENANT_LLM_WAIT)),
+                    shared=self._shared,
+                )
+                self._quotas[tenant] = quota
+                if len(self._quotas) > settings.MAX_TENANT_PARTITIONS:
+                    self._quotas.popitem(last=False)
+            else:
+                self._quotas.move_to_end(tenant)
+        return quota
+
+    def slot(self, tenant: str | None = None, timeout: float | None = None):
+        return self.get(tenant).slot(timeout)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._quotas.clear()
+            self._shared = self._new_shared()
+
+
+quotas = QuotaRegistry()
@@ -1,17 +1,27 @@
 from datetime import datetime
-from sqlalchemy import BigInteger, String, Text, DateTime, JSON, ForeignKey, Index
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import BigInteger, Integer, String, Text, DateTime, JSON, ForeignKey, Index
+from sqlalchemy import event
+from sqlalchemy.orm import Mapped, Session, mapped_column, object_session, relationship
 from app.db.base import Base
+from app.models.rendered_prompt import cached_text, load_texts, store_texts
+from app.models.schemas import content_hash
 
 class Conversation(Base):
+    # On MySQL the table is partitioned by month of created_at and its
+    # primary key is (id, created_at); see app.services.conversation_archive
     __tablename__ = "t_conversation"
     __table_args__ = (
         Index('idx_prompt_id', 'prompt_id'),
         Index('idx_created_at', 'created_at'),
         Index('idx_prompt_version', 'prompt_id', 'version'),
+        Index('idx_session_id', 'session_id', 'id'),
+        Index('idx_tenant_created_at', 'tenant', 'created_at'),
+        Index('idx_rendered_prompt_hash', 'rendered_prompt_hash'),
     )
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    tenant: Mapped[str] = mapped_column(String(64), default="default", server_default="default", nullable=False,
+                                        comment='Tenant namespace')
 
     # Prompt reference
     prompt_id: Mapped[int] = mapped_column(BigInteger, nullable=False, comment='Reference to prompt id')
@@ -24,8 +34,13 @@ class Conversation(Base):
     # Variables used in the prompt template
     template_variables: Mapped[dict | None] = mapped_column(JSON, nullable=True, comment='Variables used to render the prompt template')
 
-    # Rendered prompt (the actual prompt sent to AI after template rendering)
-    rendered_prompt: Mapped[str | None] = mapped_column(Text, nullable=True, comment='Rendered prompt sent to AI')
+    # Rendered prompt (the actual prompt sent to AI after template rendering), stored once in
+    # t_rendered_prompt and referenced by hash; read and assign it through `rendered_prompt`.
+    # The inline column only holds rows written before the store existed.
+    rendered_prompt_hash: Mapped[str | None] = mapped_column(String(64), nullable=True,
+                                                             comment='SHA-256 of the rendered prompt in t_rendered_prompt')
+    rendered_prompt_text: Mapped[str | None] = mapped_column('rendered_prompt', Text, nullable=True,
+                                                             comment='Rendered prompt sent to AI (legacy rows)')
 
     # Metadata
     model_name: Mapped[str | None] = mapped_column(String(64), nullable=True, comment='AI model used (e.g., gpt-4, claude-3)')
@@ -42,3 +57,36 @@ class Conversation(Base):
     # Timestamps
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    @property
+    def rendered_prompt(self) -> str | None:
+        pending = self.__dict__.get("_pending_rendered_prompt")
+        if pending is not None:
+            return pending
+        if self.rendered_prompt_hash is None:
+            return self.rendered_prompt_text
+        db = object_session(self)
+        if db is None:
+            return cached_text(self.rendered_prompt_hash)
+        return load_texts(db, [self.rendered_prompt_hash]).get(self.rendered_prompt_hash)
+
+    @rendered_prompt.setter
+    def rendered_prompt(self, value: str | None) -> None:
+        self.rendered_prompt_text = None
+        if value is None:
+            self.rendered_prompt_hash = None
+            self.__dict__.pop("_pending_rendered_prompt", None)
+        else:
+            self.rendered_prompt_hash = content_hash(value)
+            self.__dict__["_pending_rendered_prompt"] = value
+
+
+@event.listens_for(Session, "before_flush")
+def _store_rendered_prompts(session, flush_context, instances):
+    """Write the rendered prompts of new or changed conversations ahead of the rows that reference them"""
+    texts = {}
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Conversation) and "_pending_rendered_prompt" in obj.__dict__:
+            texts[obj.rendered_prompt_hash] = obj.__dict__.pop("_pending_rendered_prompt")
+    if texts:
+        store_texts(session, texts)
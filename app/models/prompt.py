@@ -1,15 +1,21 @@
 from datetime import datetime
-from sqlalchemy import BigInteger, String, Text, Boolean, DateTime, JSON, UniqueConstraint
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import BigInteger, Integer, String, Text, Boolean, DateTime, JSON, Index, UniqueConstraint, event
+from sqlalchemy.orm import Mapped, mapped_column, validates
+from sqlalchemy.orm.attributes import set_committed_value
 from app.db.base import Base
+from app.models.schemas import is_canonical_variables_meta, normalize_variables_meta
 
 class Prompt(Base):
     __tablename__ = "t_prompt"
     __table_args__ = (
-        UniqueConstraint('name', 'version', name='uq_prompt_name_version'),
+        UniqueConstraint('tenant', 'name', 'version', name='uq_prompt_tenant_name_version'),
+        # Keyset pagination of the Prompt Manager listing (PromptService.list_prompt_page)
+        Index('idx_prompt_listing', 'tenant', 'is_enabled', 'updated_at', 'id'),
     )
 
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    tenant: Mapped[str] = mapped_column(String(64), default="default", server_default="default", nullable=False,
+                                        comment='Tenant namespace; names and versions are unique per tenant')
     name: Mapped[str] = mapped_column(String(128), nullable=False, comment='Prompt identifier (can have multiple versions)')
     display_name: Mapped[str] = mapped_column(String(128), nullable=False, comment='Display name')
     description: Mapped[str | None] = mapped_column(String(255), nullable=True, comment='Description')
@@ -24,3 +30,16 @@ class Prompt(Base):
     is_enabled: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    @validates("variables_meta")
+    def _normalize_variables_meta(self, key, value):
+        return normalize_variables_meta(value)
+
+
+@event.listens_for(Prompt, "load")
+@event.listens_for(Prompt, "refresh")
+def _normalize_loaded_variables_meta(prompt, context, attrs=None):
+    """Present rows not yet migrated in canonical form, without marking them dirty"""
+    meta = prompt.__dict__.get("variables_meta")
+    if "variables_meta" in prompt.__dict__ and not is_canonical_variables_meta(meta):
+        set_committed_value(prompt, "variables_meta", normalize_variables_meta(meta))
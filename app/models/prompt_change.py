@@ -0,0 +1,19 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, Integer, String, DateTime, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class PromptChange(Base):
+    """Append-only log of prompt mutations, written in the same transaction as the change."""
+    __tablename__ = "t_prompt_change"
+    __table_args__ = (
+        Index('idx_change_created_at', 'created_at'),
+    )
+
+    seq: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    tenant: Mapped[str] = mapped_column(String(64), default="default", server_default="default", nullable=False,
+                                        comment='Tenant namespace')
+    name: Mapped[str] = mapped_column(String(128), nullable=False, comment='Prompt name')
+    version: Mapped[str] = mapped_column(String(32), nullable=False, comment='Prompt version')
+    op: Mapped[str] = mapped_column(String(16), nullable=False, comment='create / update / delete / restore')
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
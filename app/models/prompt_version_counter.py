@@ -0,0 +1,13 @@
+from datetime import datetime
+from sqlalchemy import Integer, String, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+class PromptVersionCounter(Base):
+    """Last allocated vN per prompt; bumped with one UPDATE so concurrent writers get distinct versions."""
+    __tablename__ = "t_prompt_version_counter"
+
+    tenant: Mapped[str] = mapped_column(String(64), primary_key=True, comment='Tenant namespace')
+    name: Mapped[str] = mapped_column(String(128), primary_key=True, comment='Prompt name')
+    last_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0, comment='Highest N of versions vN')
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
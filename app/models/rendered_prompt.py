@@ -0,0 +1,167 @@
+"""
+Content-addressed store of rendered prompts.
+
+Most turns of a prompt version render to the same system prompt, so
+t_conversation references it by SHA-256 (rendered_prompt_hash) and the
+text is stored once in t_rendered_prompt. Bodies of at least
+RENDERED_PROMPT_COMPRESS_MIN_BYTES are zstd-compressed when the optional
+``zstandard`` package is installed (RENDERED_PROMPT_COMPRESSION="zstd").
+
+`Conversation.rendered_prompt` stays a plain string attribute: assigning
+it records the hash and the text is written here when the session
+flushes; reading it resolves the hash through a process-wide cache.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import DateTime, Integer, LargeBinary, String, event, insert, select
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import Mapped, Session, mapped_column
+
+from app.db.base import Base
+from app.services.cache import LRUCache
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+ENCODING_PLAIN = "plain"
+ENCODING_ZSTD = "zstd"
+
+# hash -> text, shared by every session; bodies are immutable
+_text_cache = LRUCache(maxsize=256)
+# hashes known to be stored, so repeated prompts skip the existence check.
+# The TTL keeps it well inside prune_rendered_prompts' grace period.
+_stored_hashes = LRUCache(maxsize=4096, ttl=3600)
+# Session.info key of hashes inserted by the open transaction
+_UNCOMMITTED = "rendered_prompt_hashes"
+
+
+class RenderedPrompt(Base):
+    __tablename__ = "t_rendered_prompt"
+
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True, comment='SHA-256 of the rendered prompt')
+    encoding: Mapped[str] = mapped_column(String(8), nullable=False, default=ENCODING_PLAIN,
+                                          comment='plain (UTF-8) or zstd')
+    body: Mapped[bytes] = mapped_column(LargeBinary().with_variant(mysql.LONGBLOB(), "mysql"), nullable=False,
+                                        comment='Rendered prompt, UTF-8, possibly compressed')
+    size: Mapped[int] = mapped_column(Integer, nullable=False, comment='Uncompressed size in bytes')
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def encode_text(text: str) -> tuple[str, bytes]:
+    """(encoding, body) for ``text`` under the configured compression"""
+    raw = text.encode("utf-8")
+    if settings.RENDERED_PROMPT_COMPRESSION == ENCODING_ZSTD and len(raw) >= settings.RENDERED_PROMPT_COMPRESS_MIN_BYTES:
+        zstandard = _zstd()
+        if zstandard is None:
+            logger.debug("zstandard is not installed; storing rendered prompts uncompressed")
+        else:
+            compressed = zstandard.ZstdCompressor(level=3).compress(raw)
+            if len(compressed) < len(raw):
+                return ENCODING_ZSTD, compressed
+    return ENCODING_PLAIN, raw
+
+
+def decode_text(encoding: str, body: bytes) -> str:
+    if encoding == ENCODING_ZSTD:
+        zstandard = _zstd()
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read compressed rendered prompts")
+        body = zstandard.ZstdDecompressor().decompress(body)
+    return bytes(body).decode("utf-8")
+
+
+def _insert_ignore(db: Session):
+    """INSERT that skips rows whose hash another writer stored first"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(RenderedPrompt).on_conflict_do_nothing()
+    stmt = insert(RenderedPrompt)
+    if dialect == "mysql":
+        return stmt.prefix_with("IGNORE")
+    if dialect == "sqlite":
+        return stmt.prefix_with("OR IGNORE")
+    return stmt
+
+
+def store_texts(db: Session, texts: dict[str, str]) -> int:
+    """Store {hash: text} entries not stored yet, in ``db``'s transaction; returns rows written"""
+    pending = {h: t for h, t in texts.items() if _stored_hashes.get(h) is None}
+    if not pending:
+        return 0
+    existing = set(db.execute(
+        select(RenderedPrompt.hash).where(RenderedPrompt.hash.in_(list(pending)))
+    ).scalars())
+    rows = []
+    for hash_, text in pending.items():
+        _text_cache.set(hash_, text)
+        if hash_ not in existing:
+            encoding, body = encode_text(text)
+            rows.append({"hash": hash_, "encoding": encoding, "body": body,
+                         "size": len(text.encode("utf-8")), "created_at": datetime.utcnow()})
+    if rows:
+        db.execute(_insert_ignore(db), rows)
+        db.info.setdefault(_UNCOMMITTED, set()).update(row["hash"] for row in rows)
+    for hash_ in existing:
+        _stored_hashes.set(hash_, True)
+    return len(rows)
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_committed(session):
+    for hash_ in session.info.pop(_UNCOMMITTED, ()):
+        _stored_hashes.set(hash_, True)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    session.info.pop(_UNCOMMITTED, None)
+
+
+def cached_text(hash_: str) -> str | None:
+    """Text for ``hash_`` if this process has seen it (for rows outside a session)"""
+    return _text_cache.get(hash_)
+
+
+def load_texts(db: Session, hashes: Iterable[str]) -> dict[str, str]:
+    """{hash: text} for every stored hash in ``hashes``"""
+    found, missing = {}, []
+    for hash_ in set(hashes):
+        text = _text_cache.get(hash_)
+        if text is None:
+            missing.append(hash_)
+        else:
+            found[hash_] = text
+    if missing:
+        rows = db.execute(
+            select(RenderedPrompt.hash, RenderedPrompt.encoding, RenderedPrompt.body)
+            .where(RenderedPrompt.hash.in_(missing))
+        ).all()
+        for hash_, encoding, body in rows:
+            found[hash_] = decode_text(encoding, body)
+            _text_cache.set(hash_, found[hash_])
+    return found
+
+
+def prune_rendered_prompts(db: Session, grace: float = 86400) -> int:
+    """Delete stored prompts no conversation references any more (older than ``grace`` seconds)"""
+    from app.models.conversation import Conversation
+    referenced = select(Conversation.rendered_prompt_hash).where(Conversation.rendered_prompt_hash.is_not(None))
+    result = db.execute(
+        RenderedPrompt.__table__.delete().where(
+            RenderedPrompt.created_at < datetime.utcnow() - timedelta(seconds=grace),
+            RenderedPrompt.hash.not_in(referenced),
+        )
+    )
+    db.commit()
+    return result.rowcount
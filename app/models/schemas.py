@@ -1,6 +1,109 @@
+import hashlib
+import json
 from typing import Any, Literal, Optional
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+
+
+def content_hash(text: str) -> str:
+    """Stable SHA-256 hex digest used to key compiled templates and ETags."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# Stored variables_meta is JSON Schema carrying this marker. Rows written
+# before it (legacy list format, or unmarked schemas) are normalized when
+# loaded and rewritten by scripts/migrate_normalize_variables_meta.py.
+VARIABLES_META_VERSION_KEY = "x-schema-version"
+VARIABLES_META_VERSION = 1
+
+
+def is_canonical_variables_meta(meta: Any) -> bool:
+    return isinstance(meta, dict) and meta.get(VARIABLES_META_VERSION_KEY) == VARIABLES_META_VERSION
+
+
+def normalize_variables_meta(meta: Any) -> dict:
+    """Canonical JSON Schema form of variables_meta (idempotent).
+
+    None/empty become an object schema without properties; the legacy list
+    format [{"name", "type", "description", "default", "choices", "required"}]
+    becomes "properties" (non-empty choices as "enum") plus "required".
+    """
+    if is_canonical_variables_meta(meta):
+        return meta
+    if isinstance(meta, list):
+        properties = {}
+        required = []
+        for item in meta:
+            prop = {"type": item.get("type", "string"), "description": item.get("description", "")}
+            if "default" in item:
+                prop["default"] = item["default"]
+            if item.get("choices"):
+                prop["enum"] = list(item["choices"])
+            properties[item["name"]] = prop
+            if item.get("required"):
+                required.append(item["name"])
+        schema = {"type": "object", "properties": properties}
+        if required:
+            schema["required"] = required
+    elif isinstance(meta, dict):
+        schema = dict(meta)
+        schema.setdefault("type", "object")
+        schema.setdefault("properties", {})
+    else:
+        schema = {"type": "object", "properties": {}}
+    schema[VARIABLES_META_VERSION_KEY] = VARIABLES_META_VERSION
+    return schema
+
+
+# Prompt Schemas
+class PromptSnapshot(BaseModel):
+    """Immutable, session-independent copy of one prompt version.
+
+    Safe to cache and share across threads/requests, unlike the ORM row.
+    """
+    id: int
+    tenant: str = "default"
+    name: str
+    display_name: str
+    description: Optional[str] = None
+    version: str
+    template: str
+    variables_meta: Optional[Any] = None
+    is_enabled: bool = True
+    created_at: datetime
+    updated_at: datetime
+    template_hash: str = Field(..., description="SHA-256 of the template source")
+    etag: str = Field(..., description="Validator keyed by tenant, version, template and variables metadata")
+
+    class Config:
+        frozen = True
+
+    @field_validator("variables_meta")
+    @classmethod
+    def _canonical_meta(cls, value: Any) -> dict:
+        # Snapshots from older API servers or snapshot files may predate the marker
+        return normalize_variables_meta(value)
+
+    @classmethod
+    def from_prompt(cls, prompt: Any) -> "PromptSnapshot":
+        template_hash = content_hash(prompt.template)
+        meta_json = json.dumps(prompt.variables_meta, sort_keys=True, default=str)
+        etag = content_hash(f"{prompt.tenant}\0{prompt.name}\0{prompt.version}\0{template_hash}\0{meta_json}")[:32]
+        return cls(
+            id=prompt.id,
+            tenant=prompt.tenant,
+            name=prompt.name,
+            display_name=prompt.display_name,
+            description=prompt.description,
+            version=prompt.version,
+            template=prompt.template,
+            variables_meta=prompt.variables_meta,
+            is_enabled=prompt.is_enabled,
+            created_at=prompt.created_at,
+            updated_at=prompt.updated_at,
+            template_hash=template_hash,
+            etag=f'"{etag}"',
+        )
 
 
 # Conversation Schemas
@@ -37,5 +140,8 @@ class ConversationQuery(BaseModel):
     user_id: Optional[str] = None
     session_id: Optional[str] = None
     model_name: Optional[str] = None
+    # Bounding created_at lets MySQL skip the monthly partitions outside the range
+    created_after: Optional[datetime] = Field(None, description="Only records created at or after this time")
+    created_before: Optional[datetime] = Field(None, description="Only records created before this time")
     limit: int = Field(100, ge=1, le=1000, description="Maximum number of records to return")
     offset: int = Field(0, ge=0, description="Number of records to skip")
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU cache with an optional per-entry TTL (seconds)."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0.0
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the cached value, computing and storing it on a miss.
+
+        ``factory`` runs outside the lock, so concurrent misses may compute
+        the value more than once; the last writer wins.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[0]
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches ``predicate``. Returns the count."""
+        with self._lock:
+            keys = [k for k in self._data if predicate(k)]
+            for k in keys:
+                del self._data[k]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class PartitionedCache:
+    """One LRUCache per partition (e.g. tenant), each with its own size limit.
+
+    A partition filling up only evicts its own entries, so one busy tenant
+    cannot push another tenant's hot entries out. ``limits`` overrides
+    ``maxsize`` for named partitions. At most ``max_partitions`` partitions
+    are kept; creating another drops the least recently used one.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None, limits: dict[str, int] | None = None,
+                 max_partitions: int | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.limits = dict(limits or {})
+        self.max_partitions = max_partitions
+        self._partitions: OrderedDict[str, LRUCache] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def partition(self, name: str) -> LRUCache:
+        with self._lock:
+            cache = self._partitions.get(name)
+            if cache is None:
+                cache = LRUCache(maxsize=self.limits.get(name, self.maxsize), ttl=self.ttl)
+                self._partitions[name] = cache
+                if self.max_partitions is not None and len(self._partitions) > self.max_partitions:
+                    self._partitions.popitem(last=False)
+            else:
+                self._partitions.move_to_end(name)
+        return cache
+
+    def partitions(self) -> dict[str, LRUCache]:
+        return dict(self._partitions)
+
+    def invalidate(self, predicate: Callable[[Hashable], bool], partition: str | None = None) -> int:
+        """Drop matching entries from one partition, or from all of them"""
+        caches = [self.partition(partition)] if partition is not None else list(self._partitions.values())
+        return sum(cache.invalidate(predicate) for cache in caches)
+
+    def clear(self, partition: str | None = None) -> None:
+        if partition is not None:
+            self.partition(partition).clear()
+            return
+        for cache in list(self._partitions.values()):
+            cache.clear()
+
+    def __len__(self) -> int:
+        return sum(len(cache) for cache in list(self._partitions.values()))
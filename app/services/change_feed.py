@@ -0,0 +1,189 @@
+"""
+Change feed over t_prompt_change.
+
+Every PromptService mutation appends a (seq, tenant, name, version, op) row
+in the same transaction, so a process can follow the feed from a cursor and
+invalidate exactly the prompts that changed elsewhere:
+
+    subscriber = ChangeSubscriber(ChangeFeed(), invalidate_local_caches).start()
+
+seq is an auto-increment value assigned at insert time, but transactions
+commit in any order: a cursor can pass a seq whose row is not visible yet.
+The subscriber remembers such gaps and re-reads them on later polls until
+the row shows up or the gap times out (rolled back, or a skipped value).
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, Iterator
+
+from sqlalchemy import delete, func, select
+
+from app.models.prompt_change import PromptChange
+from app.services.template_engine import invalidate_prompt_caches
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class ChangeEvent:
+    seq: int
+    name: str
+    version: str
+    op: str
+    created_at: datetime
+    tenant: str = "default"
+
+
+class ChangeFeed:
+    def __init__(self, session_factory: Callable | None = None):
+        if session_factory is None:
+            from app.db.session import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+
+    def head(self) -> int:
+        """Current highest sequence number (0 for an empty feed)."""
+        db = self.session_factory()
+        try:
+            return db.execute(select(func.max(PromptChange.seq))).scalar() or 0
+        finally:
+            db.close()
+
+    def poll(self, cursor: int, limit: int = 500) -> list[ChangeEvent]:
+        """Events with seq > cursor, oldest first."""
+        db = self.session_factory()
+        try:
+            rows = db.execute(
+                select(PromptChange.seq, PromptChange.name, PromptChange.version,
+                       PromptChange.op, PromptChange.created_at, PromptChange.tenant)
+                .where(PromptChange.seq > cursor)
+                .order_by(PromptChange.seq)
+                .limit(limit)
+            ).all()
+            return [ChangeEvent(*row) for row in rows]
+        finally:
+            db.close()
+
+    def fetch(self, seqs: Iterable[int]) -> list[ChangeEvent]:
+        """Events with the given sequence numbers that exist by now, oldest first."""
+        seqs = list(seqs)
+        if not seqs:
+            return []
+        db = self.session_factory()
+        try:
+            rows = db.execute(
+                select(PromptChange.seq, PromptChange.name, PromptChange.version,
+                       PromptChange.op, PromptChange.created_at, PromptChange.tenant)
+                .where(PromptChange.seq.in_(seqs))
+                .order_by(PromptChange.seq)
+            ).all()
+            return [ChangeEvent(*row) for row in rows]
+        finally:
+            db.close()
+
+    def stream(self, cursor: int, limit: int = 500) -> Iterator[ChangeEvent]:
+        """Drain every event after ``cursor`` page by page."""
+        while True:
+            events = self.poll(cursor, limit)
+            yield from events
+            if len(events) < limit:
+                return
+            cursor = events[-1].seq
+
+    def prune(self, older_than: timedelta) -> int:
+        """Delete events older than ``older_than``. Returns the number removed."""
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                delete(PromptChange).where(PromptChange.created_at < datetime.utcnow() - older_than)
+            )
+            db.commit()
+            return result.rowcount
+        finally:
+            db.close()
+
+
+def invalidate_local_caches(events: Iterable[ChangeEvent]) -> None:
+    """Default subscriber callback: drop cached snapshots of every changed prompt."""
+    names_by_tenant: dict[str, set[str]] = {}
+    for e in events:
+        names_by_tenant.setdefault(e.tenant, set()).add(e.name)
+    for tenant, names in names_by_tenant.items():
+        invalidate_prompt_caches(names, tenant)
+
+
+class ChangeSubscriber:
+    """Polls the feed in a background thread and hands new events to ``callback``.
+
+    Sequence numbers skipped by the cursor are re-read for up to
+    ``gap_timeout`` seconds (at most ``max_gaps`` of them), so changes
+    committed out of seq order are still delivered.
+    """
+
+    def __init__(self,
+                 feed: ChangeFeed,
+                 callback: Callable[[list[ChangeEvent]], None],
+                 interval: float = 1.0,
+                 cursor: int | None = None,
+                 gap_timeout: float = 60.0,
+                 max_gaps: int = 1000):
+        self.feed = feed
+        self.callback = callback
+        self.interval = interval
+        self.cursor = cursor
+        self.gap_timeout = gap_timeout
+        self.max_gaps = max_gaps
+        # seq -> monotonic time it was first skipped
+        self._gaps: dict[int, float] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> "ChangeSubscriber":
+        if self.cursor is None:
+            # Start from "now": anything cached after this point is fresh
+            self.cursor = self.feed.head()
+        self._thread = threading.Thread(target=self._run, name="prompt-change-feed", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+
+    def poll_once(self) -> int:
+        now = time.monotonic()
+        filled = []
+        if self._gaps:
+            filled = self.feed.fetch(sorted(self._gaps))
+            for event in filled:
+                del self._gaps[event.seq]
+            self._gaps = {seq: since for seq, since in self._gaps.items() if now - since < self.gap_timeout}
+
+        events = list(self.feed.stream(self.cursor))
+        expected = self.cursor + 1
+        for event in events:
+            for seq in range(max(expected, event.seq - self.max_gaps), event.seq):
+                self._gaps[seq] = now
+            expected = event.seq + 1
+        if len(self._gaps) > self.max_gaps:
+            # Keep the newest gaps; the oldest are the least likely to fill
+            self._gaps = dict(sorted(self._gaps.items())[-self.max_gaps:])
+
+        delivered = filled + events
+        if delivered:
+            self.callback(delivered)
+        if events:
+            self.cursor = events[-1].seq
+        return len(delivered)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.warning(f"Change feed poll failed: {e}")
@@ -0,0 +1,125 @@
+def merge_variables_schemas(metas, labels):
+    """
+    一次合并 K 个Prompt的变量元数据
+
+    策略（与两路合并一致）：
+    1. 变量只在部分Prompt中出现，或各处类型相同：合并为一个字段（使用第一个定义，补全description）
+    2. 变量名相同但类型不同：每个定义它的Prompt重命名为 {name}_{label}
+
+    先扫描一遍收集每个变量的类型，再按顺序输出，总耗时与变量总数成线性关系。
+
+    返回：(merged_schema, routing, conflict_map)
+    - merged_schema: 合并后的JSON Schema
+    - routing: 每个Prompt一个 {合并后字段名: 原始变量名}，用于 distribute_to_sides
+    - conflict_map: 冲突变量映射 {original_name: {label: new_name}}
+    """
+    schemas = [meta or {} for meta in metas]
+
+    # 第一遍：收集每个变量名出现过的类型
+    types = {}
+    for schema in schemas:
+        for name, prop in schema.get("properties", {}).items():
+            types.setdefault(name, set()).add(prop.get("type"))
+
+    # 第二遍：按Prompt顺序输出字段
+    merged_properties = {}
+    conflict_map = {}
+    routing = []
+    for schema, label in zip(schemas, labels):
+        side_routing = {}
+        for name, prop in schema.get("properties", {}).items():
+            if len(types[name]) == 1:
+                if name not in merged_properties:
+                    merged_properties[name] = prop.copy()
+                elif prop.get("description") and not merged_properties[name].get("description"):
+                    merged_properties[name]["description"] = prop.get("description")
+                side_routing[name] = name
+            else:
+                # 类型冲突，重命名
+                new_name = f"{name}_{label}"
+                merged_properties[new_name] = prop.copy()
+                merged_properties[new_name]["description"] = f"[{label.capitalize()}] {prop.get('description', name)}"
+                conflict_map.setdefault(name, {})[label] = new_name
+                side_routing[new_name] = name
+        routing.append(side_routing)
+
+    # 合并required字段，保持顺序去重；冲突变量替换为所有重命名后的名字
+    merged_required = {}
+    for schema in schemas:
+        for name in schema.get("required", []):
+            for required_name in conflict_map[name].values() if name in conflict_map else (name,):
+                merged_required[required_name] = None
+
+    merged_schema = {
+        "type": "object",
+        "properties": merged_properties,
+        "required": list(merged_required)
+    }
+
+    return merged_schema, routing, conflict_map
+
+
+def distribute_to_sides(variables, routing):
+    """
+    根据 merge_variables_schemas 返回的 routing 把变量分发到每个Prompt
+
+    返回：每个Prompt一个变量字典（使用原始变量名）
+    """
+    return [
+        {original: variables[field] for field, original in side_routing.items() if field in variables}
+        for side_routing in routing
+    ]
+
+
+def merge_variables_meta(left_meta, right_meta):
+    """
+    合并两个Prompt的变量元数据（merge_variables_schemas 的两路版本）
+
+    策略：
+    1. 变量名不冲突：直接合并
+    2. 变量名相同且类型相同：保留一个（使用左侧定义）
+    3. 变量名相同但类型不同：重命名为 {name}_left 和 {name}_right
+
+    返回：(merged_schema, conflict_map)
+    - merged_schema: 合并后的JSON Schema
+    - conflict_map: 冲突变量映射 {original_name: {'left': new_name, 'right': new_name}}
+    """
+    merged_schema, _, conflict_map = merge_variables_schemas([left_meta, right_meta], ["left", "right"])
+    return merged_schema, conflict_map
+
+
+def distribute_variables(variables, conflict_map, left_props, right_props):
+    """
+    根据冲突映射分发变量到左右两侧
+
+    返回：(left_variables, right_variables)
+    """
+    left_variables = {}
+    right_variables = {}
+
+    # 处理冲突变量
+    renamed = set()
+    for orig_name, mapping in conflict_map.items():
+        if 'left' in mapping:
+            renamed.add(mapping['left'])
+            if mapping['left'] in variables:
+                left_variables[orig_name] = variables[mapping['left']]
+        if 'right' in mapping:
+            renamed.add(mapping['right'])
+            if mapping['right'] in variables:
+                right_variables[orig_name] = variables[mapping['right']]
+
+    # 处理非冲突变量
+    for name, value in variables.items():
+        # 跳过已处理的冲突变量
+        if name in renamed:
+            continue
+
+        # 根据原始schema判断归属
+        original_name = name.replace('_left', '').replace('_right', '')
+        if name in left_props or original_name in left_props:
+            left_variables[original_name if original_name in left_props else name] = value
+        if name in right_props or original_name in right_props:
+            right_variables[original_name if original_name in right_props else name] = value
+
+    return left_variables, right_variables
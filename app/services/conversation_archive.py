@@ -0,0 +1,254 @@
+"""
+Monthly partitions of t_conversation, retention and archival.
+
+On MySQL, t_conversation is RANGE-partitioned by the month of created_at
+(scripts/migrate_partition_conversation_table.py):
+
+    p202601   created_at < 2026-02-01
+    p202602   created_at < 2026-03-01
+    ...
+    pmax      anything later; kept empty by ensure()
+
+Queries that bound created_at only read the matching partitions, and
+expiring a month is a metadata-only DROP PARTITION instead of a long
+DELETE. Before a month is dropped its rows are archived to one gzip JSONL
+file per month, with rendered prompts resolved from t_rendered_prompt.
+Other databases have no partitions: retention deletes the month's rows
+in batches instead. Stored rendered prompts no remaining row references
+are pruned afterwards.
+
+    apply_retention(engine, keep_months=12, archive_dir="archive/conversations")
+"""
+import gzip
+import json
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.conversation import Conversation
+from app.models.rendered_prompt import load_texts, prune_rendered_prompts
+
+TABLE = "t_conversation"
+_PARTITION_RE = re.compile(r"^p(\d{4})(\d{2})$")
+
+
+def month_floor(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"p{month:%Y%m}"
+
+
+def partition_definitions(first: datetime, last: datetime) -> list[str]:
+    """PARTITION clauses for every month from ``first`` to ``last`` inclusive"""
+    month, clauses = month_floor(first), []
+    while month <= last:
+        clauses.append(f"PARTITION {partition_name(month)} "
+                       f"VALUES LESS THAN (TO_DAYS('{add_months(month, 1):%Y-%m-%d}'))")
+        month = add_months(month, 1)
+    return clauses
+
+
+def partitioning_ddl(first: datetime, last: datetime) -> str:
+    """ALTER TABLE statement that partitions t_conversation by month (MySQL)"""
+    clauses = partition_definitions(first, last) + ["PARTITION pmax VALUES LESS THAN MAXVALUE"]
+    return f"ALTER TABLE {TABLE} PARTITION BY RANGE (TO_DAYS(created_at)) (\n    " + ",\n    ".join(clauses) + "\n)"
+
+
+class ConversationPartitions:
+    """Monthly partitions of t_conversation; a no-op on databases without partitioning"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    @property
+    def supported(self) -> bool:
+        return self.engine.dialect.name == "mysql"
+
+    def partition_names(self) -> list[str]:
+        """All partitions of t_conversation in order, pmax included (empty when not partitioned)"""
+        if not self.supported:
+            return []
+        with self.engine.connect() as conn:
+            return conn.execute(text(
+                "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL "
+                "ORDER BY PARTITION_ORDINAL_POSITION"
+            ), {"table": TABLE}).scalars().all()
+
+    def months(self) -> list[datetime]:
+        """Months that have their own partition, oldest first (empty when not partitioned)"""
+        found = []
+        for name in self.partition_names():
+            match = _PARTITION_RE.match(name)
+            if match:
+                found.append(datetime(int(match.group(1)), int(match.group(2)), 1))
+        return found
+
+    def ensure(self, months_ahead: int = 3, now: datetime | None = None) -> list[str]:
+        """Split pmax so every month up to ``months_ahead`` from now has a partition.
+
+        Run it well ahead of time: pmax is empty then and the split is instant.
+        On a table that only has pmax (db/schema.sql), monthly partitions start
+        at the oldest row's month, or the current month when the table is empty.
+        """
+        names = self.partition_names()
+        if "pmax" not in names:
+            return []
+        now = now or datetime.utcnow()
+        months = self.months()
+        if months:
+            first = add_months(months[-1], 1)
+        else:
+            with self.engine.connect() as conn:
+                oldest = conn.execute(select(func.min(Conversation.created_at))).scalar()
+            first = month_floor(oldest or now)
+        last = add_months(month_floor(now), months_ahead)
+        clauses = partition_definitions(first, last)
+        if not clauses:
+            return []
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                f"ALTER TABLE {TABLE} REORGANIZE PARTITION pmax INTO (\n    "
+                + ",\n    ".join(clauses + ["PARTITION pmax VALUES LESS THAN MAXVALUE"]) + "\n)"
+            ))
+        return [clause.split()[1] for clause in clauses]
+
+    def drop(self, months: list[datetime]) -> None:
+        if not months:
+            return
+        with self.engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {TABLE} DROP PARTITION "
+                              + ", ".join(partition_name(month) for month in months)))
+
+
+def _month_filter(month: datetime):
+    return (Conversation.created_at >= month) & (Conversation.created_at < add_months(month, 1))
+
+
+def archive_path(directory: str, month: datetime) -> str:
+    return os.path.join(directory, f"{TABLE}-{month:%Y-%m}.jsonl.gz")
+
+
+def archive_month(db: Session, month: datetime, directory: str, batch_size: int = 5000) -> tuple[str, int]:
+    """Write every row of ``month`` to <directory>/t_conversation-YYYY-MM.jsonl.gz; returns (path, rows).
+
+    Rows are read in id order with keyset pagination, each batch bounded
+    by the month so MySQL only reads that partition. The file is written
+    under a temporary name and renamed when complete.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = archive_path(directory, month)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    columns = list(Conversation.__table__.columns)
+    rows, last_id = 0, 0
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        while True:
+            batch = db.execute(
+                select(*columns).where(_month_filter(month), Conversation.id > last_id)
+                .order_by(Conversation.id).limit(batch_size)
+            ).mappings().all()
+            if not batch:
+                break
+            texts = load_texts(db, [row["rendered_prompt_hash"] for row in batch if row["rendered_prompt_hash"]])
+            for row in batch:
+                record = dict(row)
+                if record["rendered_prompt_hash"]:
+                    record["rendered_prompt"] = texts.get(record["rendered_prompt_hash"])
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            rows += len(batch)
+            last_id = batch[-1]["id"]
+    os.replace(tmp_path, path)
+    return path, rows
+
+
+def _delete_month(db: Session, month: datetime, batch_size: int) -> int:
+    deleted = 0
+    while True:
+        ids = db.execute(
+            select(Conversation.id).where(_month_filter(month)).order_by(Conversation.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return deleted
+        db.execute(delete(Conversation).where(Conversation.id.in_(ids)))
+        db.commit()
+        deleted += len(ids)
+
+
+@dataclass
+class RetentionResult:
+    month: datetime
+    rows: int
+    archive: str | None
+    # "drop_partition", "delete" or "dry_run"
+    action: str
+
+
+def expired_months(engine: Engine, db: Session, keep_months: int, now: datetime | None = None) -> list[datetime]:
+    """Months entirely older than the newest ``keep_months`` (current month included)"""
+    cutoff = add_months(month_floor(now or datetime.utcnow()), -(keep_months - 1))
+    partitioned = ConversationPartitions(engine).months()
+    if partitioned:
+        return [month for month in partitioned if month < cutoff]
+    oldest = db.execute(select(func.min(Conversation.created_at))).scalar()
+    if oldest is None:
+        return []
+    months, month = [], month_floor(oldest)
+    while month < cutoff:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def apply_retention(engine: Engine,
+                    keep_months: int,
+                    archive_dir: str | None = None,
+                    dry_run: bool = False,
+                    batch_size: int = 5000,
+                    now: datetime | None = None,
+                    log: Callable[[str], None] | None = None) -> list[RetentionResult]:
+    """Archive (when ``archive_dir`` is set) and remove every expired month of t_conversation"""
+    if keep_months < 1:
+        raise ValueError("keep_months must be at least 1")
+    partitions = ConversationPartitions(engine)
+    results = []
+    db = Session(bind=engine)
+    try:
+        partitioned = bool(partitions.months())
+        for month in expired_months(engine, db, keep_months, now):
+            if dry_run or not archive_dir:
+                archive = None
+                rows = db.execute(select(func.count()).select_from(Conversation).where(_month_filter(month))).scalar()
+                if dry_run:
+                    results.append(RetentionResult(month, rows, None, "dry_run"))
+                    continue
+            else:
+                archive, rows = archive_month(db, month, archive_dir, batch_size)
+            if partitioned:
+                partitions.drop([month])
+                action = "drop_partition"
+            else:
+                rows = _delete_month(db, month, batch_size)
+                action = "delete"
+            results.append(RetentionResult(month, rows, archive, action))
+            if log:
+                log(f"{month:%Y-%m}: {action}, {rows} rows" + (f", archived to {archive}" if archive else ""))
+        if results and not dry_run:
+            pruned = prune_rendered_prompts(db)
+            if log and pruned:
+                log(f"Pruned {pruned} unreferenced rendered prompts")
+    finally:
+        db.close()
+    return results
@@ -0,0 +1,135 @@
+from datetime import datetime
+from typing import Any, Iterator, List
+from sqlalchemy import desc
+from sqlalchemy.orm import Session, load_only
+from app.models.conversation import Conversation
+from app.models.schemas import ConversationCreate, ConversationQuery
+from app.llm.metrics import CallMetrics
+from app.services.template_engine import cacheable_prefix, prefix_tracker
+from config.settings import settings
+
+
+class ConversationService:
+    """Conversation history within one tenant (DEFAULT_TENANT when not given)"""
+
+    def __init__(self, db: Session, tenant: str | None = None):
+        self.db = db
+        self.tenant = tenant or settings.DEFAULT_TENANT
+
+    def create_conversation(self, data: ConversationCreate) -> Conversation:
+        """Persist one exchange (user input + AI response)"""
+        conversation = Conversation(tenant=self.tenant, **data.model_dump())
+        self.db.add(conversation)
+        self.db.commit()
+        self.db.refresh(conversation)
+        return conversation
+
+    def record_exchange(self,
+                        prompt: Any,
+                        user_input: str,
+                        ai_response: str,
+                        rendered_prompt: str | None = None,
+                        template_variables: dict | None = None,
+                        model_name: str | None = None,
+                        temperature: float | None = None,
+                        metrics: CallMetrics | None = None,
+                        extra_metadata: dict | None = None,
+                        session_id: str | None = None,
+                        user_id: str | None = None) -> Conversation:
+        """Persist an LLM exchange for ``prompt``, attaching call metrics under metadata["llm"]
+        and the system prompt's cacheable prefix under metadata["prompt_prefix"]"""
+        metadata = dict(extra_metadata or {})
+        if rendered_prompt:
+            metadata["prompt_prefix"] = prefix_tracker.observe(
+                cacheable_prefix(prompt.template, rendered_prompt, getattr(prompt, "template_hash", None)))
+        tokens_used = None
+        if metrics is not None:
+            metadata["llm"] = metrics.as_dict()
+            if metrics.input_tokens is not None or metrics.output_tokens is not None:
+                tokens_used = (metrics.input_tokens or 0) + (metrics.output_tokens or 0)
+
+        return self.create_conversation(ConversationCreate(
+            prompt_id=prompt.id,
+            version=prompt.version,
+            user_input=user_input,
+            ai_response=ai_response,
+            template_variables=template_variables,
+            rendered_prompt=rendered_prompt,
+            model_name=model_name,
+            temperature=temperature,
+            tokens_used=tokens_used,
+            metadata=metadata or None,
+            session_id=session_id,
+            user_id=user_id,
+        ))
+
+    def list_conversations(self, query: ConversationQuery) -> List[Conversation]:
+        """List conversations matching the query, newest first"""
+        q = self.db.query(Conversation).filter(Conversation.tenant == self.tenant)
+        if query.prompt_id is not None:
+            q = q.filter(Conversation.prompt_id == query.prompt_id)
+        if query.version:
+            q = q.filter(Conversation.version == query.version)
+        if query.user_id:
+            q = q.filter(Conversation.user_id == query.user_id)
+        if query.session_id:
+            q = q.filter(Conversation.session_id == query.session_id)
+        if query.model_name:
+            q = q.filter(Conversation.model_name == query.model_name)
+        if query.created_after:
+            q = q.filter(Conversation.created_at >= query.created_after)
+        if query.created_before:
+            q = q.filter(Conversation.created_at < query.created_before)
+        return q.order_by(desc(Conversation.id)).offset(query.offset).limit(query.limit).all()
+
+    def list_session_turns(self,
+                           session_id: str,
+                           limit: int,
+                           before_id: int | None = None,
+                           prompt_id: int | None = None,
+                           since: datetime | None = None) -> List[Conversation]:
+        """The newest ``limit`` turns of a session (older than ``before_id``), oldest first.
+
+        Only loads the columns needed to redraw a chat; served by idx_session_id.
+        ``since`` limits the lookup to the partitions created after it.
+        """
+        q = self.db.query(Conversation).options(load_only(
+            Conversation.id, Conversation.prompt_id, Conversation.user_input,
+            Conversation.ai_response, Conversation.metadata, Conversation.created_at,
+        )).filter(Conversation.session_id == session_id, Conversation.tenant == self.tenant)
+        if prompt_id is not None:
+            q = q.filter(Conversation.prompt_id == prompt_id)
+        if before_id is not None:
+            q = q.filter(Conversation.id < before_id)
+        if since is not None:
+            q = q.filter(Conversation.created_at >= since)
+        rows = q.order_by(desc(Conversation.id)).limit(limit).all()
+        rows.reverse()
+        return rows
+
+    def iter_responses(self,
+                       prompt_ids: List[int] | None = None,
+                       session_ids: List[str] | None = None,
+                       batch_size: int = 5000,
+                       since: datetime | None = None) -> Iterator[list]:
+        """Yield (id, prompt_id, version, model_name, user_input, ai_response) rows in id-ordered batches.
+
+        Keyset pagination on the primary key keeps each batch an index range scan
+        however far into the table it is; ``since`` also prunes older partitions.
+        """
+        columns = (Conversation.id, Conversation.prompt_id, Conversation.version,
+                   Conversation.model_name, Conversation.user_input, Conversation.ai_response)
+        last_id = 0
+        while True:
+            q = self.db.query(*columns).filter(Conversation.id > last_id, Conversation.tenant == self.tenant)
+            if prompt_ids is not None:
+                q = q.filter(Conversation.prompt_id.in_(prompt_ids))
+            if session_ids is not None:
+                q = q.filter(Conversation.session_id.in_(session_ids))
+            if since is not None:
+                q = q.filter(Conversation.created_at >= since)
+            batch = q.order_by(Conversation.id).limit(batch_size).all()
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1].id
@@ -0,0 +1,192 @@
+"""
+Near-duplicate detection for prompt templates (MinHash + LSH).
+
+Each template is reduced to a set of word shingles, summarised by a
+MinHash signature (NUM_PERM 32-bit minima), and the signature is split
+into bands. Templates that share any band land in the same LSH bucket
+and become candidate pairs; only candidates are compared, so indexing and
+clustering stay roughly linear in the number of templates instead of
+comparing every pair.
+
+    index = SimilarityIndex()
+    index.add(("welcome", "v1"), template)
+    index.query(edited_template)        # [((name, version), similarity), ...]
+    index.clusters()                    # [[(name, version), ...], ...]
+
+With 32 bands x 4 rows the chance of becoming a candidate is >99% at
+Jaccard 0.7 and ~20% at 0.3; candidates are then kept only when their
+estimated similarity reaches ``threshold``.
+"""
+import json
+import re
+import zlib
+from typing import Hashable, Iterable
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+NUM_PERM = 128
+BANDS = 32
+SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.7
+
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_WORD_RE = re.compile(r"\w+|[^\w\s]+")
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """Distinct crc32 hashes of the word ``size``-grams of ``text`` (case and whitespace insensitive)"""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        grams = [" ".join(words)]
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return np.unique(np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams)))
+
+
+class MinHasher:
+    """MinHash over 32-bit shingle hashes with ``num_perm`` universal hash functions (a*x + b) mod p"""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(1, int(_MERSENNE_PRIME), size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, int(_MERSENNE_PRIME), size=(num_perm, 1), dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        values = shingles(text) % _MERSENNE_PRIME
+        # a, x < 2^31, so a * x + b fits in uint64
+        return ((self._a * values + self._b) % _MERSENNE_PRIME).min(axis=1).astype(np.uint32)
+
+
+def similarity(left: np.ndarray, right: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    return float(np.count_nonzero(left == right)) / len(left)
+
+
+class SimilarityIndex:
+    """MinHash signatures of keyed texts, bucketed by LSH band for sub-quadratic lookups"""
+
+    def __init__(self, num_perm: int = NUM_PERM, bands: int = BANDS, threshold: float = DEFAULT_THRESHOLD,
+                 seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.hasher = MinHasher(num_perm, seed)
+        self.bands = bands
+        self.threshold = threshold
+        self.seed = seed
+        self.keys: list[Hashable] = []
+        self._positions: dict[Hashable, int] = {}
+        self._signatures: list[np.ndarray] = []
+        self._buckets: list[dict[bytes, list[int]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _band_keys(self, signature: np.ndarray) -> list[bytes]:
+        return [band.tobytes() for band in signature.reshape(self.bands, -1)]
+
+    def add_signature(self, key: Hashable, signature: np.ndarray) -> None:
+        if key in self._positions:
+            raise ValueError(f"Duplicate key: {key!r}")
+        position = len(self.keys)
+        self.keys.append(key)
+        self._positions[key] = position
+        self._signatures.append(signature)
+        for buckets, band in zip(self._buckets, self._band_keys(signature)):
+            buckets.setdefault(band, []).append(position)
+
+    def add(self, key: Hashable, text: str) -> None:
+        self.add_signature(key, self.hasher.signature(text))
+
+    def _candidates(self, signature: np.ndarray) -> set[int]:
+        found = set()
+        for buckets, band in zip(self._buckets, self._band_keys(signature)):
+            found.update(buckets.get(band, ()))
+        return found
+
+    def query(self, text: str, threshold: float | None = None, limit: int = 10,
+              exclude: Iterable[Hashable] = ()) -> list[tuple[Hashable, float]]:
+        """Indexed keys whose text is near-identical to ``text``, most similar first"""
+        threshold = self.threshold if threshold is None else threshold
+        signature = self.hasher.signature(text)
+        excluded = set(exclude)
+        matches = []
+        for position in self._candidates(signature):
+            key = self.keys[position]
+            if key in excluded:
+                continue
+            score = similarity(signature, self._signatures[position])
+            if score >= threshold:
+                matches.append((key, score))
+        matches.sort(key=lambda match: -match[1])
+        return matches[:limit]
+
+    def pairs(self, threshold: float | None = None) -> list[tuple[Hashable, Hashable, float]]:
+        """All near-duplicate pairs, found through shared LSH buckets only"""
+        threshold = self.threshold if threshold is None else threshold
+        candidates = set()
+        for buckets in self._buckets:
+            for members in buckets.values():
+                if len(members) > 1:
+                    candidates.update((members[i], other) for i in range(len(members)) for other in members[i + 1:])
+        found = []
+        for left, right in candidates:
+            score = similarity(self._signatures[left], self._signatures[right])
+            if score >= threshold:
+                found.append((self.keys[left], self.keys[right], score))
+        found.sort(key=lambda pair: -pair[2])
+        return found
+
+    def clusters(self, threshold: float | None = None) -> list[list[Hashable]]:
+        """Connected groups of near-duplicates (size >= 2), largest first"""
+        parent = list(range(len(self.keys)))
+
+        def root(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for left, right, _ in self.pairs(threshold):
+            parent[root(self._positions[left])] = root(self._positions[right])
+        groups: dict[int, list[Hashable]] = {}
+        for position, key in enumerate(self.keys):
+            groups.setdefault(root(position), []).append(key)
+        return sorted((g for g in groups.values() if len(g) > 1), key=len, reverse=True)
+
+    def save(self, path: str) -> None:
+        """Write signatures and keys (JSON-serialisable, e.g. (name, version)) to an .npz file"""
+        signatures = np.vstack(self._signatures) if self._signatures else np.zeros((0, self.hasher.num_perm), np.uint32)
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f, signatures=signatures, keys=np.array(json.dumps([list(k) if isinstance(k, tuple) else k
+                                                                     for k in self.keys])),
+                params=np.array([self.hasher.num_perm, self.bands, self.seed]), threshold=np.array(self.threshold),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "SimilarityIndex":
+        with np.load(path) as data:
+            num_perm, bands, seed = (int(v) for v in data["params"])
+            index = cls(num_perm, bands, float(data["threshold"]), seed)
+            keys = json.loads(str(data["keys"]))
+            for key, signature in zip(keys, data["signatures"]):
+                index.add_signature(tuple(key) if isinstance(key, list) else key, signature)
+        return index
+
+
+def build_prompt_index(db: Session, threshold: float = DEFAULT_THRESHOLD,
+                       include_disabled: bool = False, tenant: str | None = None) -> SimilarityIndex:
+    """Index every prompt version's template of one tenant, keyed by (name, version)"""
+    from app.models.prompt import Prompt
+    from config.settings import settings
+
+    index = SimilarityIndex(threshold=threshold)
+    query = db.query(Prompt.name, Prompt.version, Prompt.template).filter(
+        Prompt.tenant == (tenant or settings.DEFAULT_TENANT))
+    if not include_disabled:
+        query = query.filter(Prompt.is_enabled == True)
+    for name, version, template in query.order_by(Prompt.id).yield_per(1000):
+        index.add((name, version), template)
+    return index
@@ -0,0 +1,322 @@
+"""
+Local, dependency-light scoring of LLM responses (NumPy only).
+
+`score_responses()` computes per-row metrics for a batch of responses,
+optionally against reference answers and an expected JSON schema:
+
+    length_chars, length_tokens     always
+    exact_match, token_f1           with a reference (SQuAD-style normalisation)
+    bleu                            sentence BLEU-4, add-one smoothing for n > 1
+    rouge1, rouge2                  ROUGE-N F1
+    json_valid                      with a schema (see `validate_json`)
+
+Reference-based metrics are NaN for rows without a reference. N-gram
+overlap is computed for the whole batch at once: n-grams are hashed and
+packed with their row index into one uint64 key, and clipped counts come
+from np.unique / np.searchsorted / np.bincount instead of per-row Counters.
+
+`EvaluationSummary` aggregates batches per group (e.g. version · model), so
+thousands of t_conversation rows can be scored in bounded memory with
+`evaluate_conversations()`.
+"""
+import json
+import re
+from itertools import chain
+from typing import Any, Hashable, Iterable, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+MAX_ORDER = 4
+# ASCII words/numbers, or any other single word character (one token per CJK character)
+_TOKEN_RE = re.compile(r"[a-z0-9]+|[^\W_a-z0-9]")
+_FENCE_RE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", re.DOTALL)
+_HASH_MULTIPLIER = np.uint64(1000003)
+# (row, n-gram) keys: 24 bits of row index, 40 bits of n-gram hash
+_ROW_SHIFT = np.uint64(40)
+_GRAM_MASK = np.uint64((1 << 40) - 1)
+MAX_BATCH_ROWS = 1 << 24
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace (for exact match)"""
+    return " ".join(tokenize(text))
+
+
+def _encode(token_lists: Sequence[list[str]]) -> tuple[np.ndarray, np.ndarray]:
+    """Flatten token lists into (token hashes, lengths); hash() is stable within a process"""
+    lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+    ids = np.fromiter(map(hash, chain.from_iterable(token_lists)), dtype=np.int64, count=int(lengths.sum()))
+    return ids.view(np.uint64), lengths
+
+
+def _ngrams(ids: np.ndarray, lengths: np.ndarray, n: int) -> tuple[np.ndarray, np.ndarray]:
+    """(row index, hashed n-gram) for every n-gram of every row"""
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(lengths) else lengths
+    position = np.arange(len(ids)) - starts[rows]
+    valid = np.flatnonzero(position + n <= lengths[rows])
+    grams = ids[valid].copy()
+    for k in range(1, n):
+        # uint64 arithmetic wraps, which is what we want for hashing
+        grams = grams * _HASH_MULTIPLIER ^ ids[valid + k]
+    return rows[valid], grams
+
+
+def _row_keys(rows: np.ndarray, grams: np.ndarray) -> np.ndarray:
+    """Row index in the high bits, n-gram hash in the low bits: sorting groups by row"""
+    return (rows.astype(np.uint64) << _ROW_SHIFT) | (grams & _GRAM_MASK)
+
+
+def _overlap(hyp: tuple[np.ndarray, np.ndarray], ref: tuple[np.ndarray, np.ndarray], size: int) -> np.ndarray:
+    """Clipped n-gram matches per row: sum over grams of min(count in hyp, count in ref)"""
+    hyp_rows, hyp_grams = hyp
+    ref_rows, ref_grams = ref
+    if not len(hyp_grams) or not len(ref_grams):
+        return np.zeros(size)
+    hyp_unique, hyp_counts = np.unique(_row_keys(hyp_rows, hyp_grams), return_counts=True)
+    ref_unique, ref_counts = np.unique(_row_keys(ref_rows, ref_grams), return_counts=True)
+    # Both sides are sorted, so this lookup walks memory in order
+    position = np.searchsorted(ref_unique, hyp_unique).clip(max=len(ref_unique) - 1)
+    matched = np.where(ref_unique[position] == hyp_unique, np.minimum(hyp_counts, ref_counts[position]), 0)
+    return np.bincount((hyp_unique >> _ROW_SHIFT).astype(np.int64), weights=matched, minlength=size)
+
+
+def _safe_div(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    return np.divide(numerator, denominator, out=np.zeros(len(numerator)), where=denominator > 0)
+
+
+def _f1(precision: np.ndarray, recall: np.ndarray) -> np.ndarray:
+    return _safe_div(2 * precision * recall, precision + recall)
+
+
+def reference_scores(responses: Sequence[str], references: Sequence[str | None]) -> dict[str, np.ndarray]:
+    """Exact match, token F1, BLEU-4 and ROUGE-1/2 F1 for each (response, reference) pair"""
+    return _reference_scores([tokenize(r) for r in responses], references)
+
+
+def _reference_scores(hyp_tokens: list[list[str]], references: Sequence[str | None]) -> dict[str, np.ndarray]:
+    size = len(hyp_tokens)
+    if size > MAX_BATCH_ROWS:
+        raise ValueError(f"At most {MAX_BATCH_ROWS} rows per batch, got {size}")
+    has_ref = np.fromiter((r is not None for r in references), dtype=bool, count=size)
+    ref_tokens = [tokenize(r) if r is not None else [] for r in references]
+    hyp_ids, hyp_len = _encode(hyp_tokens)
+    ref_ids, ref_len = _encode(ref_tokens)
+
+    exact = np.fromiter((h == r for h, r in zip(hyp_tokens, ref_tokens)), dtype=float, count=size)
+
+    overlaps, hyp_totals, ref_totals = [], [], []
+    for n in range(1, MAX_ORDER + 1):
+        hyp = _ngrams(hyp_ids, hyp_len, n)
+        ref = _ngrams(ref_ids, ref_len, n)
+        overlaps.append(_overlap(hyp, ref, size))
+        hyp_totals.append(np.bincount(hyp[0], minlength=size).astype(float))
+        ref_totals.append(np.bincount(ref[0], minlength=size).astype(float))
+
+    precision1 = _safe_div(overlaps[0], hyp_totals[0])
+    recall1 = _safe_div(overlaps[0], ref_totals[0])
+    token_f1 = _f1(precision1, recall1)
+    # Two empty strings agree perfectly; one empty side scores 0
+    both_empty = (hyp_len == 0) & (ref_len == 0)
+    token_f1[both_empty] = 1.0
+
+    # BLEU-4: p1 unsmoothed, add-one smoothing for higher orders (Lin & Och 2004)
+    log_precision = np.log(np.where(precision1 > 0, precision1, 1e-9))
+    for n in range(1, MAX_ORDER):
+        log_precision += np.log((overlaps[n] + 1) / (hyp_totals[n] + 1))
+    brevity = np.where(hyp_len >= ref_len, 1.0, np.exp(1 - _safe_div(ref_len.astype(float), hyp_len.astype(float))))
+    bleu = np.where(precision1 > 0, brevity * np.exp(log_precision / MAX_ORDER), 0.0)
+    bleu[hyp_len == 0] = 0.0
+
+    rouge2 = _f1(_safe_div(overlaps[1], hyp_totals[1]), _safe_div(overlaps[1], ref_totals[1]))
+
+    scores = {
+        "exact_match": exact,
+        "token_f1": token_f1,
+        "bleu": bleu,
+        "rouge1": token_f1.copy(),  # ROUGE-1 F1 equals clipped unigram F1
+        "rouge2": rouge2,
+    }
+    for values in scores.values():
+        values[~has_ref] = np.nan
+    return scores
+
+
+def _extract_json(text: str) -> Any:
+    text = text.strip()
+    fenced = _FENCE_RE.match(text)
+    return json.loads(fenced.group(1) if fenced else text)
+
+
+_JSON_TYPES = {
+    "object": dict, "array": list, "string": str, "boolean": bool, "null": type(None),
+    "integer": int, "number": (int, float),
+}
+
+
+def validate_json(value: Any, schema: dict) -> bool:
+    """Check ``value`` against a JSON Schema subset: type, enum, const, required,
+    properties, additionalProperties (bool), items, min/maxItems, min/maxLength,
+    minimum/maximum. Unsupported keywords are ignored; a (sub)schema that is
+    not an object matches nothing."""
+    if not isinstance(schema, dict):
+        return False
+    expected = schema.get("type")
+    if expected is not None:
+        types = expected if isinstance(expected, list) else [expected]
+        if not any(isinstance(value, _JSON_TYPES.get(t, object)) and
+                   not (t in ("integer", "number") and isinstance(value, bool)) for t in types):
+            return False
+    if "enum" in schema and value not in schema["enum"]:
+        return False
+    if "const" in schema and value != schema["const"]:
+        return False
+    if isinstance(value, dict):
+        if any(key not in value for key in schema.get("required", [])):
+            return False
+        properties = schema.get("properties", {})
+        for key, item in value.items():
+            if key in properties:
+                if not validate_json(item, properties[key]):
+                    return False
+            elif schema.get("additionalProperties") is False:
+                return False
+    if isinstance(value, list):
+        if len(value) < schema.get("minItems", 0) or len(value) > schema.get("maxItems", len(value)):
+            return False
+        if isinstance(schema.get("items"), dict) and not all(validate_json(item, schema["items"]) for item in value):
+            return False
+    if isinstance(value, str):
+        if len(value) < schema.get("minLength", 0) or len(value) > schema.get("maxLength", len(value)):
+            return False
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if "minimum" in schema and value < schema["minimum"]:
+            return False
+        if "maximum" in schema and value > schema["maximum"]:
+            return False
+    return True
+
+
+def check_schema(schema: Any, path: str = "schema") -> None:
+    """Raise ValueError if ``schema`` or a nested subschema is not a JSON object"""
+    if not isinstance(schema, dict):
+        raise ValueError(f"{path} must be a JSON object")
+    properties = schema.get("properties", {})
+    if not isinstance(properties, dict):
+        raise ValueError(f"{path}.properties must be a JSON object")
+    for key, subschema in properties.items():
+        check_schema(subschema, f"{path}.properties.{key}")
+    if "items" in schema:
+        check_schema(schema["items"], f"{path}.items")
+
+
+def json_validity(responses: Sequence[str], schema: dict) -> np.ndarray:
+    """1.0 where the response (optionally in a ```json fence) parses and matches ``schema``"""
+    def valid(text: str) -> bool:
+        try:
+            return validate_json(_extract_json(text), schema)
+        except (ValueError, TypeError):
+            return False
+    return np.fromiter((valid(r) for r in responses), dtype=float, count=len(responses))
+
+
+def score_responses(responses: Sequence[str],
+                    references: Sequence[str | None] | None = None,
+                    schema: dict | None = None) -> dict[str, np.ndarray]:
+    """Per-row metric arrays for a batch of responses"""
+    responses = [r or "" for r in responses]
+    tokens = [tokenize(r) for r in responses]
+    scores = {
+        "length_chars": np.fromiter(map(len, responses), dtype=float, count=len(responses)),
+        "length_tokens": np.fromiter(map(len, tokens), dtype=float, count=len(responses)),
+    }
+    if references is not None and any(r is not None for r in references):
+        scores.update(_reference_scores(tokens, references))
+    if schema:
+        scores["json_valid"] = json_validity(responses, schema)
+    return scores
+
+
+class EvaluationSummary:
+    """Per-group means of score_responses() output, accumulated batch by batch"""
+
+    def __init__(self):
+        self._sums: dict[Hashable, dict[str, float]] = {}
+        self._counts: dict[Hashable, dict[str, int]] = {}
+        self._rows: dict[Hashable, int] = {}
+
+    def add(self, scores: dict[str, np.ndarray], groups: Sequence[Hashable]) -> None:
+        if not len(groups):
+            return
+        labels, inverse = np.unique(np.array(groups, dtype=object), return_inverse=True)
+        inverse = inverse.ravel()
+        rows = np.bincount(inverse, minlength=len(labels))
+        for index, label in enumerate(labels):
+            self._rows[label] = self._rows.get(label, 0) + int(rows[index])
+        for metric, values in scores.items():
+            present = ~np.isnan(values)
+            sums = np.bincount(inverse[present], weights=values[present], minlength=len(labels))
+            counts = np.bincount(inverse[present], minlength=len(labels))
+            for index in np.flatnonzero(counts):
+                label_sums = self._sums.setdefault(labels[index], {})
+                label_counts = self._counts.setdefault(labels[index], {})
+                label_sums[metric] = label_sums.get(metric, 0.0) + float(sums[index])
+                label_counts[metric] = label_counts.get(metric, 0) + int(counts[index])
+
+    def table(self) -> list[dict[str, Any]]:
+        """One row per group: {"group", "rows", <metric>: mean, ...}, best token F1 / BLEU first"""
+        table = []
+        for label, rows in self._rows.items():
+            row = {"group": label, "rows": rows}
+            for metric, total in self._sums.get(label, {}).items():
+                row[metric] = round(total / self._counts[label][metric], 4)
+            table.append(row)
+        table.sort(key=lambda r: (-r.get("token_f1", 0.0), -r.get("bleu", 0.0), str(r["group"])))
+        return table
+
+
+def parse_references(text: str) -> dict[str, str] | str | None:
+    """Reference answers as entered in the UI: a JSON object {user_input: expected}, or one plain-text answer for every row"""
+    text = (text or "").strip()
+    if not text:
+        return None
+    try:
+        parsed = json.loads(text)
+    except ValueError:
+        return text
+    if isinstance(parsed, dict):
+        return {str(k): str(v) for k, v in parsed.items()}
+    return text
+
+
+def resolve_references(user_inputs: Iterable[str], references: dict[str, str] | str | None) -> list[str | None] | None:
+    if references is None:
+        return None
+    if isinstance(references, str):
+        return [references for _ in user_inputs]
+    return [references.get(user_input) for user_input in user_inputs]
+
+
+def evaluate_conversations(db: Session,
+                           prompt_ids: Sequence[int] | None = None,
+                           session_ids: Sequence[str] | None = None,
+                           references: dict[str, str] | str | None = None,
+                           schema: dict | None = None,
+                           batch_size: int = 5000,
+                           tenant: str | None = None) -> list[dict[str, Any]]:
+    """Score one tenant's t_conversation responses in batches, summarised per "version · model"."""
+    from app.services.conversation_service import ConversationService
+
+    summary = EvaluationSummary()
+    service = ConversationService(db, tenant)
+    for batch in service.iter_responses(prompt_ids=prompt_ids, session_ids=session_ids, batch_size=batch_size):
+        scores = score_responses([row.ai_response for row in batch],
+                                 resolve_references((row.user_input for row in batch), references),
+                                 schema)
+        summary.add(scores, [f"{row.version} · {row.model_name or '-'}" for row in batch])
+    return summary.table()
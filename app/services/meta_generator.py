@@ -1,17 +1,18 @@
 import json
 from app.llm.langchain_client import LangChainClient
 
-def generate_variables_meta(template: str) -> str:
+def generate_variables_meta(template: str, tenant: str | None = None) -> str:
     """
     Generates a JSON Schema for variables in a Jinja2 template using an LLM.
     
     Args:
         template: The Jinja2 template string.
+        tenant: Tenant whose LLM quota the call uses.
         
     Returns:
         A JSON string representing the variables metadata (JSON Schema).
     """
-    client = LangChainClient(temperature=0)
+    client = LangChainClient(temperature=0, tenant=tenant)
     prompt_text = f"""You are an expert in Jinja2 templates and JSON Schema.
 Please analyze the following template and extract all variables that need to be filled.
 Generate a JSON Schema (Draft 7) that describes the structure of the input variables.
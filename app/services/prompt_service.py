@@ -1,12 +1,138 @@
-from typing import List
+import re
+from dataclasses import dataclass
+from typing import Iterable, List
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, desc, func
+from sqlalchemy import and_, or_, desc, func, insert, literal, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
 from app.models.prompt import Prompt
+from app.models.prompt_change import PromptChange
+from app.models.prompt_version_counter import PromptVersionCounter
+from app.services.template_engine import cached_prompt_page, invalidate_prompt_cache, invalidate_prompt_caches
+from config.settings import settings
 from datetime import datetime
 
+_NUMBERED_VERSION = re.compile(r"^v(\d+)$")
+# Auto-allocated versions retried after a conflict (the counter had fallen behind)
+_ALLOCATE_ATTEMPTS = 3
+
+
+class PromptVersionConflict(ValueError):
+    """The (tenant, name, version) already exists; raised instead of the database's IntegrityError"""
+
+    def __init__(self, message: str, name: str, version: str):
+        super().__init__(message)
+        self.name = name
+        self.version = version
+
+
+@dataclass(frozen=True, slots=True)
+class PromptSummary:
+    """Listing row: a prompt version without its template and variables_meta"""
+    id: int
+    name: str
+    display_name: str
+    description: str | None
+    version: str
+    updated_at: datetime
+
+
+@dataclass(frozen=True, slots=True)
+class PromptPage:
+    items: list[PromptSummary]
+    # (updated_at, id) of the last row, to pass as ``after`` for the next page; None on the last page
+    next_cursor: tuple[datetime, int] | None
+
+
 class PromptService:
-    def __init__(self, db: Session):
+    """Prompt CRUD within one tenant (DEFAULT_TENANT when not given)"""
+
+    def __init__(self, db: Session, tenant: str | None = None):
         self.db = db
+        self.tenant = tenant or settings.DEFAULT_TENANT
+
+    def _query(self, *entities):
+        """Query scoped to this service's tenant"""
+        return self.db.query(*(entities or (Prompt,))).filter(Prompt.tenant == self.tenant)
+
+    @staticmethod
+    def _matches(search: str):
+        return or_(
+            Prompt.name.ilike(f"%{search}%"),
+            Prompt.display_name.ilike(f"%{search}%")
+        )
+
+    def _record_change(self, name: str, version: str, op: str) -> None:
+        """Append a change-feed row; committed together with the mutation."""
+        self.db.add(PromptChange(tenant=self.tenant, name=name, version=version, op=op))
+
+    def _insert_version(self, prompt: Prompt, conflict_message: str) -> Prompt:
+        """INSERT first and let uq_prompt_tenant_name_version reject duplicates.
+
+        One round trip instead of SELECT-then-INSERT, and no window for a
+        concurrent writer between the check and the insert.
+        """
+        self.db.add(prompt)
+        try:
+            self.db.flush()
+        except IntegrityError:
+            self.db.rollback()
+            exists = self._query(Prompt.id).filter(Prompt.name == prompt.name, Prompt.version == prompt.version).first()
+            if exists:
+                raise PromptVersionConflict(conflict_message, prompt.name, prompt.version) from None
+            raise
+        self._advance_version_counter(prompt.name, prompt.version)
+        self._record_change(prompt.name, prompt.version, "create")
+        self.db.commit()
+        self.db.refresh(prompt)
+        invalidate_prompt_cache(prompt.name, self.tenant)
+        return prompt
+
+    def _counter_filter(self, name: str):
+        return (PromptVersionCounter.tenant == self.tenant) & (PromptVersionCounter.name == name)
+
+    def _raise_version_counter(self, name: str, number: int) -> None:
+        """Upsert the counter row so that last_version >= ``number``"""
+        raise_to = (update(PromptVersionCounter)
+                    .where(self._counter_filter(name), PromptVersionCounter.last_version < number)
+                    .values(last_version=number, updated_at=datetime.utcnow()))
+        if self.db.execute(raise_to).rowcount:
+            return
+        try:
+            with self.db.begin_nested():
+                self.db.execute(insert(PromptVersionCounter).values(
+                    tenant=self.tenant, name=name, last_version=number, updated_at=datetime.utcnow()))
+        except IntegrityError:
+            # The row exists (already high enough, or created concurrently)
+            self.db.execute(raise_to)
+
+    def _advance_version_counter(self, name: str, version: str) -> None:
+        """Keep the counter ahead of explicitly named vN versions"""
+        match = _NUMBERED_VERSION.match(version)
+        if match:
+            self._raise_version_counter(name, int(match.group(1)))
+
+    def _highest_version(self, name: str) -> int:
+        """Highest N among the existing vN versions of ``name`` (0 if none)"""
+        numbers = [int(m.group(1)) for (version,) in self._query(Prompt.version).filter(Prompt.name == name)
+                   if (m := _NUMBERED_VERSION.match(version))]
+        return max(numbers, default=0)
+
+    def allocate_version(self, name: str) -> str:
+        """Reserve the next vN of ``name`` in the current transaction.
+
+        A single UPDATE ... SET last_version = last_version + 1 on the
+        (tenant, name) counter row: concurrent writers queue on that row only
+        until their commit and each gets a distinct version. The counter is
+        seeded from existing vN versions the first time a name needs one.
+        """
+        bump = (update(PromptVersionCounter)
+                .where(self._counter_filter(name))
+                .values(last_version=PromptVersionCounter.last_version + 1, updated_at=datetime.utcnow()))
+        if self.db.execute(bump).rowcount == 0:
+            self._raise_version_counter(name, self._highest_version(name))
+            self.db.execute(bump)
+        number = self.db.execute(select(PromptVersionCounter.last_version).where(self._counter_filter(name))).scalar_one()
+        return f"v{number}"
 
     def create_prompt(self,
                       name: str,
@@ -17,16 +143,8 @@ class PromptService:
                       version: str = "v1",
                       created_by: str = "system") -> Prompt:
 
-        # Check if this specific version exists
-        existing = self.db.query(Prompt).filter(
-            Prompt.name == name,
-            Prompt.version == version
-        ).first()
-        if existing:
-            raise ValueError(f"Prompt '{name}' version '{version}' already exists.")
-
-        # Create Prompt
         new_prompt = Prompt(
+            tenant=self.tenant,
             name=name,
             display_name=display_name,
             description=description,
@@ -37,51 +155,52 @@ class PromptService:
             version=version,
             comment="Initial version" if version == "v1" else f"Version {version}"
         )
-        self.db.add(new_prompt)
-        self.db.commit()
-        self.db.refresh(new_prompt)
-        return new_prompt
+        return self._insert_version(new_prompt, f"Prompt '{name}' version '{version}' already exists.")
 
     def create_new_version(self,
                           name: str,
                           template: str,
                           variables_meta: dict,
-                          version: str,
+                          version: str | None = None,
                           comment: str | None = None,
                           created_by: str = "system") -> Prompt:
-        """Create a new version of an existing prompt"""
+        """Create a new version of an existing prompt; the next vN is allocated when ``version`` is None"""
         # Get the base prompt to copy display_name and description
-        base_prompt = self.db.query(Prompt).filter(
+        base_prompt = self._query().filter(
             Prompt.name == name
         ).order_by(desc(Prompt.created_at)).first()
 
         if not base_prompt:
             raise ValueError(f"No existing prompt found with name '{name}'")
 
-        # Check if this version already exists
-        existing = self.db.query(Prompt).filter(
-            Prompt.name == name,
-            Prompt.version == version
-        ).first()
-        if existing:
-            raise ValueError(f"Version '{version}' already exists for prompt '{name}'")
+        display_name, description = base_prompt.display_name, base_prompt.description
+        allocate = version is None
+        for attempt in range(_ALLOCATE_ATTEMPTS if allocate else 1):
+            if allocate:
+                version = self.allocate_version(name)
 
-        # Create new version
-        new_version = Prompt(
-            name=name,
-            display_name=base_prompt.display_name,
-            description=base_prompt.description,
-            template=template,
-            variables_meta=variables_meta,
-            version=version,
-            comment=comment or f"Version {version}",
-            created_by=created_by,
-            is_enabled=True
-        )
-        self.db.add(new_version)
-        self.db.commit()
-        self.db.refresh(new_version)
-        return new_version
+            # Create new version
+            new_version = Prompt(
+                tenant=self.tenant,
+                name=name,
+                display_name=display_name,
+                description=description,
+                template=template,
+                variables_meta=variables_meta,
+                version=version,
+                comment=comment or f"Version {version}",
+                created_by=created_by,
+                is_enabled=True
+            )
+            try:
+                return self._insert_version(new_version, f"Version '{version}' already exists for prompt '{name}'")
+            except PromptVersionConflict:
+                if not allocate or attempt == _ALLOCATE_ATTEMPTS - 1:
+                    raise
+                # The counter fell behind a vN written elsewhere (the rollback also
+                # undid our bump): catch it up with the table and allocate again
+                self._raise_version_counter(name, self._highest_version(name))
+                self.db.commit()
 
     def update_prompt(self,
                       prompt_name: str,
@@ -91,7 +210,7 @@ class PromptService:
                       comment: str | None = None,
                       created_by: str = "system") -> Prompt:
         """Update a specific version of a prompt"""
-        prompt = self.db.query(Prompt).filter(
+        prompt = self._query().filter(
             Prompt.name == prompt_name,
             Prompt.version == version
         ).first()
@@ -107,39 +226,79 @@ class PromptService:
 
         prompt.updated_at = datetime.utcnow()
 
+        self._record_change(prompt_name, version, "update")
         self.db.commit()
         self.db.refresh(prompt)
+        invalidate_prompt_cache(prompt_name, self.tenant)
         return prompt
 
     def list_prompts(self, search: str | None = None, limit: int = 100) -> List[Prompt]:
         """List all prompts (all versions)"""
-        query = self.db.query(Prompt).filter(Prompt.is_enabled == True)
+        query = self._query().filter(Prompt.is_enabled == True)
         if search:
-            query = query.filter(
-                or_(
-                    Prompt.name.ilike(f"%{search}%"),
-                    Prompt.display_name.ilike(f"%{search}%")
-                )
-            )
+            query = query.filter(self._matches(search))
         return query.order_by(desc(Prompt.updated_at)).limit(limit).all()
 
-    def list_prompt_names(self, search: str | None = None) -> List[str]:
-        """List unique prompt names (for version selection)"""
-        query = self.db.query(Prompt.name).filter(Prompt.is_enabled == True).distinct()
+    def list_prompt_page(self,
+                         search: str | None = None,
+                         after: tuple[datetime, int] | None = None,
+                         limit: int | None = None) -> PromptPage:
+        """One page of enabled prompt versions, most recently updated first.
+
+        Keyset pagination on (updated_at, id): each page starts right after
+        ``after`` (a previous page's next_cursor) instead of skipping rows
+        with OFFSET, so deep pages cost the same as the first. Only the
+        summary columns are read, never template or variables_meta. Pages
+        are cached per tenant until any prompt of the tenant changes.
+        """
+        limit = limit or settings.PROMPT_PAGE_SIZE
+        return cached_prompt_page(self.tenant, (search, after, limit),
+                                  lambda: self._fetch_prompt_page(search, after, limit))
+
+    def _fetch_prompt_page(self, search: str | None, after: tuple[datetime, int] | None, limit: int) -> PromptPage:
+        query = self._query(
+            Prompt.id, Prompt.name, Prompt.display_name, Prompt.description, Prompt.version, Prompt.updated_at
+        ).filter(Prompt.is_enabled == True)
+        if search:
+            query = query.filter(self._matches(search))
+        if after:
+            updated_at, prompt_id = after
+            query = query.filter(or_(
+                Prompt.updated_at < updated_at,
+                and_(Prompt.updated_at == updated_at, Prompt.id < prompt_id)
+            ))
+        # One extra row tells whether another page follows
+        rows = query.order_by(desc(Prompt.updated_at), desc(Prompt.id)).limit(limit + 1).all()
+        items = [PromptSummary(*row) for row in rows[:limit]]
+        next_cursor = (items[-1].updated_at, items[-1].id) if len(rows) > limit else None
+        return PromptPage(items, next_cursor)
+
+    def count_prompts(self, search: str | None = None) -> int:
+        """Number of enabled prompt versions (matching ``search``); cached like the pages"""
+        def count() -> int:
+            query = self._query(func.count(Prompt.id)).filter(Prompt.is_enabled == True)
+            if search:
+                query = query.filter(self._matches(search))
+            return query.scalar()
+        return cached_prompt_page(self.tenant, ("count", search), count)
+
+    def list_prompt_names(self, search: str | None = None, enabled: bool = True) -> List[str]:
+        """List unique prompt names (for version selection); ``enabled=False`` lists deleted ones"""
+        query = self._query(Prompt.name).filter(Prompt.is_enabled == enabled).distinct()
         if search:
             query = query.filter(Prompt.name.ilike(f"%{search}%"))
         return [row[0] for row in query.all()]
 
     def list_versions_by_name(self, name: str) -> List[Prompt]:
         """List all versions of a specific prompt name"""
-        return self.db.query(Prompt).filter(
+        return self._query().filter(
             Prompt.name == name,
             Prompt.is_enabled == True
         ).order_by(desc(Prompt.created_at)).all()
 
     def get_prompt_details(self, name: str, version: str | None = None) -> Prompt | None:
         """Get a specific prompt by name and optionally version"""
-        query = self.db.query(Prompt).filter(Prompt.name == name)
+        query = self._query().filter(Prompt.name == name)
         if version:
             query = query.filter(Prompt.version == version)
         else:
@@ -149,14 +308,54 @@ class PromptService:
 
     def delete_prompt(self, name: str, version: str | None = None) -> bool:
         """Delete a prompt (soft delete). If version is None, delete all versions."""
-        query = self.db.query(Prompt).filter(Prompt.name == name)
         if version:
-            query = query.filter(Prompt.version == version)
+            return self.delete_prompts(versions=[(name, version)]) > 0
+        return self.delete_prompts(names=[name]) > 0
+
+    def delete_prompts(self,
+                       names: Iterable[str] = (),
+                       versions: Iterable[tuple[str, str]] = ()) -> int:
+        """Soft-delete every version of ``names`` plus the (name, version) pairs in ``versions``.
 
-        prompts = query.all()
-        if prompts:
-            for prompt in prompts:
-                prompt.is_enabled = False
-            self.db.commit()
-            return True
-        return False
+        Returns the number of versions deleted (already deleted ones are not counted).
+        """
+        return self._set_enabled(False, names, versions)
+
+    def restore_prompts(self,
+                        names: Iterable[str] = (),
+                        versions: Iterable[tuple[str, str]] = ()) -> int:
+        """Undo delete_prompts for the given names / (name, version) pairs; returns the number restored"""
+        return self._set_enabled(True, names, versions)
+
+    def _set_enabled(self, enabled: bool, names: Iterable[str], versions: Iterable[tuple[str, str]]) -> int:
+        """Flip is_enabled with one set-based UPDATE instead of loading each row.
+
+        The change-feed rows are written by an INSERT ... SELECT over the same
+        rows in the same transaction, and local caches are invalidated once
+        for the whole batch.
+        """
+        names, versions = list(dict.fromkeys(names)), list(dict.fromkeys(versions))
+        matches = []
+        if names:
+            matches.append(Prompt.name.in_(names))
+        if versions:
+            matches.append(tuple_(Prompt.name, Prompt.version).in_(versions))
+        if not matches:
+            return 0
+        target = (Prompt.tenant == self.tenant) & (Prompt.is_enabled == (not enabled)) & or_(*matches)
+        op = "restore" if enabled else "delete"
+        now = datetime.utcnow()
+        self.db.execute(
+            insert(PromptChange).from_select(
+                ["tenant", "name", "version", "op", "created_at"],
+                select(Prompt.tenant, Prompt.name, Prompt.version, literal(op), literal(now)).where(target),
+            )
+        )
+        count = self.db.execute(
+            update(Prompt).where(target).values(is_enabled=enabled, updated_at=now)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        self.db.commit()
+        if count:
+            invalidate_prompt_caches(names + [name for name, _ in versions], self.tenant)
+        return count
@@ -1,46 +1,362 @@
-from jinja2 import Environment, BaseLoader, TemplateSyntaxError
-from typing import Dict, Any
+from jinja2 import Environment, ChoiceLoader, Template, TemplateSyntaxError
+from dataclasses import dataclass
+from typing import Dict, Any, Callable, Iterable
+import json
+import threading
+from sqlalchemy import desc
 from sqlalchemy.orm import Session
 from app.models.prompt import Prompt
+from app.models.schemas import PromptSnapshot, content_hash
+from app.services.cache import LRUCache, PartitionedCache
+from app.services.template_loaders import (
+    ENVIRONMENT_OPTIONS, ContentHashLoader, SQLiteBytecodeCache, load_precompiled,
+)
+from config.settings import settings
 import logging
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Process-wide state shared by every PromptRenderService instance.
+# Compiled templates are keyed by template content hash, so identical
+# templates under different names/versions compile once. Templates in the
+# precompiled artifact (scripts/precompile_templates.py) load from it;
+# newer ones are compiled at runtime, reusing bytecode other workers on
+# the host stored in TEMPLATE_BYTECODE_CACHE. The environment's own cache
+# is off: _template_cache is the only one.
+_source_loader = ContentHashLoader()
+_precompiled = load_precompiled(settings.PRECOMPILED_TEMPLATES_DIR)
+_bytecode_cache = SQLiteBytecodeCache(
+    settings.TEMPLATE_BYTECODE_CACHE,
+    max_bytes=settings.TEMPLATE_BYTECODE_CACHE_MAX_BYTES,
+    max_age=settings.TEMPLATE_BYTECODE_CACHE_MAX_AGE,
+) if settings.TEMPLATE_BYTECODE_CACHE else None
+_env = Environment(
+    loader=ChoiceLoader([_precompiled, _source_loader]) if _precompiled else _source_loader,
+    bytecode_cache=_bytecode_cache,
+    cache_size=0,
+    **ENVIRONMENT_OPTIONS,
+)
+
+
+def tenant_cache_limits(cache: str) -> dict[str, int]:
+    """Per-tenant size overrides of one cache ("template", "prompt", "render" or "page")"""
+    return {tenant: limits[cache] for tenant, limits in settings.TENANT_CACHE_LIMITS.items() if cache in limits}
+
+
+# Template, prompt and render caches are partitioned by tenant, so one
+# tenant's traffic only evicts its own entries.
+_template_cache = PartitionedCache(maxsize=settings.TEMPLATE_CACHE_SIZE, limits=tenant_cache_limits("template"),
+                                   max_partitions=settings.MAX_TENANT_PARTITIONS)
+# Snapshots keyed by (name, version); version None means "latest".
+_prompt_cache = PartitionedCache(maxsize=settings.PROMPT_CACHE_SIZE, ttl=settings.PROMPT_CACHE_TTL,
+                                 limits=tenant_cache_limits("prompt"), max_partitions=settings.MAX_TENANT_PARTITIONS)
+# Rendered output keyed by (snapshot etag, canonical variables, static_first).
+# The etag changes with any template/metadata edit, so entries never go stale.
+_render_cache = PartitionedCache(maxsize=settings.RENDER_CACHE_SIZE, limits=tenant_cache_limits("render"),
+                                 max_partitions=settings.MAX_TENANT_PARTITIONS)
+# Prompt listing pages keyed by (search, cursor, limit); any prompt change
+# drops the tenant's whole partition, since it can move rows between pages.
+_page_cache = PartitionedCache(maxsize=settings.PROMPT_PAGE_CACHE_SIZE, ttl=settings.PROMPT_CACHE_TTL,
+                               limits=tenant_cache_limits("page"), max_partitions=settings.MAX_TENANT_PARTITIONS)
+# Static/dynamic layouts keyed by template content hash
+_layout_cache = LRUCache(maxsize=settings.TEMPLATE_CACHE_SIZE)
+
+# Statements that open a block closed by a matching {% end... %}
+_BLOCK_STATEMENTS = {"for", "if", "macro", "call", "filter", "with", "block", "autoescape", "trans"}
+
+
+def compile_template(source: str, source_hash: str | None = None, tenant: str | None = None) -> Template:
+    """Compile a template source, reusing the tenant's partition of the compiled cache."""
+    key = source_hash or content_hash(source)
+    cache = _template_cache.partition(tenant or settings.DEFAULT_TENANT)
+    template = cache.get(key)
+    if template is None:
+        with _source_loader.serving(key, source):
+            template = _env.get_template(key)
+        cache.set(key, template)
+    return template
+
+
+@dataclass(frozen=True)
+class TemplateLayout:
+    """Static/dynamic split of a template, from its Jinja token stream.
+
+    ``static_prefix`` is the text every render starts with, byte for byte.
+    ``parts`` groups the top level into whole lines: static lines (plain
+    text) and dynamic lines (any tag, or inside a block). Rendering with
+    ``static_first`` emits all static lines, in order, then the dynamic
+    lines rendered as one template, so the prefix a provider can cache is
+    ``static_text`` instead of ``static_prefix``.
+    """
+    static_prefix: str
+    parts: tuple[tuple[bool, str], ...]
+    static_text: str
+    dynamic_source: str
+    # False when the line grouping could not be compiled back (static_first then renders normally)
+    reorderable: bool
+
+    @property
+    def prefix_chars(self) -> int:
+        return len(self.static_prefix)
+
+    @property
+    def static_chars(self) -> int:
+        return len(self.static_text)
+
+
+def analyze_template(source: str, source_hash: str | None = None) -> TemplateLayout:
+    """Split a template into static and dynamic parts (cached by content hash)."""
+    key = source_hash or content_hash(source)
+    layout = _layout_cache.get(key)
+    if layout is None:
+        layout = _analyze(source)
+        _layout_cache.set(key, layout)
+    return layout
+
+
+def _analyze(source: str) -> TemplateLayout:
+    prefix = []
+    prefix_done = False
+    parts = []
+    buffer = []
+    dynamic = False
+    depth = 0
+    statement = None  # keyword of the {% ... %} tag being lexed
+    block_set = False
+
+    def close_line():
+        nonlocal buffer, dynamic
+        if buffer:
+            parts.append((not dynamic, "".join(buffer)))
+        buffer, dynamic = [], False
+
+    try:
+        tokens = list(_env.lex(source))
+    except TemplateSyntaxError:
+        return TemplateLayout("", ((False, source),), "", source, False)
+
+    for _, kind, value in tokens:
+        if kind == "data":
+            if not prefix_done:
+                prefix.append(value)
+            for line in value.splitlines(keepends=True):
+                buffer.append(line)
+                if depth == 0 and line.endswith("\n"):
+                    close_line()
+            continue
+        prefix_done = True
+        dynamic = True
+        buffer.append(value)
+        if kind == "block_begin":
+            statement, block_set = None, False
+        elif kind == "name" and statement is None:
+            statement = value
+            block_set = value == "set"
+            if value in _BLOCK_STATEMENTS:
+                depth += 1
+            elif value.startswith("end"):
+                depth = max(depth - 1, 0)
+        elif kind == "operator" and value == "=" and statement == "set":
+            # env.lex() yields raw lexer tokens: "=" is an operator, not "assign"
+            block_set = False
+        elif kind == "block_end":
+            # {% set x %}...{% endset %} opens a block, {% set x = ... %} does not
+            if block_set:
+                depth += 1
+            statement, block_set = "", False
+    close_line()
+
+    if not prefix_done:
+        # Fully static: the lexer already dropped the single trailing newline Jinja strips
+        text = "".join(prefix)
+        return TemplateLayout(text, ((True, text),), text, "", True)
+
+    static_text = "".join(text for is_static, text in parts if is_static)
+    if static_text and not static_text.endswith("\n"):
+        static_text += "\n"
+    dynamic_source = "".join(text for is_static, text in parts if not is_static)
+    reorderable = depth == 0
+    if reorderable:
+        try:
+            _env.parse(dynamic_source)
+        except TemplateSyntaxError:
+            reorderable = False
+    return TemplateLayout("".join(prefix), tuple(parts), static_text, dynamic_source, reorderable)
+
+
+def cacheable_prefix(template: str, rendered: str, template_hash: str | None = None) -> str:
+    """The longest part of ``rendered`` that is identical for every render of ``template``"""
+    layout = analyze_template(template, template_hash)
+    candidates = [layout.static_prefix]
+    if layout.reorderable:
+        candidates += [layout.static_text, layout.static_text.rstrip("\n")]
+    return max((c for c in candidates if rendered.startswith(c)), key=len, default="")
+
+
+class PrefixTracker:
+    """Counts how often a sent prompt prefix was already sent within ``ttl`` seconds.
+
+    Provider prompt caches keep a prefix for a few minutes, so a repeat
+    within that window is a likely cache hit.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 4096):
+        self._seen = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.total = 0
+
+    def observe(self, prefix: str) -> dict:
+        """Record one request; returns the metadata stored with the exchange"""
+        prefix_hash = content_hash(prefix)[:16]
+        hit = self._seen.get(prefix_hash) is not None
+        self._seen.set(prefix_hash, True)
+        with self._lock:
+            self.total += 1
+            self.hits += hit
+            hit_rate = self.hits / self.total
+        return {"hash": prefix_hash, "chars": len(prefix), "hit": hit, "hit_rate": round(hit_rate, 4)}
+
+
+prefix_tracker = PrefixTracker(ttl=settings.PREFIX_CACHE_TTL)
+
+
+def get_cached_snapshot(prompt_name: str, version: str | None = None,
+                        tenant: str | None = None) -> PromptSnapshot | None:
+    """Return a cached snapshot without touching the database."""
+    return _prompt_cache.partition(tenant or settings.DEFAULT_TENANT).get((prompt_name, version))
+
+
+def invalidate_prompt_cache(prompt_name: str | None = None, tenant: str | None = None) -> int:
+    """Drop cached snapshots for one prompt name (all versions), or everything.
+
+    ``tenant`` limits this to one tenant's partition; None means every tenant.
+    Cached listing pages of the tenant are dropped as well.
+    """
+    _page_cache.clear(tenant)
+    if prompt_name is None:
+        count = len(_prompt_cache.partition(tenant)) if tenant is not None else len(_prompt_cache)
+        _prompt_cache.clear(tenant)
+        return count
+    return _prompt_cache.invalidate(lambda key: key[0] == prompt_name, tenant)
+
+
+def invalidate_prompt_caches(prompt_names: Iterable[str], tenant: str | None = None) -> int:
+    """invalidate_prompt_cache for several names in one pass over the cache"""
+    names = frozenset(prompt_names)
+    if not names:
+        return 0
+    _page_cache.clear(tenant)
+    return _prompt_cache.invalidate(lambda key: key[0] in names, tenant)
+
+
+def cached_prompt_page(tenant: str, key: tuple, factory: Callable[[], Any]) -> Any:
+    """Listing page ``key`` of ``tenant`` from the page cache, built by ``factory`` on a miss"""
+    return _page_cache.partition(tenant).get_or_set(key, factory)
+
+
+def canonical_variables(variables: Dict[str, Any]) -> str | None:
+    """Stable JSON form of render variables, or None if they aren't JSON-serializable."""
+    try:
+        return json.dumps(variables, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    except (TypeError, ValueError):
+        return None
+
+
+def render_snapshot(snapshot: PromptSnapshot, variables: Dict[str, Any], static_first: bool | None = None) -> str:
+    """Render an already-resolved snapshot. No database access; results are memoized.
+
+    ``static_first`` (default: STATIC_FIRST_RENDER) moves the template's static
+    lines ahead of its dynamic ones; see TemplateLayout.
+    """
+    if static_first is None:
+        static_first = settings.STATIC_FIRST_RENDER
+    canonical = canonical_variables(variables)
+    key = (snapshot.etag, canonical, static_first)
+    render_cache = _render_cache.partition(snapshot.tenant)
+    if canonical is not None:
+        rendered = render_cache.get(key)
+        if rendered is not None:
+            return rendered
+
+    final_vars = PromptRenderService.validate_variables(variables, snapshot.variables_meta)
+    try:
+        layout = analyze_template(snapshot.template, snapshot.template_hash) if static_first else None
+        if layout is not None and layout.reorderable and layout.static_text and layout.dynamic_source:
+            rendered = layout.static_text + compile_template(layout.dynamic_source,
+                                                             tenant=snapshot.tenant).render(**final_vars)
+        else:
+            template = compile_template(snapshot.template, snapshot.template_hash, snapshot.tenant)
+            rendered = template.render(**final_vars)
+    except TemplateSyntaxError as e:
+        raise ValueError(f"Template syntax error in {snapshot.name} v{snapshot.version}: {str(e)}")
+    except Exception as e:
+        raise ValueError(f"Error rendering prompt {snapshot.name} v{snapshot.version}: {str(e)}")
+
+    if canonical is not None:
+        render_cache.set(key, rendered)
+    return rendered
+
+
+def render_prompt(prompt: Prompt | PromptSnapshot, variables: Dict[str, Any], static_first: bool | None = None) -> str:
+    """Render a prompt row or snapshot the caller already holds. No database access."""
+    if not isinstance(prompt, PromptSnapshot):
+        prompt = PromptSnapshot.from_prompt(prompt)
+    return render_snapshot(prompt, variables, static_first)
+
+
 class PromptRenderService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, tenant: str | None = None):
         self.db = db
-        self.env = Environment(loader=BaseLoader(), autoescape=False)
+        self.tenant = tenant or settings.DEFAULT_TENANT
+        self.env = _env
 
     def get_prompt(self, prompt_name: str, version: str | None = None) -> Prompt | None:
         """Get prompt by name and optionally version"""
-        query = self.db.query(Prompt).filter(Prompt.name == prompt_name)
+        query = self.db.query(Prompt).filter(Prompt.tenant == self.tenant, Prompt.name == prompt_name)
         if version:
             query = query.filter(Prompt.version == version)
         else:
             # Get the latest version if no version specified
-            from sqlalchemy import desc
             query = query.order_by(desc(Prompt.created_at))
         return query.first()
 
-    def validate_variables(self, variables: Dict[str, Any], variables_meta: Any) -> Dict[str, Any]:
+    def get_snapshot(self, prompt_name: str, version: str | None = None) -> PromptSnapshot | None:
+        """Get an immutable snapshot of a prompt, served from the prompt cache when possible"""
+        key = (prompt_name, version)
+        prompt_cache = _prompt_cache.partition(self.tenant)
+        snapshot = prompt_cache.get(key)
+        if snapshot is None:
+            if version:
+                prompt = self.get_prompt(prompt_name, version)
+            else:
+                # "Latest" skips soft-deleted versions so a deleted head
+                # falls back to the previous enabled version
+                prompt = self.db.query(Prompt).filter(
+                    Prompt.tenant == self.tenant,
+                    Prompt.name == prompt_name,
+                    Prompt.is_enabled == True
+                ).order_by(desc(Prompt.created_at)).first()
+            if not prompt:
+                return None
+            snapshot = PromptSnapshot.from_prompt(prompt)
+            prompt_cache.set(key, snapshot)
+        return snapshot
+
+    @staticmethod
+    def validate_variables(variables: Dict[str, Any], variables_meta: dict | None) -> Dict[str, Any]:
         """
-        Validate and fill default values based on metadata (JSON Schema format).
+        Validate and fill default values based on metadata (canonical JSON Schema, see normalize_variables_meta).
         """
         validated = variables.copy()
         if not variables_meta:
             return validated
 
-        # Handle JSON Schema format (Dict)
-        if isinstance(variables_meta, dict):
-            properties = variables_meta.get("properties", {})
-
-            for name, schema in properties.items():
-                # Apply default if variable is missing
-                if name not in validated and "default" in schema:
-                    validated[name] = schema["default"]
-            return validated
-
+        for name, schema in variables_meta.get("properties", {}).items():
+            # Apply default if variable is missing
+            if name not in validated and "default" in schema:
+                validated[name] = schema["default"]
         return validated
 
     def render(self, prompt_name: str, variables: Dict[str, Any]) -> str:
@@ -50,31 +366,23 @@ class PromptRenderService:
         if not prompt:
             raise ValueError(f"Prompt not found: {prompt_name}")
 
-        # Validate variables
-        final_vars = self.validate_variables(variables, prompt.variables_meta or [])
-
-        try:
-            template = self.env.from_string(prompt.template)
-            return template.render(**final_vars)
-        except TemplateSyntaxError as e:
-            raise ValueError(f"Template syntax error in {prompt_name}: {str(e)}")
-        except Exception as e:
-            raise ValueError(f"Error rendering prompt {prompt_name}: {str(e)}")
+        return render_prompt(prompt, variables)
 
     def render_by_version(self, prompt_name: str, version: str, variables: Dict[str, Any]) -> str:
         """Render a specific version of a prompt"""
-        prompt = self.get_prompt(prompt_name, version)
+        snapshot = self.get_snapshot(prompt_name, version)
 
-        if not prompt:
+        if not snapshot:
             raise ValueError(f"Prompt '{prompt_name}' version '{version}' not found")
 
-        # Validate variables
-        final_vars = self.validate_variables(variables, prompt.variables_meta or [])
+        return render_snapshot(snapshot, variables)
 
-        try:
-            template = self.env.from_string(prompt.template)
-            return template.render(**final_vars)
-        except TemplateSyntaxError as e:
-            raise ValueError(f"Template syntax error in {prompt_name} v{version}: {str(e)}")
-        except Exception as e:
-            raise ValueError(f"Error rendering prompt {prompt_name} v{version}: {str(e)}")
+    def render_prompt(self, prompt: Prompt | PromptSnapshot, variables: Dict[str, Any],
+                      static_first: bool | None = None) -> str:
+        """Render a prompt row or snapshot the caller already loaded, skipping the lookup"""
+        return render_prompt(prompt, variables, static_first)
+
+    def render_snapshot(self, snapshot: PromptSnapshot, variables: Dict[str, Any],
+                        static_first: bool | None = None) -> str:
+        """Render an already-resolved snapshot without querying the database"""
+        return render_snapshot(snapshot, variables, static_first)
@@ -0,0 +1,255 @@
+"""
+Jinja loaders keyed by template content hash.
+
+Templates live in the database, not on disk, so the render environment
+addresses them by the SHA-256 of their source:
+
+- `ContentHashLoader` serves a source that `compile_template()` hands over
+  for the duration of one compile.
+- `PrecompiledLoader` serves templates compiled ahead of time by
+  `scripts/precompile_templates.py` into a versioned zip of Python modules
+  (Jinja's `compile_templates` / `ModuleLoader`), so a fresh worker skips
+  Jinja's lexer, parser and code generator for every template in it.
+
+Artifact layout (PRECOMPILED_TEMPLATES_DIR):
+
+    manifest.json                   {"artifact", "built_at", "jinja2", "templates": [hash, ...]}
+    templates-20250101T120000.zip   one module per template
+
+The manifest is replaced atomically, so workers starting during a build
+see either the old or the new artifact.
+
+`SQLiteBytecodeCache` is the lighter alternative: runtime compilation
+stores each template's bytecode in one SQLite file shared by every worker
+on the host (TEMPLATE_BYTECODE_CACHE), so only the first process to see a
+template pays for Jinja's parser and code generator.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Iterable
+
+import jinja2
+from jinja2 import BaseLoader, BytecodeCache, DictLoader, Environment, ModuleLoader, TemplateNotFound
+from jinja2.bccache import Bucket
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+# Options every render environment (and the precompile step) must share,
+# or precompiled code would not match what runtime compilation produces
+ENVIRONMENT_OPTIONS = {"autoescape": False}
+
+
+class ContentHashLoader(BaseLoader):
+    """Serves the source being compiled by the current thread, keyed by content hash."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @contextmanager
+    def serving(self, key: str, source: str):
+        sources = self._local.__dict__.setdefault("sources", {})
+        sources[key] = source
+        try:
+            yield
+        finally:
+            sources.pop(key, None)
+
+    def get_source(self, environment: Environment, template: str):
+        source = getattr(self._local, "sources", {}).get(template)
+        if source is None:
+            raise TemplateNotFound(template)
+        return source, None, lambda: True
+
+
+class PrecompiledLoader(ModuleLoader):
+    """ModuleLoader that only tries templates listed in the artifact manifest."""
+
+    def __init__(self, path: str, names: Iterable[str], built_at: str | None = None):
+        super().__init__(path)
+        self.path = path
+        self.names = frozenset(names)
+        self.built_at = built_at
+
+    def load(self, environment, name, globals=None):
+        if name not in self.names:
+            raise TemplateNotFound(name)
+        try:
+            return super().load(environment, name, globals)
+        except (OSError, ImportError) as e:
+            # Artifact pruned or unreadable (zipimport.ZipImportError is an ImportError):
+            # let the ChoiceLoader fall back to runtime compilation
+            logger.warning("Precompiled template %s unavailable from %s: %s", name, self.path, e)
+            raise TemplateNotFound(name) from e
+
+
+class SQLiteBytecodeCache(BytecodeCache):
+    """Jinja bytecode in a SQLite file, keyed by template content hash.
+
+    Safe for concurrent processes: SQLite serialises writers (WAL mode,
+    busy timeout), and a write is one upsert, so readers never see a
+    partial entry. Entries unused for ``max_age`` seconds are dropped, then
+    the least recently used ones until the file holds ``max_bytes`` of
+    bytecode; pruning runs every ``prune_every`` writes. Bytecode from
+    another Python/Jinja version fails Jinja's magic check, is ignored and
+    overwritten. SQLite errors (a locked file, a busy timeout) are logged
+    and treated as a miss, so the cache never fails a render.
+    """
+
+    # Refresh last_used at most this often per entry, so warm loads stay read-only
+    TOUCH_INTERVAL = 3600.0
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, max_age: float = 7 * 86400,
+                 prune_every: int = 64, timeout: float = 5.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.prune_every = prune_every
+        self.timeout = timeout
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS bytecode ("
+                " key TEXT PRIMARY KEY, checksum TEXT NOT NULL, code BLOB NOT NULL,"
+                " size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_bytecode_last_used ON bytecode (last_used)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_cache_key(self, name: str, filename: str | None = None) -> str:
+        # Render environments name templates by content hash already
+        return name
+
+    def load_bytecode(self, bucket: Bucket) -> None:
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT checksum, code, last_used FROM bytecode WHERE key = ?", (bucket.key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Bytecode cache read failed for %s: %s", bucket.key, e)
+            return
+        if row is None or row[0] != bucket.checksum:
+            return
+        bucket.bytecode_from_string(row[1])
+        now = time.time()
+        if now - row[2] > self.TOUCH_INTERVAL:
+            try:
+                conn.execute("UPDATE bytecode SET last_used = ? WHERE key = ?", (now, bucket.key))
+            except sqlite3.Error as e:
+                logger.debug("Bytecode cache touch failed for %s: %s", bucket.key, e)
+
+    def dump_bytecode(self, bucket: Bucket) -> None:
+        code = bucket.bytecode_to_string()
+        try:
+            self._connect().execute(
+                "INSERT INTO bytecode (key, checksum, code, size, last_used) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET checksum = excluded.checksum, code = excluded.code,"
+                " size = excluded.size, last_used = excluded.last_used",
+                (bucket.key, bucket.checksum, code, len(code), time.time()),
+            )
+        except sqlite3.Error as e:
+            logger.warning("Bytecode cache write failed for %s: %s", bucket.key, e)
+            return
+        with self._writes_lock:
+            self._writes += 1
+            due = self._writes % self.prune_every == 0
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """Apply the age and size limits; returns the number of entries removed (0 if SQLite fails)"""
+        try:
+            conn = self._connect()
+            removed = conn.execute("DELETE FROM bytecode WHERE last_used < ?", (time.time() - self.max_age,)).rowcount
+            removed += conn.execute(
+                "DELETE FROM bytecode WHERE key IN ("
+                " SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY last_used DESC, key) AS total FROM bytecode)"
+                " WHERE total > ?)",
+                (self.max_bytes,),
+            ).rowcount
+        except sqlite3.Error as e:
+            logger.warning("Bytecode cache prune failed: %s", e)
+            return 0
+        return removed
+
+    def clear(self) -> None:
+        self._connect().execute("DELETE FROM bytecode")
+
+
+def load_precompiled(directory: str | None) -> PrecompiledLoader | None:
+    """The current artifact in ``directory``, or None when missing or built by another Jinja version."""
+    if not directory:
+        return None
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("jinja2") != jinja2.__version__:
+        logger.warning("Ignoring precompiled templates built with Jinja %s (running %s)",
+                       manifest.get("jinja2"), jinja2.__version__)
+        return None
+    path = os.path.join(directory, manifest["artifact"])
+    if not os.path.exists(path):
+        return None
+    logger.info("Loaded %d precompiled templates from %s", len(manifest["templates"]), path)
+    return PrecompiledLoader(path, manifest["templates"], manifest.get("built_at"))
+
+
+def build_artifact(directory: str, sources: dict[str, str], keep: int = 2,
+                   log_function: Callable[[str], None] | None = None) -> dict:
+    """Compile ``sources`` ({content hash: template}) into a new artifact and make it current.
+
+    Templates with syntax errors are skipped (they fail at render time as
+    before). The newest ``keep`` artifacts are kept for workers still
+    importing from the previous one.
+    """
+    os.makedirs(directory, exist_ok=True)
+    built_at = datetime.now(timezone.utc)
+    artifact = f"templates-{built_at:%Y%m%dT%H%M%S%f}.zip"
+    compiled = []
+
+    def log(message: str):
+        # compile_templates logs 'Compiled "<name>" as <module>' per success
+        if message.startswith("Compiled "):
+            compiled.append(message.split('"')[1])
+        if log_function:
+            log_function(message)
+
+    env = Environment(loader=DictLoader(sources), **ENVIRONMENT_OPTIONS)
+    env.compile_templates(os.path.join(directory, artifact), zip="deflated", log_function=log, ignore_errors=True)
+
+    manifest = {
+        "artifact": artifact,
+        "built_at": built_at.isoformat(),
+        "jinja2": jinja2.__version__,
+        "templates": sorted(compiled),
+    }
+    tmp_path = os.path.join(directory, f".{MANIFEST_NAME}.{os.getpid()}")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST_NAME))
+
+    artifacts = sorted(name for name in os.listdir(directory) if name.startswith("templates-") and name.endswith(".zip"))
+    for stale in artifacts[:-keep] if keep > 0 else []:
+        os.remove(os.path.join(directory, stale))
+    return manifest
@@ -0,0 +1,29 @@
+"""
+Tenant names accepted from callers.
+
+Tenant strings arrive from request headers (X-Tenant) and URLs (?tenant=),
+and each distinct one gets its own cache partitions and LLM quota. When
+TENANTS is set only those tenants (plus DEFAULT_TENANT) are accepted;
+when it is empty any well-formed name is, and the partition cap and the
+process-wide LLM limit bound what unknown tenants can use.
+"""
+import re
+
+from config.settings import settings
+
+_TENANT_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+
+class UnknownTenant(ValueError):
+    """The tenant is not in TENANTS (or is not a valid tenant name)."""
+
+
+def resolve_tenant(tenant: str | None) -> str:
+    """``tenant`` checked against the allow-list; DEFAULT_TENANT when not given"""
+    if not tenant:
+        return settings.DEFAULT_TENANT
+    if not _TENANT_RE.match(tenant):
+        raise UnknownTenant(f"Invalid tenant name: {tenant!r}")
+    if settings.TENANTS and tenant != settings.DEFAULT_TENANT and tenant not in settings.TENANTS:
+        raise UnknownTenant(f"Unknown tenant: {tenant}")
+    return tenant
@@ -1,18 +1,198 @@
+import uuid
+from datetime import datetime, timedelta
 import streamlit as st
 from app.db.session import SessionLocal
 from app.services.prompt_service import PromptService
 from app.services.template_engine import PromptRenderService
+from app.services.conversation_service import ConversationService
+from app.services.change_feed import ChangeFeed, ChangeSubscriber, invalidate_local_caches
+from app.services.tenants import UnknownTenant, resolve_tenant
+from app.db import profiling
+from app.llm.conversation_state import ChatEntry, ConversationState
+from config.settings import settings
 
 def get_db():
     return SessionLocal()
 
+def get_tenant() -> str:
+    """Tenant of this browser session: ?tenant=... when given (kept across pages), else DEFAULT_TENANT"""
+    tenant = st.query_params.get("tenant")
+    if tenant:
+        try:
+            st.session_state["tenant"] = resolve_tenant(tenant)
+        except UnknownTenant as e:
+            st.error(str(e))
+            st.stop()
+    return st.session_state.get("tenant", settings.DEFAULT_TENANT)
+
 def get_prompt_service():
     db = get_db()
-    return PromptService(db)
+    return PromptService(db, get_tenant())
 
 def get_render_service():
     db = get_db()
-    return PromptRenderService(db)
+    return PromptRenderService(db, get_tenant())
+
+def get_conversation_service():
+    db = get_db()
+    return ConversationService(db, get_tenant())
+
+def describe_metrics(metrics) -> str:
+    """Short caption for an LLM call, e.g. 'TTFT 420 ms · 35.2 tok/s · 1.8 s'"""
+    if metrics is None:
+        return ""
+    parts = []
+    if metrics.ttft_s is not None:
+        parts.append(f"TTFT {metrics.ttft_s * 1000:.0f} ms")
+    if metrics.output_tokens_per_second:
+        parts.append(f"{metrics.output_tokens_per_second:.1f} tok/s")
+    parts.append(f"{metrics.duration_s:.1f} s")
+    return " · ".join(parts)
+
+def describe_llm_metadata(llm: dict | None) -> str:
+    """Caption for a persisted exchange, from t_conversation.metadata["llm"]"""
+    if not llm:
+        return ""
+    parts = []
+    if llm.get("ttft_ms") is not None:
+        parts.append(f"TTFT {llm['ttft_ms']:.0f} ms")
+    if llm.get("output_tokens_per_s"):
+        parts.append(f"{llm['output_tokens_per_s']:.1f} tok/s")
+    if llm.get("duration_ms") is not None:
+        parts.append(f"{llm['duration_ms'] / 1000:.1f} s")
+    return " · ".join(parts)
+
+def get_chat_session_id(rotate: bool = False) -> str:
+    """Chat session id kept in the URL (?sid=...), so a reload or another replica can resume it"""
+    sid = st.query_params.get("sid")
+    if rotate or not sid:
+        sid = uuid.uuid4().hex
+        st.query_params["sid"] = sid
+    return sid
+
+def _resume_since() -> datetime | None:
+    if not settings.CHAT_RESUME_MAX_AGE_DAYS:
+        return None
+    return datetime.utcnow() - timedelta(days=settings.CHAT_RESUME_MAX_AGE_DAYS)
+
+def _turn_entries(turn) -> list[ChatEntry]:
+    timestamp = turn.created_at.strftime("%Y-%m-%d %H:%M:%S")
+    llm = (turn.metadata or {}).get("llm")
+    return [
+        ChatEntry("user", turn.user_input, timestamp),
+        ChatEntry("assistant", turn.ai_response, timestamp, describe_llm_metadata(llm), turn_id=turn.id),
+    ]
+
+def resume_chat_state(conversation_service, state_key: str, session_id: str,
+                      prompt_id: int | None = None) -> ConversationState:
+    """This browser session's chat state, rebuilt from the newest CHAT_RESUME_TURNS
+    turns in t_conversation when it isn't in memory (reload, new replica, new sid)"""
+    state = st.session_state.get(state_key)
+    if state is not None and st.session_state.get(f"{state_key}_sid") == session_id:
+        return state
+    state = ConversationState.from_settings()
+    turns = conversation_service.list_session_turns(session_id, settings.CHAT_RESUME_TURNS, prompt_id=prompt_id,
+                                                    since=_resume_since())
+    for turn in turns:
+        for entry in _turn_entries(turn):
+            state.append(entry)
+    st.session_state[state_key] = state
+    st.session_state[f"{state_key}_sid"] = session_id
+    # A full page means there may be older turns in the database
+    st.session_state[f"{state_key}_more"] = len(turns) == settings.CHAT_RESUME_TURNS
+    st.session_state.pop(f"{state_key}_older", None)
+    return state
+
+def render_older_turns(conversation_service, state_key: str, session_id: str, prompt_id: int | None = None):
+    """On-demand pager for turns no longer held in memory.
+
+    Only the page being viewed is kept in session state, so memory stays bounded.
+    """
+    state = st.session_state.get(state_key)
+    if state is None or not (state.evicted or st.session_state.get(f"{state_key}_more")):
+        return
+    cursor = state.oldest_turn_id()
+    if cursor is None:
+        return
+    page_key = f"{state_key}_older"
+    # (id of the page's oldest turn, entries); plain objects, not ORM rows
+    page = st.session_state.get(page_key)
+    if st.button("⏫ Load earlier messages", key=f"{state_key}_older_button"):
+        turns = conversation_service.list_session_turns(session_id, settings.CHAT_RESUME_TURNS,
+                                                        before_id=page[0] if page else cursor,
+                                                        prompt_id=prompt_id, since=_resume_since())
+        if turns:
+            page = (turns[0].id, [entry for turn in turns for entry in _turn_entries(turn)])
+            st.session_state[page_key] = page
+        else:
+            st.caption("No earlier messages")
+    if page:
+        with st.expander(f"Earlier messages ({len(page[1]) // 2} turns)", expanded=True):
+            for entry in page[1]:
+                with st.chat_message(entry.role):
+                    st.markdown(entry.content)
+                    if entry.caption:
+                        st.caption(entry.caption)
+
+def render_chat_entries(state):
+    """Draw the newest CHAT_DISPLAY_MESSAGES entries of a ConversationState (the LLM context is not affected)"""
+    hidden = max(0, len(state) - settings.CHAT_DISPLAY_MESSAGES) + state.evicted
+    if hidden > 0:
+        st.caption(f"{hidden} earlier message(s) not shown")
+    for entry in state.recent(settings.CHAT_DISPLAY_MESSAGES):
+        with st.chat_message(entry.role):
+            st.markdown(entry.content)
+            if entry.caption:
+                st.caption(entry.caption)
+
+@st.cache_resource
+def start_change_subscriber():
+    """One change-feed follower per Streamlit process, shared by all sessions."""
+    try:
+        return ChangeSubscriber(ChangeFeed(), invalidate_local_caches,
+                                interval=settings.CHANGE_FEED_POLL_INTERVAL).start()
+    except Exception:
+        # Feed table missing (migration not run yet): fall back to TTL expiry
+        return None
+
+@st.cache_resource
+def start_metrics_server():
+    """Expose LLM call metrics in Prometheus format when METRICS_PORT is set."""
+    if not settings.METRICS_PORT:
+        return None
+    from app.llm.metrics import serve_metrics
+    try:
+        return serve_metrics(settings.METRICS_PORT)
+    except OSError:
+        # Port already taken (e.g. another Streamlit process on this host)
+        return None
+
+@st.cache_resource(ttl=settings.SIMILARITY_INDEX_TTL)
+def get_similarity_index(tenant: str):
+    """Near-duplicate index of one tenant's templates, shared by its sessions and rebuilt every SIMILARITY_INDEX_TTL"""
+    import os
+    from app.services.dedup import SimilarityIndex, build_prompt_index
+    path = settings.SIMILARITY_INDEX_PATH.format(tenant=tenant) if settings.SIMILARITY_INDEX_PATH else None
+    if path and os.path.exists(path):
+        return SimilarityIndex.load(path)
+    db = get_db()
+    try:
+        return build_prompt_index(db, threshold=settings.SIMILARITY_THRESHOLD, tenant=tenant)
+    finally:
+        db.close()
+
+def render_similar_prompts(template: str, exclude_name: str | None = None):
+    """Expander listing indexed prompt versions whose template is nearly identical to ``template``"""
+    if not template or not template.strip():
+        return
+    index = get_similarity_index(get_tenant())
+    matches = [((name, version), score) for (name, version), score in index.query(template, limit=20)
+               if name != exclude_name]
+    with st.expander(f"🔍 Similar prompts ({len(matches)})", expanded=False):
+        if not matches:
+            st.caption(f"No other prompt is ≥ {index.threshold:.0%} similar to this template.")
+        for (name, version), score in matches:
+            st.markdown(f"- **{name}** `{version}` · {score:.0%} similar")
 
 def init_page(page_title: str):
     st.set_page_config(
@@ -21,3 +201,32 @@ def init_page(page_title: str):
         initial_sidebar_state="expanded",
     )
     st.title(page_title)
+    tenant = get_tenant()
+    if tenant != settings.DEFAULT_TENANT:
+        st.sidebar.caption(f"Tenant: **{tenant}**")
+    start_change_subscriber()
+    start_metrics_server()
+    if settings.SQL_PROFILING:
+        # Each rerun runs in one script thread, so this profile covers the whole page run
+        profiling.start_profile(page_title)
+
+def render_sql_profile():
+    """Sidebar panel with the queries issued by this rerun (SQL_PROFILING only)"""
+    stats = profiling.current_profile() if settings.SQL_PROFILING else None
+    if stats is None:
+        return
+    duplicates = stats.duplicates()
+    repeated = stats.repeated()
+    with st.sidebar.expander(f"🐞 SQL: {stats.count} queries · {stats.total_ms:.1f} ms",
+                             expanded=bool(duplicates or repeated)):
+        if duplicates:
+            st.markdown("**Duplicate statements**")
+            for stmt, params, n in duplicates:
+                st.code(f"x{n}  {params}\n{stmt}", language="sql")
+        if repeated:
+            st.markdown("**Possible N+1** (same statement, different parameters)")
+            for stmt, n in repeated:
+                st.code(f"x{n}\n{stmt}", language="sql")
+        st.markdown("**Slowest**")
+        for q in stats.slowest(5):
+            st.code(f"{q.duration_s * 1000:.2f} ms  {q.parameters}\n{q.statement}", language="sql")
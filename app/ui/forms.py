@@ -0,0 +1,127 @@
+"""
+Variable forms compiled once per prompt version.
+
+`compile_form()` turns `variables_meta` (canonical JSON Schema) into an
+immutable tuple of FieldDescriptor: widget kind, label, parsed default
+and a coercer from widget value to template variable.
+Descriptors are cached, so a rerun only draws widgets:
+
+    fields = form_for_prompt(prompt)
+    with st.form("vars"):
+        values = render_form(fields)
+"""
+import json
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable
+
+import streamlit as st
+
+from app.services.cache import LRUCache
+
+_form_cache = LRUCache(maxsize=1024)
+
+
+class InvalidFieldValue(ValueError):
+    """A widget value that could not be coerced (e.g. malformed JSON)."""
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _parse_json(value: str) -> Any:
+    try:
+        return json.loads(value)
+    except ValueError as e:
+        raise InvalidFieldValue(str(e)) from e
+
+
+@dataclass(frozen=True)
+class FieldDescriptor:
+    name: str
+    label: str
+    # "select", "text_area", "text_input", "number", "integer", "checkbox" or "json"
+    widget: str
+    help: str = ""
+    default: Any = None
+    options: tuple = ()
+    required: bool = False
+    coerce: Callable[[Any], Any] = field(default=_identity, compare=False)
+
+
+def _number_default(default: Any, cast: Callable[[Any], Any]) -> Any:
+    try:
+        return cast(default) if default else cast(0)
+    except (TypeError, ValueError):
+        return cast(0)
+
+
+def _describe(name: str, schema: dict, required: bool) -> FieldDescriptor:
+    m_type = schema.get("type", "string")
+    default = schema.get("default", "")
+    desc = schema.get("description", "")
+    choices = schema.get("enum", schema.get("choices", []))
+    label = f"{name} {'*' if required else ''}"
+    text_default = str(default) if default else ""
+
+    if m_type == "string" and choices:
+        return FieldDescriptor(name, label, "select", desc, options=tuple(choices), required=required)
+    if m_type == "string":
+        # Long-looking fields get a text area
+        long_text = "text" in name.lower() or "content" in name.lower() or len(str(default)) > 50
+        return FieldDescriptor(name, label, "text_area" if long_text else "text_input", desc, text_default,
+                               required=required)
+    if m_type == "integer":
+        return FieldDescriptor(name, label, "integer", desc, _number_default(default, int), required=required)
+    if m_type == "number":
+        return FieldDescriptor(name, label, "number", desc, _number_default(default, float), required=required)
+    if m_type == "boolean":
+        return FieldDescriptor(name, label, "checkbox", desc, bool(default), required=required)
+    if m_type in ("array", "object"):
+        json_default = json.dumps(default, indent=2) if default else ("[]" if m_type == "array" else "{}")
+        return FieldDescriptor(name, f"{label} (JSON)", "json", f"{desc} (Enter valid JSON)", json_default,
+                               required=required, coerce=_parse_json)
+    return FieldDescriptor(name, label, "text_input", desc, text_default, required=required)
+
+
+def compile_form(variables_meta: Any, cache_key: Hashable | None = None) -> tuple[FieldDescriptor, ...]:
+    """Field descriptors for ``variables_meta``, cached under ``cache_key``
+    (or the metadata's canonical JSON when no key is given)"""
+    if cache_key is None:
+        cache_key = ("meta", json.dumps(variables_meta, sort_keys=True, default=str))
+
+    def build():
+        schema = variables_meta or {}
+        required = set(schema.get("required", []))
+        return tuple(_describe(name, prop, name in required)
+                     for name, prop in schema.get("properties", {}).items())
+
+    return _form_cache.get_or_set(cache_key, build)
+
+
+def form_for_prompt(prompt: Any) -> tuple[FieldDescriptor, ...]:
+    """Descriptors for one prompt version; any edit bumps updated_at and recompiles"""
+    return compile_form(prompt.variables_meta, ("prompt", prompt.id, prompt.updated_at))
+
+
+def render_form(fields: tuple[FieldDescriptor, ...]) -> dict[str, Any]:
+    """Draw one widget per descriptor and return the coerced values"""
+    values = {}
+    for f in fields:
+        if f.widget == "select":
+            raw = st.selectbox(f.label, options=f.options, help=f.help)
+        elif f.widget in ("text_area", "json"):
+            raw = st.text_area(f.label, value=f.default, help=f.help)
+        elif f.widget in ("number", "integer"):
+            raw = st.number_input(f.label, value=f.default, help=f.help)
+        elif f.widget == "checkbox":
+            raw = st.checkbox(f.label, value=f.default, help=f.help)
+        else:
+            raw = st.text_input(f.label, value=f.default, help=f.help)
+        try:
+            values[f.name] = f.coerce(raw)
+        except InvalidFieldValue:
+            st.error(f"Invalid JSON for {f.name}")
+            # Fall back to the default text; rendering may fail, but the user sees the error
+            values[f.name] = f.default
+    return values
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the headless prompt API (api.py).
+
+Seeds a local database, starts uvicorn with N workers and drives it with
+concurrent HTTP clients. Reports requests/second overall and per core
+(one uvicorn worker per core).
+
+    python benchmarks/bench_api.py --workers 1 --duration 10
+    python benchmarks/bench_api.py --database-url mysql+pymysql://root:pw@localhost/prompt_bench
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import PROJECT_ROOT, make_engine, percentile, seed_prompts
+
+import httpx
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(database_url: str, workers: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_URL=database_url, PROMPT_CACHE_TTL="3600")
+    cmd = [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(port),
+           "--workers", str(workers), "--log-level", "warning", "--no-access-log"]
+    proc = subprocess.Popen(cmd, cwd=PROJECT_ROOT, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/healthz", timeout=0.5).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("API server did not start")
+
+
+async def _drive(base_url: str, scenario: dict, concurrency: int, duration: float, prompts: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    stop_at = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=10) as client:
+        async def worker(worker_id: int):
+            nonlocal errors
+            i = worker_id
+            while time.perf_counter() < stop_at:
+                name = f"prompt_{i % prompts}"
+                i += concurrency
+                start = time.perf_counter()
+                resp = await client.request(
+                    scenario["method"],
+                    scenario["path"].format(name=name),
+                    json=scenario.get("json", lambda n: None)(name),
+                    headers=scenario.get("headers", {}),
+                )
+                latencies.append(time.perf_counter() - start)
+                if resp.status_code not in scenario["ok"]:
+                    errors += 1
+
+        # Warm the server-side caches before measuring
+        for n in range(prompts):
+            await client.get(f"/prompts/prompt_{n}")
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(w) for w in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite file")
+    parser.add_argument("--prompts", type=int, default=100, help="Distinct prompt names to seed")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (= cores used)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per scenario")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_api.db')}"
+    seed_prompts(make_engine(database_url), args.prompts)
+
+    scenarios = [
+        {"name": "get", "method": "GET", "path": "/prompts/{name}", "ok": {200}},
+        {"name": "get_304", "method": "GET", "path": "/prompts/{name}", "ok": {304},
+         "headers": {"If-None-Match": "*"}},
+        {"name": "render", "method": "POST", "path": "/prompts/{name}/render", "ok": {200},
+         "json": lambda n: {"variables": {"name": "Alice", "role": "reviewer"}}},
+        {"name": "batch_10", "method": "POST", "path": "/render/batch", "ok": {200},
+         "json": lambda n: {"items": [{"name": n, "variables": {"name": str(k)}} for k in range(10)]}},
+    ]
+
+    port = _free_port()
+    proc = _start_server(database_url, args.workers, port)
+    results = {}
+    try:
+        for scenario in scenarios:
+            stats = asyncio.run(_drive(f"http://127.0.0.1:{port}", scenario, args.concurrency, args.duration, args.prompts))
+            stats["rps_per_core"] = stats["rps"] / args.workers
+            results[scenario["name"]] = stats
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"workers={args.workers} concurrency={args.concurrency} duration={args.duration}s")
+    print(f"{'scenario':<10} {'rps':>10} {'rps/core':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, s in results.items():
+        print(f"{name:<10} {s['rps']:>10.0f} {s['rps_per_core']:>10.0f} {s['p50_ms']:>8.2f} {s['p99_ms']:>8.2f} {s['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+First-render latency in a fresh worker process: cold (compile from
+source), warm shared bytecode cache (another process already compiled
+the templates), and precompiled artifact.
+
+Each round starts a new interpreter that renders TEMPLATES distinct
+templates once; results are per template.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from common import LARGE_TEMPLATE, LARGE_VARIABLES, PROJECT_ROOT
+
+TEMPLATES = 50
+ROUNDS = 5
+
+# Runs in the child: import the engine (settings come from the environment), time first renders
+_CHILD = """
+import json, sys, time
+from app.services.template_engine import compile_template
+sources = json.load(sys.stdin)
+variables = {variables!r}
+start = time.perf_counter()
+for source in sources:
+    compile_template(source).render(**variables)
+print((time.perf_counter() - start) / len(sources) * 1e6)
+"""
+
+
+def _sources() -> list[str]:
+    return [f"{{# variant {i} #}}\n{LARGE_TEMPLATE}" for i in range(TEMPLATES)]
+
+
+def _first_render_us(sources: list[str], **settings) -> float:
+    import json
+
+    env = {**os.environ, **{k: str(v) for k, v in settings.items()}}
+    proc = subprocess.run(
+        [sys.executable, "-c", _CHILD.format(variables=LARGE_VARIABLES)],
+        input=json.dumps(sources), cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return float(proc.stdout.strip().splitlines()[-1])
+
+
+def _stats(rounds: list[float]) -> dict:
+    return {
+        "median_us": statistics.median(rounds),
+        "min_us": min(rounds),
+        "max_us": max(rounds),
+        "repeat": len(rounds),
+        "number": TEMPLATES,
+    }
+
+
+def run(options) -> dict:
+    from app.models.schemas import content_hash
+    from app.services.template_loaders import build_artifact
+
+    sources = _sources()
+    with tempfile.TemporaryDirectory() as tmp:
+        bytecode = os.path.join(tmp, "bytecode.sqlite")
+        precompiled = os.path.join(tmp, "precompiled")
+        build_artifact(precompiled, {content_hash(s): s for s in sources})
+
+        cold, warm, artifact = [], [], []
+        for i in range(ROUNDS):
+            cold.append(_first_render_us(sources))
+            # A fresh cache file per round: the first process fills it, the second reads it
+            path = f"{bytecode}.{i}"
+            _first_render_us(sources, TEMPLATE_BYTECODE_CACHE=path)
+            warm.append(_first_render_us(sources, TEMPLATE_BYTECODE_CACHE=path))
+            artifact.append(_first_render_us(sources, PRECOMPILED_TEMPLATES_DIR=precompiled))
+    return {
+        "first_render.cold": _stats(cold),
+        "first_render.bytecode_warm": _stats(warm),
+        "first_render.precompiled": _stats(artifact),
+    }
+
+
+if __name__ == "__main__":
+    from run import main
+    main(["--suite", "bytecode"])
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Comparison page helpers: two-way merge/distribute and the K-way merge_variables_schemas."""
+from common import timeit
+
+
+def _schema(count: int, prefix: str, type_for=lambda i: "string") -> dict:
+    return {
+        "type": "object",
+        "properties": {f"{prefix}{i}": {"type": type_for(i), "description": f"var {i}"} for i in range(count)},
+        "required": [f"{prefix}{i}" for i in range(0, count, 2)],
+    }
+
+
+def run(options) -> dict:
+    from app.services.comparison import (distribute_to_sides, distribute_variables, merge_variables_meta,
+                                         merge_variables_schemas)
+
+    results = {}
+    for count in (10, 200):
+        left = _schema(count, "v")
+        # Half shared with the same type, a quarter type conflicts, the rest right-only
+        right = _schema(count, "v", type_for=lambda i: "number" if i % 4 == 0 else "string")
+        right["properties"].update(_schema(count // 4, "r")["properties"])
+
+        results[f"merge_variables_meta.{count}"] = timeit(lambda: merge_variables_meta(left, right),
+                                                          number=options.number)
+        merged, conflicts = merge_variables_meta(left, right)
+        values = {name: "x" for name in merged["properties"]}
+        results[f"distribute_variables.{count}"] = timeit(
+            lambda: distribute_variables(values, conflicts, left["properties"], right["properties"]),
+            number=options.number)
+
+        # 6 versions, each sharing most variables with a few type conflicts
+        schemas = [_schema(count, "v", type_for=lambda i, k=k: "number" if i % 8 == k else "string") for k in range(6)]
+        labels = [f"v{k}" for k in range(6)]
+        results[f"merge_variables_schemas.k6.{count}"] = timeit(lambda: merge_variables_schemas(schemas, labels),
+                                                                number=options.number)
+        merged, routing, _ = merge_variables_schemas(schemas, labels)
+        values = {name: "x" for name in merged["properties"]}
+        results[f"distribute_to_sides.k6.{count}"] = timeit(lambda: distribute_to_sides(values, routing),
+                                                            number=options.number)
+    return results
+
+
+if __name__ == "__main__":
+    from run import main
+    main(["--suite", "comparison"])
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Near-duplicate index: MinHash signatures, LSH lookups and clustering over a synthetic prompt library."""
+import random
+
+from common import LARGE_TEMPLATE, timeit
+
+WORDS = [f"word{i}" for i in range(2000)]
+
+
+def _library(count: int) -> list[str]:
+    rng = random.Random(1)
+    templates = []
+    for i in range(count):
+        if i % 10 == 1:
+            # Every tenth template is a light edit of the previous one
+            words = templates[-1].split()
+            words[rng.randrange(len(words))] = "edited"
+            templates.append(" ".join(words))
+        else:
+            templates.append(" ".join(rng.choice(WORDS) for _ in range(150)) + " {{ question }}")
+    return templates
+
+
+def run(options) -> dict:
+    from app.services.dedup import MinHasher, SimilarityIndex
+
+    hasher = MinHasher()
+    results = {"minhash.large_template": timeit(lambda: hasher.signature(LARGE_TEMPLATE), number=options.number)}
+    for count in (1000, 10000):
+        templates = _library(count)
+        index = SimilarityIndex()
+        for i, template in enumerate(templates):
+            index.add(i, template)
+        results[f"similar_query.{count}"] = timeit(lambda: index.query(templates[count // 2]), number=options.number)
+        results[f"clusters.{count}"] = timeit(index.clusters, repeat=3, number=1)
+    return results
+
+
+if __name__ == "__main__":
+    from run import main
+    main(["--suite", "dedup"])
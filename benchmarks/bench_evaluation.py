@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""Response scoring: vectorized score_responses() over response batches, with and without references."""
+import random
+
+from common import timeit
+
+WORDS = ("the model should answer with a short summary of the document and cite its sources "
+         "结果 需要 简洁 准确").split()
+
+
+def _responses(count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 120))) for _ in range(count)]
+
+
+def run(options) -> dict:
+    from app.services.evaluation import score_responses
+
+    schema = {"type": "object", "required": ["answer"], "properties": {"answer": {"type": "string"}}}
+    results = {}
+    for count in (100, 5000):
+        responses = _responses(count, seed=1)
+        references = _responses(count, seed=2)
+        number = max(1, options.number // (count // 10))
+        results[f"score_responses.length.{count}"] = timeit(lambda: score_responses(responses), number=number)
+        results[f"score_responses.reference.{count}"] = timeit(lambda: score_responses(responses, references),
+                                                               number=number)
+        results[f"score_responses.schema.{count}"] = timeit(lambda: score_responses(responses, schema=schema),
+                                                            number=number)
+    return results
+
+
+if __name__ == "__main__":
+    from run import main
+    main(["--suite", "evaluation"])
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""LLM path: LangChainClient.stream against the local fake OpenAI server.
+
+Reports end-to-end time per call and the client-side overhead, i.e. wall
+time minus the latency the fake server was configured to add.
+"""
+import time
+
+from common import timeit
+
+REPLY_WORDS = 50
+
+
+def run(options) -> dict:
+    from app.llm.fake_openai import start_fake_server
+    from config.settings import settings
+
+    server = start_fake_server(ttft=options.llm_ttft, token_delay=options.llm_token_delay)
+    settings.OPENAI_API_BASE = server.base_url
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "sk-fake"
+
+    from app.llm.langchain_client import LangChainClient
+    client = LangChainClient(model_name="fake-model", temperature=0)
+    message = " ".join(f"w{i}" for i in range(REPLY_WORDS))
+    injected_us = (options.llm_ttft + options.llm_token_delay * (REPLY_WORDS - 1)) * 1e6
+    number = max(1, options.number // 20)
+
+    results = {}
+    try:
+        results["llm.stream"] = timeit(lambda: "".join(client.stream(message)), number=number)
+        results["llm.invoke"] = timeit(lambda: client.invoke(message), number=number)
+        results["llm.client_init"] = timeit(lambda: LangChainClient(model_name="fake-model"), number=number)
+        for key in ("llm.stream", "llm.invoke"):
+            stats = results[key]
+            results[f"{key}.overhead"] = {
+                **stats,
+                "median_us": max(stats["median_us"] - injected_us, 0.0),
+                "min_us": max(stats["min_us"] - injected_us, 0.0),
+                "max_us": max(stats["max_us"] - injected_us, 0.0),
+            }
+    finally:
+        server.shutdown()
+    return results
+
+
+if __name__ == "__main__":
+    from run import main
+    main(["--suite", "llm"])
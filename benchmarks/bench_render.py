@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Render hot path: PromptRenderService.render / render_by_version, small vs large, cold vs warm."""
+import os
+import tempfile
+
+from common import (LARGE_TEMPLATE, LARGE_VARIABLES, SCHEMA, SMALL_TEMPLATE, SMALL_VARIABLES,
+                    make_engine, seed_prompts, timeit)
+
+
+def run(options) -> dict:
+    from sqlalchemy import insert
+    from sqlalchemy.orm import sessionmaker
+    from app.models.prompt import Prompt
+    from app.services import template_engine
+    from app.services.template_engine import PromptRenderService
+
+    engine = make_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'render.db')}")
+    seed_prompts(engine, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(Prompt), [{
+            "name": "large", "display_name": "Large", "version": "v1", "template": LARGE_TEMPLATE,
+            "variables_meta": SCHEMA, "is_enabled": True,
+        }])
+    db = sessionmaker(bind=engine)()
+    service = PromptRenderService(db)
+    number = options.number
+
+    cases = {
+        "small": ("prompt_0", "v1", SMALL_VARIABLES),
+        "large": ("large", "v1", LARGE_VARIABLES),
+    }
+    results = {}
+    try:
+        for size, (name, version, variables) in cases.items():
+            def cold():
+                # Drop the prompt and render memos too, or every call after the first is a render-cache hit
+                template_engine._template_cache.clear()
+                template_engine._prompt_cache.clear()
+                template_engine._render_cache.clear()
+                service.render_by_version(name, version, variables)
+
+            results[f"render.{size}.cold"] = timeit(cold, number=number)
+            results[f"render.{size}.warm"] = timeit(lambda: service.render(name, variables), number=number)
+            results[f"render_by_version.{size}.warm"] = timeit(
+                lambda: service.render_by_version(name, version, variables), number=number)
+
+            snapshot = service.get_snapshot(name, version)
+            results[f"render_snapshot.{size}.warm"] = timeit(
+                lambda: service.render_snapshot(snapshot, variables), number=number * 10)
+    finally:
+        db.close()
+    return results
+
+
+if __name__ == "__main__":
+    from run import main
+    main(["--suite", "render"])
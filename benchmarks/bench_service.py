@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""Lookup hot path: PromptService.list_prompts / get_prompt_details at 10k-1M rows."""
+import os
+import tempfile
+
+from common import make_engine, seed_prompts, timeit
+
+VERSIONS_PER_NAME = 5
+
+
+def _database_url(rows: int, options) -> str:
+    if options.database_url:
+        return options.database_url
+    # Reuse seeded files across runs; seeding 1M rows takes a while
+    return f"sqlite:///{os.path.join(tempfile.gettempdir(), f'prompt_one_bench_{rows}.db')}"
+
+
+def run(options) -> dict:
+    from sqlalchemy.orm import sessionmaker
+    from app.services.prompt_service import PromptService
+
+    results = {}
+    for rows in options.rows:
+        engine = make_engine(_database_url(rows, options))
+        seed_prompts(engine, rows, versions_per_name=VERSIONS_PER_NAME)
+        db = sessionmaker(bind=engine)()
+        service = PromptService(db)
+        middle = f"prompt_{rows // VERSIONS_PER_NAME // 2}"
+        number = max(1, options.number // 10)
+        try:
+            results[f"list_prompts.{rows}"] = timeit(lambda: service.list_prompts(), number=number)
+            results[f"list_prompts.search.{rows}"] = timeit(lambda: service.list_prompts(search="prompt_1"), number=number)
+            results[f"get_prompt_details.latest.{rows}"] = timeit(lambda: service.get_prompt_details(middle), number=number)
+            results[f"get_prompt_details.version.{rows}"] = timeit(
+                lambda: service.get_prompt_details(middle, "v3"), number=number)
+        finally:
+            db.close()
+        engine.dispose()
+    return results
+
+
+if __name__ == "__main__":
+    from run import main
+    main(["--suite", "service"])
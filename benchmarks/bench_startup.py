@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Startup profiling harness: per-module import cost for pages and scripts.
+
+Each target runs in a fresh interpreter under `python -X importtime`.
+Pages are executed in Streamlit bare mode against a temporary SQLite
+database, scripts are imported without running their __main__ block.
+
+Fails (exit 1) when a target exceeds its import-time budget or pulls in a
+module that must stay lazy (the LLM stack).
+
+    python benchmarks/bench_startup.py               # check budgets
+    python benchmarks/bench_startup.py --top 15      # show heaviest modules
+    python benchmarks/bench_startup.py --scale 2.0   # slower machine
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import PROJECT_ROOT, make_engine, seed_prompts
+
+# Modules that must not be imported until an LLM call is actually made
+LAZY_MODULES = ("langchain_openai", "langchain_core", "openai")
+
+# name -> (kind, path, import budget in ms)
+# A page cold start without the LLM stack (streamlit + sqlalchemy +
+# pydantic) measures ~650-1000ms; eagerly importing langchain_openai and
+# pandas used to add ~1.4s on top. Budgets sit above the noisy upper end.
+TARGETS = {
+    "page:main": ("page", "main.py", 1200),
+    "page:01_Prompt_Manager": ("page", "pages/01_Prompt_Manager.py", 1200),
+    "page:02_Prompt_Preview": ("page", "pages/02_Prompt_Preview.py", 1200),
+    "page:03_Playground": ("page", "pages/03_Playground.py", 1200),
+    "page:04_Prompt_Comparison": ("page", "pages/04_Prompt_Comparison.py", 1200),
+    "script:init_db": ("script", "scripts/init_db.py", 800),
+    "module:app.llm.langchain_client": ("module", "app.llm.langchain_client", 400),
+}
+
+
+def _command(kind: str, path: str) -> str:
+    if kind == "module":
+        return f"import {path}"
+    run_name = "__main__" if kind == "page" else "__startup_probe__"
+    return f"import runpy; runpy.run_path({path!r}, run_name={run_name!r})"
+
+
+def parse_importtime(stderr: str) -> list[dict]:
+    """Parse `-X importtime` lines into {module, self_us, cumulative_us, depth}."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        head, cumulative_us, name = line.split("|", 2)
+        self_us = head.replace("import time:", "").strip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append({
+            "module": name.strip(),
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us.strip()),
+            "depth": depth,
+        })
+    return rows
+
+
+def profile_target(kind: str, path: str, env: dict) -> dict:
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _command(kind, path)],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    rows = parse_importtime(proc.stderr)
+    return {
+        "returncode": proc.returncode,
+        "wall_ms": wall_ms,
+        "import_ms": sum(r["self_us"] for r in rows) / 1000,
+        "modules": rows,
+        "stderr_tail": "\n".join(l for l in proc.stderr.splitlines() if not l.startswith("import time:"))[-500:],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per target; the median is reported")
+    parser.add_argument("--top", type=int, default=0, help="Show the N heaviest modules per target")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply all budgets (slow CI machines)")
+    parser.add_argument("--only", default=None, help="Substring filter on target names")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "startup.db")
+    database_url = f"sqlite:///{db_path}"
+    seed_prompts(make_engine(database_url), 5)
+    env = dict(os.environ, DATABASE_URL=database_url)
+
+    results = {}
+    failures = []
+    for name, (kind, path, budget_ms) in TARGETS.items():
+        if args.only and args.only not in name:
+            continue
+        runs = [profile_target(kind, path, env) for _ in range(args.repeat)]
+        if any(r["returncode"] != 0 for r in runs):
+            failures.append(f"{name}: exited with {runs[0]['returncode']}\n{runs[0]['stderr_tail']}")
+            continue
+        import_ms = statistics.median(r["import_ms"] for r in runs)
+        wall_ms = statistics.median(r["wall_ms"] for r in runs)
+        loaded = {r["module"] for r in runs[0]["modules"]}
+        lazy_violations = sorted(m for m in loaded if m.split(".")[0] in LAZY_MODULES)
+        budget = budget_ms * args.scale
+
+        results[name] = {
+            "import_ms": round(import_ms, 1),
+            "wall_ms": round(wall_ms, 1),
+            "budget_ms": budget,
+            "lazy_violations": lazy_violations[:5],
+            "top": sorted(runs[0]["modules"], key=lambda r: r["self_us"], reverse=True)[:args.top],
+        }
+        if import_ms > budget:
+            failures.append(f"{name}: import time {import_ms:.0f}ms exceeds budget {budget:.0f}ms")
+        if lazy_violations:
+            failures.append(f"{name}: eagerly imports {', '.join(lazy_violations[:3])}")
+
+    if args.json:
+        print(json.dumps({"results": results, "failures": failures}, indent=2))
+    else:
+        print(f"{'target':<34} {'import ms':>10} {'wall ms':>9} {'budget':>8}")
+        for name, r in results.items():
+            flag = "" if r["import_ms"] <= r["budget_ms"] and not r["lazy_violations"] else "  <-- FAIL"
+            print(f"{name:<34} {r['import_ms']:>10.1f} {r['wall_ms']:>9.1f} {r['budget_ms']:>8.0f}{flag}")
+            for row in r["top"]:
+                print(f"    {row['self_us'] / 1000:>8.1f}ms self {row['cumulative_us'] / 1000:>9.1f}ms cum  {row['module']}")
+        for failure in failures:
+            print(f"✗ {failure}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
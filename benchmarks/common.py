@@ -0,0 +1,111 @@
+"""Shared helpers for the benchmark scripts."""
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Add the project root to sys.path
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+SMALL_TEMPLATE = "Hello {{ name }}! You are a {{ role }}."
+
+LARGE_TEMPLATE = "\n".join(
+    ["You are a careful assistant. Follow every rule below."]
+    + [f"Rule {i}: always respect constraint number {i} when answering." for i in range(200)]
+    + [
+        "{% for item in items %}- {{ item.title }}: {{ item.body }}\n{% endfor %}",
+        "{% if user %}User: {{ user.name }} ({{ user.tier }}){% endif %}",
+        "Question: {{ question }}",
+    ]
+)
+
+SMALL_VARIABLES = {"name": "Alice", "role": "reviewer"}
+
+LARGE_VARIABLES = {
+    "items": [{"title": f"Doc {i}", "body": "lorem ipsum " * 10} for i in range(50)],
+    "user": {"name": "Alice", "tier": "gold"},
+    "question": "Summarize the documents.",
+}
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string", "default": "World"},
+        "role": {"type": "string"},
+    },
+    "required": ["name"],
+}
+
+
+def make_engine(database_url: str):
+    from sqlalchemy import create_engine
+    from app.db.base import Base
+    import app.models.prompt  # noqa: F401  (register tables)
+    import app.models.conversation  # noqa: F401
+    import app.models.prompt_change  # noqa: F401
+
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def seed_prompts(engine, count: int, versions_per_name: int = 1, template: str = SMALL_TEMPLATE,
+                 batch_size: int = 5000) -> None:
+    """Insert ``count`` enabled prompt rows (skipped if the table already has them)."""
+    from sqlalchemy import func, insert, select
+    from app.models.prompt import Prompt
+
+    with engine.begin() as conn:
+        existing = conn.execute(select(func.count()).select_from(Prompt)).scalar_one()
+        if existing >= count:
+            return
+        base = datetime.utcnow() - timedelta(days=30)
+        rows = []
+        for i in range(existing, count):
+            rows.append({
+                "name": f"prompt_{i // versions_per_name}",
+                "display_name": f"Prompt {i // versions_per_name}",
+                "description": "benchmark prompt",
+                "version": f"v{i % versions_per_name + 1}",
+                "template": template,
+                "variables_meta": SCHEMA,
+                "created_by": "bench",
+                "comment": None,
+                "is_enabled": True,
+                "created_at": base + timedelta(seconds=i),
+                "updated_at": base + timedelta(seconds=i),
+            })
+            if len(rows) >= batch_size:
+                conn.execute(insert(Prompt), rows)
+                rows = []
+        if rows:
+            conn.execute(insert(Prompt), rows)
+
+
+def timeit(fn, repeat: int = 5, number: int = 100) -> dict:
+    """Run ``fn`` ``number`` times per round; return per-call stats in microseconds."""
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - start) / number * 1e6)
+    return {
+        "median_us": statistics.median(rounds),
+        "min_us": min(rounds),
+        "max_us": max(rounds),
+        "repeat": repeat,
+        "number": number,
+    }
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite runner with JSON baselines and regression checks.
+
+    python benchmarks/run.py                          # run all suites, compare to baseline
+    python benchmarks/run.py --save-baseline          # record a new baseline
+    python benchmarks/run.py --suite render,llm       # subset
+    python benchmarks/run.py --rows 10000,100000,1000000 --suite service
+
+Each result is the median per-call time (µs) over several rounds. A result
+is a regression when it is slower than the baseline by more than
+--threshold (default 20%); the runner then exits with status 1.
+Baselines are machine-specific: record them on the machine that checks them.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+
+from common import PROJECT_ROOT
+
+import bench_bytecode
+import bench_comparison
+import bench_dedup
+import bench_evaluation
+import bench_llm
+import bench_render
+import bench_service
+
+SUITES = {
+    "render": bench_render,
+    "bytecode": bench_bytecode,
+    "service": bench_service,
+    "comparison": bench_comparison,
+    "evaluation": bench_evaluation,
+    "dedup": bench_dedup,
+    "llm": bench_llm,
+}
+
+DEFAULT_BASELINE = os.path.join(PROJECT_ROOT, "benchmarks", "baselines", f"{platform.node() or 'local'}.json")
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[tuple[str, float, float, float]]:
+    """Return (name, baseline_us, current_us, ratio) for every regressed result."""
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if not base or not base.get("median_us"):
+            continue
+        ratio = stats["median_us"] / base["median_us"]
+        if ratio > 1 + threshold:
+            regressions.append((name, base["median_us"], stats["median_us"], ratio))
+    return regressions
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", default=",".join(SUITES), help=f"Comma-separated: {', '.join(SUITES)}")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.20, help="Allowed slowdown ratio (0.20 = 20%%)")
+    parser.add_argument("--number", type=int, default=200, help="Calls per round for fast benchmarks")
+    parser.add_argument("--rows", default="10000", help="Row counts for the service suite, e.g. 10000,1000000")
+    parser.add_argument("--database-url", default=None, help="Run the service suite against this database")
+    parser.add_argument("--llm-ttft", type=float, default=0.02, help="Fake server time to first token (s)")
+    parser.add_argument("--llm-token-delay", type=float, default=0.001, help="Fake server delay per token (s)")
+    parser.add_argument("--output", default=None, help="Also write the results JSON here")
+    options = parser.parse_args(argv)
+    options.rows = [int(r) for r in options.rows.split(",") if r]
+
+    results = {}
+    for name in options.suite.split(","):
+        if name not in SUITES:
+            parser.error(f"Unknown suite: {name}")
+        print(f"Running {name}...", file=sys.stderr)
+        results.update(SUITES[name].run(options))
+
+    report = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "node": platform.node(),
+        },
+        "results": results,
+    }
+
+    baseline = {}
+    if os.path.exists(options.baseline):
+        with open(options.baseline) as f:
+            baseline = json.load(f).get("results", {})
+
+    regressions = {r[0]: r for r in compare(results, baseline, options.threshold)}
+    print(f"{'benchmark':<40} {'median µs':>12} {'baseline µs':>12} {'change':>8}")
+    for name, stats in sorted(results.items()):
+        base = baseline.get(name, {}).get("median_us")
+        change = f"{(stats['median_us'] / base - 1) * 100:+.1f}%" if base else "-"
+        flag = "  <-- REGRESSION" if name in regressions else ""
+        base_str = f"{base:.1f}" if base else "-"
+        print(f"{name:<40} {stats['median_us']:>12.1f} {base_str:>12} {change:>8}{flag}")
+
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if options.save_baseline:
+        os.makedirs(os.path.dirname(options.baseline), exist_ok=True)
+        with open(options.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Baseline saved to {options.baseline}")
+        return
+
+    if regressions:
+        print(f"✗ {len(regressions)} benchmark(s) regressed by more than {options.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
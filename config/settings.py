@@ -7,14 +7,105 @@ class Settings(BaseSettings):
     DB_USER: str = "root"
     DB_PASSWORD: str = "password"
     DB_NAME: str = "prompt_manager"
+    # Full SQLAlchemy URL, overrides the DB_* fields (e.g. sqlite:///./local.db)
+    DATABASE_URL: str | None = None
     
     # LLM
     OPENAI_API_KEY: str | None = None
     OPENAI_API_BASE: str | None = None
     DEFAULT_MODEL_NAME: str = "gpt-3.5-turbo"
+    # Port for the Prometheus /metrics endpoint of Streamlit processes (disabled when unset)
+    METRICS_PORT: int | None = None
+    # Record the SQL issued by each page rerun and show it in a sidebar debug panel
+    SQL_PROFILING: bool = False
+
+    # Multi-tenancy: tenant used when none is given (pages: ?tenant=..., API: X-Tenant header)
+    DEFAULT_TENANT: str = "default"
+    # Tenants accepted from requests besides DEFAULT_TENANT; empty accepts any tenant name
+    TENANTS: list[str] = []
+    # Tenants with cache partitions / LLM quotas held per process; the least recently used are dropped
+    MAX_TENANT_PARTITIONS: int = 64
+
+    # Render caches. Each tenant gets its own partition of these sizes;
+    # TENANT_CACHE_LIMITS overrides them per tenant and cache, e.g.
+    # {"search": {"template": 4096, "prompt": 16384, "render": 8192, "page": 512}}
+    TENANT_CACHE_LIMITS: dict[str, dict[str, int]] = {}
+    TEMPLATE_CACHE_SIZE: int = 1024
+    PROMPT_CACHE_SIZE: int = 4096
+    PROMPT_CACHE_TTL: float = 30.0
+    RENDER_CACHE_SIZE: int = 2048
+    # Prompt Manager listing: rows per page, and cached pages (expire with PROMPT_CACHE_TTL)
+    PROMPT_PAGE_SIZE: int = 50
+    PROMPT_PAGE_CACHE_SIZE: int = 256
+    CHANGE_FEED_POLL_INTERVAL: float = 1.0
+    # Directory of the artifact written by scripts/precompile_templates.py (runtime compilation only when unset)
+    PRECOMPILED_TEMPLATES_DIR: str | None = None
+    # SQLite file holding compiled template bytecode, shared by all workers on the host (off when unset)
+    TEMPLATE_BYTECODE_CACHE: str | None = None
+    TEMPLATE_BYTECODE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    TEMPLATE_BYTECODE_CACHE_MAX_AGE: float = 7 * 86400.0
+    # Render a template's static lines before its dynamic ones, so the
+    # system prompt starts with a byte-stable prefix providers can cache
+    STATIC_FIRST_RENDER: bool = False
+    # How long a sent prompt prefix counts as a likely provider cache hit (seconds)
+    PREFIX_CACHE_TTL: float = 300.0
+
+    # Chat history: messages sent to the LLM, entries kept in memory,
+    # compaction batch size, and "window" (drop) or "summary" compaction
+    CHAT_WINDOW_MESSAGES: int = 40
+    CHAT_MAX_ENTRIES: int = 200
+    CHAT_COMPACT_BATCH: int = 20
+    CHAT_COMPACTION: str = "window"
+    # Past messages drawn on each rerun; older ones are summarised in a
+    # "N earlier message(s) not shown" caption. Display only: what the LLM
+    # receives is set by CHAT_WINDOW_MESSAGES
+    CHAT_DISPLAY_MESSAGES: int = 50
+    # Turns reloaded from t_conversation when a chat session is resumed, and per "load earlier" page
+    CHAT_RESUME_TURNS: int = 20
+    # Only sessions active in the last N days are resumed, so the lookup skips older partitions (0 = no limit)
+    CHAT_RESUME_MAX_AGE_DAYS: int = 30
+
+    # t_conversation retention (scripts/conversation_retention.py): months kept, counting the
+    # current one, and where expired months are archived as gzip JSONL before they are removed
+    CONVERSATION_RETENTION_MONTHS: int = 12
+    CONVERSATION_ARCHIVE_DIR: str = "archive/conversations"
+
+    # Rendered prompts are stored once per distinct text (t_rendered_prompt); bodies of at least
+    # RENDERED_PROMPT_COMPRESS_MIN_BYTES are zstd-compressed when the zstandard package is installed
+    # ("none" stores them as plain UTF-8)
+    RENDERED_PROMPT_COMPRESSION: str = "zstd"
+    RENDERED_PROMPT_COMPRESS_MIN_BYTES: int = 1024
+
+    # Per-tenant LLM quotas: concurrent calls, sustained calls per second (0 = unlimited)
+    # with bursts up to TENANT_LLM_BURST, and how long a call waits for a slot before failing.
+    # TENANT_LLM_LIMITS overrides them per tenant, e.g. {"batch": {"concurrency": 2, "rate": 0.5}}
+    TENANT_LLM_CONCURRENCY: int = 4
+    TENANT_LLM_RATE: float = 0.0
+    TENANT_LLM_BURST: int = 10
+    TENANT_LLM_WAIT: float = 30.0
+    TENANT_LLM_LIMITS: dict[str, dict[str, float]] = {}
+    # LLM calls in flight per process across all tenants (0 = unlimited)
+    LLM_MAX_CONCURRENCY: int = 32
+
+    # Prompt comparison: concurrent LLM calls per message, and max grid cells (versions x models)
+    COMPARISON_MAX_WORKERS: int = 8
+    COMPARISON_MAX_CELLS: int = 18
+
+    # Near-duplicate prompt lookup: min estimated similarity, index file from
+    # scripts/index_similar_prompts.py (may contain {tenant}; built from the database when unset), and rebuild interval
+    SIMILARITY_THRESHOLD: float = 0.7
+    SIMILARITY_INDEX_PATH: str | None = None
+    SIMILARITY_INDEX_TTL: float = 300.0
+
+    # HTTP API
+    API_HOST: str = "0.0.0.0"
+    API_PORT: int = 8000
+    API_BATCH_LIMIT: int = 100
 
     @property
     def database_url(self) -> str:
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
         return f"mysql+pymysql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
     class Config:
@@ -1,5 +1,6 @@
 CREATE TABLE IF NOT EXISTS `t_prompt` (
     `id` BIGINT NOT NULL AUTO_INCREMENT,
+    `tenant` VARCHAR(64) NOT NULL DEFAULT 'default' COMMENT 'Tenant namespace; names and versions are unique per tenant',
     `name` VARCHAR(128) NOT NULL COMMENT 'Unique identifier',
     `display_name` VARCHAR(128) NOT NULL COMMENT 'Display name',
     `description` VARCHAR(255) COMMENT 'Description',
@@ -12,17 +13,28 @@ CREATE TABLE IF NOT EXISTS `t_prompt` (
     `updated_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     `comment` VARCHAR(255),
     PRIMARY KEY (`id`),
-    UNIQUE KEY `uk_name` (`name`)
+    UNIQUE KEY `uq_prompt_tenant_name_version` (`tenant`, `name`, `version`),
+    INDEX `idx_prompt_listing` (`tenant`, `is_enabled`, `updated_at`, `id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='Prompt definitions';
 
+CREATE TABLE IF NOT EXISTS `t_prompt_version_counter` (
+    `tenant` VARCHAR(64) NOT NULL COMMENT 'Tenant namespace',
+    `name` VARCHAR(128) NOT NULL COMMENT 'Prompt name',
+    `last_version` INT NOT NULL DEFAULT 0 COMMENT 'Highest N of versions vN',
+    `updated_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (`tenant`, `name`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='Per-prompt version allocation';
+
 CREATE TABLE IF NOT EXISTS `t_conversation` (
     `id` BIGINT NOT NULL AUTO_INCREMENT,
+    `tenant` VARCHAR(64) NOT NULL DEFAULT 'default' COMMENT 'Tenant namespace',
     `prompt_id` BIGINT NOT NULL COMMENT 'Reference to prompt id',
     `version` VARCHAR(32) NOT NULL COMMENT 'Prompt version used',
     `user_input` TEXT NOT NULL COMMENT 'User input/question',
     `ai_response` TEXT NOT NULL COMMENT 'AI generated response',
     `template_variables` JSON COMMENT 'Variables used to render the prompt template',
-    `rendered_prompt` TEXT COMMENT 'Rendered prompt sent to AI',
+    `rendered_prompt_hash` VARCHAR(64) COMMENT 'SHA-256 of the rendered prompt in t_rendered_prompt',
+    `rendered_prompt` TEXT COMMENT 'Rendered prompt sent to AI (legacy rows)',
     `model_name` VARCHAR(64) COMMENT 'AI model used (e.g., gpt-4, claude-3)',
     `temperature` FLOAT COMMENT 'Temperature parameter used',
     `tokens_used` INT COMMENT 'Total tokens consumed',
@@ -31,8 +43,36 @@ CREATE TABLE IF NOT EXISTS `t_conversation` (
     `session_id` VARCHAR(128) COMMENT 'Session identifier for grouping related conversations',
     `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
     `updated_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    PRIMARY KEY (`id`),
+    -- created_at is part of the key so the table can be partitioned by it
+    PRIMARY KEY (`id`, `created_at`),
     INDEX `idx_prompt_id` (`prompt_id`),
     INDEX `idx_created_at` (`created_at`),
-    INDEX `idx_prompt_version` (`prompt_id`, `version`)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='Conversation history records';
+    INDEX `idx_prompt_version` (`prompt_id`, `version`),
+    INDEX `idx_session_id` (`session_id`, `id`),
+    INDEX `idx_tenant_created_at` (`tenant`, `created_at`),
+    INDEX `idx_rendered_prompt_hash` (`rendered_prompt_hash`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='Conversation history records'
+-- Monthly partitions are added ahead of time by scripts/conversation_retention.py
+PARTITION BY RANGE (TO_DAYS(`created_at`)) (
+    PARTITION `pmax` VALUES LESS THAN MAXVALUE
+);
+
+CREATE TABLE IF NOT EXISTS `t_rendered_prompt` (
+    `hash` VARCHAR(64) NOT NULL COMMENT 'SHA-256 of the rendered prompt',
+    `encoding` VARCHAR(8) NOT NULL COMMENT 'plain (UTF-8) or zstd',
+    `body` LONGBLOB NOT NULL COMMENT 'Rendered prompt, UTF-8, possibly compressed',
+    `size` INT NOT NULL COMMENT 'Uncompressed size in bytes',
+    `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (`hash`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='Distinct rendered prompts referenced by t_conversation';
+
+CREATE TABLE IF NOT EXISTS `t_prompt_change` (
+    `seq` BIGINT NOT NULL AUTO_INCREMENT,
+    `tenant` VARCHAR(64) NOT NULL DEFAULT 'default' COMMENT 'Tenant namespace',
+    `name` VARCHAR(128) NOT NULL COMMENT 'Prompt name',
+    `version` VARCHAR(32) NOT NULL COMMENT 'Prompt version',
+    `op` VARCHAR(16) NOT NULL COMMENT 'create / update / delete / restore',
+    `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (`seq`),
+    INDEX `idx_change_created_at` (`created_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='Prompt mutation change feed';
@@ -1,19 +1,47 @@
 import streamlit as st
 import json
-import pandas as pd
 from app.services.meta_generator import generate_variables_meta
-from app.ui.common import init_page, get_prompt_service
+from app.ui.common import init_page, render_sql_profile, get_prompt_service, get_tenant, render_similar_prompts
+from config.settings import settings
 
 init_page("Prompt Manager")
 
 def list_prompts_view(service):
     st.subheader("Prompt List")
-    prompts = service.list_prompts()
+    search = st.text_input("Search", key="prompt_list_search", placeholder="Name or display name").strip() or None
+
+    # Cursors of the pages visited so far: the last one is the current page,
+    # popping it goes back. A new search starts again from the first page.
+    if st.session_state.get("prompt_list_query") != search or "prompt_list_cursors" not in st.session_state:
+        st.session_state.prompt_list_query = search
+        st.session_state.prompt_list_cursors = [None]
+    cursors = st.session_state.prompt_list_cursors
+
+    page = service.list_prompt_page(search, after=cursors[-1])
+    if not page.items and len(cursors) > 1:
+        # Everything on this page was deleted: show the previous one
+        cursors.pop()
+        st.rerun()
+    prompts = page.items
 
     if not prompts:
         st.info("No prompts found.")
         return
 
+    total = service.count_prompts(search)
+    first = (len(cursors) - 1) * settings.PROMPT_PAGE_SIZE + 1
+    nav_cols = st.columns([6, 1, 1])
+    with nav_cols[0]:
+        st.caption(f"Page {len(cursors)} · {first}–{first + len(prompts) - 1} of {total} versions")
+    with nav_cols[1]:
+        if st.button("← Prev", disabled=len(cursors) == 1, use_container_width=True):
+            cursors.pop()
+            st.rerun()
+    with nav_cols[2]:
+        if st.button("Next →", disabled=page.next_cursor is None, use_container_width=True):
+            cursors.append(page.next_cursor)
+            st.rerun()
+
     # Create table header
     header_cols = st.columns([2, 2, 3, 1, 2, 1, 1, 1])
     with header_cols[0]:
@@ -69,6 +97,27 @@ def list_prompts_view(service):
                 except Exception as e:
                     st.error(f"Error deleting prompt: {e}")
 
+def bulk_actions_view(service):
+    with st.expander("Bulk Delete / Restore"):
+        to_delete = st.multiselect("Prompts to delete (all versions)", service.list_prompt_names(), key="bulk_delete_names")
+        if st.button("Delete Selected", disabled=not to_delete):
+            try:
+                count = service.delete_prompts(names=to_delete)
+                st.success(f"Deleted {count} versions of {len(to_delete)} prompts")
+                st.rerun()
+            except Exception as e:
+                st.error(f"Error deleting prompts: {e}")
+
+        to_restore = st.multiselect("Deleted prompts to restore", service.list_prompt_names(enabled=False),
+                                    key="bulk_restore_names")
+        if st.button("Restore Selected", disabled=not to_restore):
+            try:
+                count = service.restore_prompts(names=to_restore)
+                st.success(f"Restored {count} versions of {len(to_restore)} prompts")
+                st.rerun()
+            except Exception as e:
+                st.error(f"Error restoring prompts: {e}")
+
 def create_prompt_view(service):
     st.subheader("Create New Prompt")
     
@@ -86,7 +135,7 @@ def create_prompt_view(service):
         
         if st.form_submit_button("Generate Variables Meta"):
             try:
-                meta_json_str = generate_variables_meta(st.session_state.create_prompt_template)
+                meta_json_str = generate_variables_meta(st.session_state.create_prompt_template, get_tenant())
                 st.session_state.create_prompt_meta = meta_json_str
                 st.rerun()
             except Exception as e:
@@ -112,6 +161,9 @@ def create_prompt_view(service):
                 except Exception as e:
                     st.error(f"Error: {str(e)}")
 
+    # Warn about existing near-identical templates before creating another copy
+    render_similar_prompts(st.session_state.get("create_prompt_template", ""))
+
 def prompt_details_view(service, prompt_name, prompt_version, view_mode=False):
     st.subheader(f"Prompt: {prompt_name} ({prompt_version})")
     if st.button("← Back to List"):
@@ -172,7 +224,7 @@ def prompt_details_view(service, prompt_name, prompt_version, view_mode=False):
             # Button to generate meta from template
             if st.form_submit_button("Generate Variables Meta"):
                 try:
-                    meta_json_str = generate_variables_meta(st.session_state.edit_template)
+                    meta_json_str = generate_variables_meta(st.session_state.edit_template, get_tenant())
                     st.session_state.edit_meta = meta_json_str
                     st.rerun()
                 except Exception as e:
@@ -197,6 +249,9 @@ def prompt_details_view(service, prompt_name, prompt_version, view_mode=False):
                 except Exception as e:
                     st.error(f"Error: {e}")
 
+        # Other prompts with a near-identical template (versions of this prompt are expected to be similar)
+        render_similar_prompts(st.session_state.edit_template, exclude_name=prompt_name)
+
 # Main Logic
 service = get_prompt_service()
 try:
@@ -211,8 +266,10 @@ try:
     else:
         tab1, tab2 = st.tabs(["List Prompts", "Create Prompt"])
         with tab1:
+            bulk_actions_view(service)
             list_prompts_view(service)
         with tab2:
             create_prompt_view(service)
 finally:
     service.db.close()
+    render_sql_profile()
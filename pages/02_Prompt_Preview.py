@@ -1,6 +1,8 @@
-import json
 import streamlit as st
-from app.ui.common import init_page, get_prompt_service, get_render_service
+from app.ui.common import init_page, render_sql_profile, get_prompt_service, get_render_service
+from app.ui.forms import form_for_prompt, render_form
+from app.services.template_engine import analyze_template
+from config.settings import settings
 
 init_page("Prompt Preview")
 
@@ -23,8 +25,8 @@ try:
         else:
             selected_version = st.selectbox("Select Version", version_options)
 
-            # 3. Get Prompt Details
-            prompt = prompt_service.get_prompt_details(selected_name, selected_version)
+            # 3. Reuse the row already loaded with the version list
+            prompt = next((v for v in versions if v.version == selected_version), None)
             if not prompt:
                 st.error("Prompt not found.")
             else:
@@ -35,71 +37,25 @@ try:
                 with col_vars:
                     st.subheader("Variables")
                     st.caption(f"Version: {prompt.version}")
-                    variables_meta = prompt.variables_meta or {}
-                    input_values = {}
+                    fields = form_for_prompt(prompt)
 
                     with st.form("preview_form"):
-                        if not variables_meta:
+                        if not fields:
                             st.info("No variables defined.")
 
-                        # Compatibility: Convert list to schema if needed
-                        if isinstance(variables_meta, list):
-                            props = {}
-                            for item in variables_meta:
-                                props[item["name"]] = {
-                                    "type": item.get("type", "string"),
-                                    "description": item.get("description", ""),
-                                    "default": item.get("default", ""),
-                                    "choices": item.get("choices", [])
-                                }
-                            variables_meta = {"type": "object", "properties": props}
-
-                        properties = variables_meta.get("properties", {})
-                        required_list = variables_meta.get("required", [])
-
-                        for name, schema in properties.items():
-                            m_type = schema.get("type", "string")
-                            default = schema.get("default", "")
-                            desc = schema.get("description", "")
-                            choices = schema.get("enum", schema.get("choices", [])) # Handle 'enum' in JSON Schema
-                            is_required = name in required_list
-
-                            label = f"{name} {'*' if is_required else ''}"
-
-                            if m_type == "string":
-                                if choices:
-                                    input_values[name] = st.selectbox(label, options=choices, help=desc)
-                                else:
-                                    # Check if it looks like a long text from description or name
-                                    if "text" in name.lower() or "content" in name.lower() or len(str(default)) > 50:
-                                         input_values[name] = st.text_area(label, value=str(default) if default else "", help=desc)
-                                    else:
-                                         input_values[name] = st.text_input(label, value=str(default) if default else "", help=desc)
-                            elif m_type == "number" or m_type == "integer":
-                                val = float(default) if default else 0.0
-                                input_values[name] = st.number_input(label, value=val, help=desc)
-                            elif m_type == "boolean":
-                                val = bool(default) if default else False
-                                input_values[name] = st.checkbox(label, value=val, help=desc)
-                            elif m_type in ["array", "object"]:
-                                # For complex types, use a text area that expects JSON
-                                default_val = json.dumps(default, indent=2) if default else ("[]" if m_type == "array" else "{}")
-                                json_str = st.text_area(f"{label} (JSON)", value=default_val, help=f"{desc} (Enter valid JSON)")
-                                try:
-                                    input_values[name] = json.loads(json_str)
-                                except:
-                                    st.error(f"Invalid JSON for {name}")
-                                    input_values[name] = default_val # Fallback, rendering might fail but user sees error
-                            else:
-                                input_values[name] = st.text_input(label, value=str(default) if default else "", help=desc)
+                        input_values = render_form(fields)
 
+                        static_first = st.checkbox(
+                            "Static content first", value=settings.STATIC_FIRST_RENDER,
+                            help="Move lines without variables or tags ahead of the rest, so every request starts with the same cacheable prefix"
+                        )
                         submitted = st.form_submit_button("Render Preview")
 
                 with col_preview:
                     st.subheader("Preview")
-                    if submitted or not variables_meta:
+                    if submitted or not fields:
                         try:
-                            rendered = render_service.render_by_version(selected_name, selected_version, input_values)
+                            rendered = render_service.render_prompt(prompt, input_values, static_first=static_first)
 
                             tab1, tab2 = st.tabs(["Rendered Markdown", "Source Template"])
 
@@ -112,6 +68,14 @@ try:
                             with tab2:
                                 st.code(prompt.template, language="jinja2")
 
+                            # How much of the prompt is identical across requests (provider prompt caching)
+                            layout = analyze_template(prompt.template)
+                            st.caption(
+                                f"Static prefix: {layout.prefix_chars:,} chars · "
+                                f"static-first prefix: {layout.static_chars if layout.reorderable else layout.prefix_chars:,} chars "
+                                f"of {len(prompt.template):,} template chars"
+                            )
+
                         except Exception as e:
                             st.error(f"Rendering Error: {e}")
                     else:
@@ -120,3 +84,4 @@ try:
 finally:
     prompt_service.db.close()
     render_service.db.close()
+    render_sql_profile()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+t_conversation retention job; run it daily (cron / Kubernetes CronJob).
+
+- Adds monthly partitions for the next --months-ahead months (MySQL)
+- Archives every month older than --keep-months to
+  <archive-dir>/t_conversation-YYYY-MM.jsonl.gz
+- Drops the archived months: DROP PARTITION on MySQL, batched DELETEs elsewhere
+
+    python scripts/conversation_retention.py --dry-run
+    python scripts/conversation_retention.py --keep-months 6 --archive-dir /data/archive
+"""
+import argparse
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import engine
+from app.services.conversation_archive import ConversationPartitions, apply_retention
+from config.settings import settings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keep-months", type=int, default=settings.CONVERSATION_RETENTION_MONTHS,
+                        help="Months kept in the table, counting the current one")
+    parser.add_argument("--archive-dir", default=settings.CONVERSATION_ARCHIVE_DIR,
+                        help="Directory for the gzip JSONL archives")
+    parser.add_argument("--no-archive", action="store_true", help="Drop expired months without archiving them")
+    parser.add_argument("--months-ahead", type=int, default=3, help="Future months to create partitions for")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Rows per archive read / delete")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be archived and removed")
+    args = parser.parse_args()
+
+    if not args.dry_run:
+        added = ConversationPartitions(engine).ensure(args.months_ahead)
+        if added:
+            print(f"✓ Added partitions: {', '.join(added)}")
+
+    results = apply_retention(engine, args.keep_months, None if args.no_archive else args.archive_dir,
+                              dry_run=args.dry_run, batch_size=args.batch_size, log=print)
+    if not results:
+        print(f"✓ Nothing older than {args.keep_months} month(s)")
+    elif args.dry_run:
+        for result in results:
+            print(f"{result.month:%Y-%m}: {result.rows} rows would be "
+                  f"{'removed' if args.no_archive else 'archived and removed'}")
+    else:
+        print(f"✓ Removed {len(results)} month(s), {sum(r.rows for r in results)} rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Export all enabled prompts of one tenant to a compact snapshot file for PromptClient.
+
+Ship the file with an application so it can start (and keep serving)
+even when the database or API is unreachable.
+
+    python scripts/export_prompt_snapshot.py prompts.snapshot.gz [tenant]
+"""
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.client.prompt_client import PromptClient, DatabaseSource
+
+def export(path: str, tenant: str | None = None):
+    client = PromptClient(DatabaseSource(tenant=tenant))
+    count = client.refresh()
+    client.save_snapshot(path)
+    print(f"✓ Exported {count} prompt versions to {path}")
+
+if __name__ == "__main__":
+    export(sys.argv[1] if len(sys.argv) > 1 else "prompts.snapshot.gz", sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Offline near-duplicate scan of t_prompt.template (MinHash + LSH).
+
+Prints clusters of near-identical prompt versions and optionally saves the
+index, which the Prompt Manager then loads (SIMILARITY_INDEX_PATH) for its
+"similar prompts" lookup instead of indexing on first use.
+
+    python scripts/index_similar_prompts.py
+    python scripts/index_similar_prompts.py --threshold 0.7 --output prompt_similarity.npz
+    python scripts/index_similar_prompts.py --json > clusters.json
+"""
+import argparse
+import json
+import sys
+import os
+import time
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import SessionLocal
+from app.services.dedup import build_prompt_index
+from config.settings import settings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threshold", type=float, default=settings.SIMILARITY_THRESHOLD,
+                        help="Minimum estimated Jaccard similarity of template shingles")
+    parser.add_argument("--output", default=settings.SIMILARITY_INDEX_PATH,
+                        help="Save the index to this .npz file ({tenant} is replaced by the tenant)")
+    parser.add_argument("--tenant", default=settings.DEFAULT_TENANT, help="Tenant whose prompts are indexed")
+    parser.add_argument("--include-disabled", action="store_true", help="Also index deleted prompt versions")
+    parser.add_argument("--json", action="store_true", help="Print clusters as JSON")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        index = build_prompt_index(db, threshold=args.threshold, include_disabled=args.include_disabled,
+                                   tenant=args.tenant)
+        clusters = index.clusters()
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+
+    if args.output:
+        args.output = args.output.format(tenant=args.tenant)
+        index.save(args.output)
+
+    if args.json:
+        print(json.dumps([[{"name": name, "version": version} for name, version in cluster] for cluster in clusters],
+                         ensure_ascii=False, indent=2))
+        return
+
+    print(f"Indexed {len(index)} prompt versions in {elapsed:.2f}s; "
+          f"{len(clusters)} near-duplicate cluster(s) at similarity >= {args.threshold}")
+    for number, cluster in enumerate(clusters, 1):
+        names = {name for name, _ in cluster}
+        kind = "across prompts" if len(names) > 1 else "versions of one prompt"
+        print(f"\n#{number} ({len(cluster)} versions, {kind})")
+        for name, version in cluster:
+            print(f"  - {name} {version}")
+    if args.output:
+        print(f"\n✓ Saved index to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,9 @@ from app.db.session import engine
 from app.db.base import Base
 from app.models.prompt import Prompt
 from app.models.conversation import Conversation
+from app.models.prompt_change import PromptChange
+from app.models.prompt_version_counter import PromptVersionCounter
+from app.models.rendered_prompt import RenderedPrompt
 
 def init_db():
     print("Creating database tables...")
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the (session_id, id) index on t_conversation.
+Chat pages resume and page through a session's turns with this index.
+"""
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import engine
+from sqlalchemy import inspect, text
+
+def migrate():
+    """Add idx_session_id to t_conversation."""
+    print("Starting migration: Adding idx_session_id to t_conversation...")
+
+    try:
+        existing = {index["name"] for index in inspect(engine).get_indexes("t_conversation")}
+        if "idx_session_id" in existing:
+            print("✓ idx_session_id already exists, nothing to do")
+            return
+        with engine.connect() as connection:
+            connection.execute(text("CREATE INDEX idx_session_id ON t_conversation (session_id, id)"))
+            connection.commit()
+            print("✓ Successfully created idx_session_id")
+    except Exception as e:
+        print(f"✗ Error during migration: {e}")
+        sys.exit(1)
+
+    print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Migration script to add t_prompt_change table.
+This table is the change feed used by API/Streamlit processes to invalidate their prompt caches.
+"""
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import engine
+from sqlalchemy import text
+
+def migrate():
+    """Add t_prompt_change table to the database."""
+    create_table_sql = """
+    CREATE TABLE IF NOT EXISTS `t_prompt_change` (
+        `seq` BIGINT NOT NULL AUTO_INCREMENT,
+        `name` VARCHAR(128) NOT NULL COMMENT 'Prompt name',
+        `version` VARCHAR(32) NOT NULL COMMENT 'Prompt version',
+        `op` VARCHAR(16) NOT NULL COMMENT 'create / update / delete',
+        `created_at` DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (`seq`),
+        INDEX `idx_change_created_at` (`created_at`)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='Prompt mutation change feed';
+    """
+
+    print("Starting migration: Adding t_prompt_change table...")
+
+    try:
+        with engine.connect() as connection:
+            connection.execute(text(create_table_sql))
+            connection.commit()
+            print("✓ Successfully created t_prompt_change table")
+    except Exception as e:
+        print(f"✗ Error during migration: {e}")
+        sys.exit(1)
+
+    print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
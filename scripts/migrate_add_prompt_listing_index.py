@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the (tenant, is_enabled, updated_at, id) index on t_prompt.
+The Prompt Manager pages through prompt versions with this index (keyset pagination).
+"""
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import engine
+from sqlalchemy import inspect, text
+
+def migrate():
+    """Add idx_prompt_listing to t_prompt."""
+    print("Starting migration: Adding idx_prompt_listing to t_prompt...")
+
+    try:
+        existing = {index["name"] for index in inspect(engine).get_indexes("t_prompt")}
+        if "idx_prompt_listing" in existing:
+            print("✓ idx_prompt_listing already exists, nothing to do")
+            return
+        with engine.connect() as connection:
+            connection.execute(text("CREATE INDEX idx_prompt_listing ON t_prompt (tenant, is_enabled, updated_at, id)"))
+            connection.commit()
+            print("✓ Successfully created idx_prompt_listing")
+    except Exception as e:
+        print(f"✗ Error during migration: {e}")
+        sys.exit(1)
+
+    print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Migration script to add t_prompt_version_counter table.
+PromptService.allocate_version bumps one row per (tenant, name) to hand out v1, v2, ... atomically.
+Counters are seeded lazily from existing versions, so no backfill is needed.
+"""
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import engine
+from app.models.prompt_version_counter import PromptVersionCounter
+
+def migrate():
+    """Add t_prompt_version_counter table to the database."""
+    print("Starting migration: Adding t_prompt_version_counter table...")
+
+    try:
+        PromptVersionCounter.__table__.create(engine, checkfirst=True)
+        print("✓ Successfully created t_prompt_version_counter table")
+    except Exception as e:
+        print(f"✗ Error during migration: {e}")
+        sys.exit(1)
+
+    print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Migration script for the deduplicated rendered-prompt store:
+- Create t_rendered_prompt (one row per distinct rendered prompt, keyed by SHA-256)
+- Add t_conversation.rendered_prompt_hash and idx_rendered_prompt_hash
+- Move inline t_conversation.rendered_prompt texts into the store, batch by batch
+
+Safe to run more than once; an interrupted backfill resumes where it stopped.
+"""
+import argparse
+import os
+import sys
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import engine
+from app.models.conversation import Conversation
+from app.models.rendered_prompt import RenderedPrompt, store_texts
+from app.models.schemas import content_hash
+from sqlalchemy import bindparam, inspect, select, text, update
+from sqlalchemy.orm import Session
+
+def _create_store(conn):
+    if inspect(conn).has_table(RenderedPrompt.__tablename__):
+        print("✓ t_rendered_prompt already exists")
+        return
+    RenderedPrompt.__table__.create(conn)
+    print("✓ Created t_rendered_prompt")
+
+def _add_hash_column(conn):
+    inspector = inspect(conn)
+    if "rendered_prompt_hash" in {column["name"] for column in inspector.get_columns("t_conversation")}:
+        print("✓ t_conversation.rendered_prompt_hash already exists")
+    else:
+        conn.execute(text("ALTER TABLE t_conversation ADD COLUMN rendered_prompt_hash VARCHAR(64)"))
+        print("✓ Added t_conversation.rendered_prompt_hash")
+    if "idx_rendered_prompt_hash" in {index["name"] for index in inspector.get_indexes("t_conversation")}:
+        print("✓ idx_rendered_prompt_hash already exists")
+    else:
+        conn.execute(text("CREATE INDEX idx_rendered_prompt_hash ON t_conversation (rendered_prompt_hash)"))
+        print("✓ Created idx_rendered_prompt_hash")
+
+def _backfill(batch_size: int) -> tuple[int, int]:
+    """Returns (conversations moved, distinct prompts stored)"""
+    table = Conversation.__table__
+    moved = stored = 0
+    set_hash = (
+        update(table)
+        .where(table.c.id == bindparam("row_id"))
+        .values(rendered_prompt_hash=bindparam("row_hash"), rendered_prompt=None)
+    )
+    with Session(bind=engine) as db:
+        while True:
+            rows = db.execute(
+                select(table.c.id, table.c.rendered_prompt)
+                .where(table.c.rendered_prompt_hash.is_(None), table.c.rendered_prompt.is_not(None))
+                .order_by(table.c.id).limit(batch_size)
+            ).all()
+            if not rows:
+                return moved, stored
+            texts = {content_hash(row.rendered_prompt): row.rendered_prompt for row in rows}
+            stored += store_texts(db, texts)
+            db.execute(set_hash, [{"row_id": row.id, "row_hash": content_hash(row.rendered_prompt)} for row in rows])
+            db.commit()
+            moved += len(rows)
+            print(f"  moved {moved} rendered prompts...")
+
+def migrate(batch_size: int = 1000):
+    print("Starting migration: Adding the rendered-prompt store...")
+
+    try:
+        with engine.begin() as conn:
+            _create_store(conn)
+            _add_hash_column(conn)
+        moved, stored = _backfill(batch_size)
+        print(f"✓ Moved {moved} inline rendered prompts into {stored} stored rows")
+    except Exception as e:
+        print(f"✗ Error during migration: {e}")
+        sys.exit(1)
+
+    print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000, help="Conversations moved per transaction")
+    args = parser.parse_args()
+    migrate(args.batch_size)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Migration script for multi-tenant namespaces:
+- Add a 'tenant' column (default 'default') to t_prompt, t_conversation and t_prompt_change
+- Replace the (name, version) unique constraint on t_prompt with (tenant, name, version)
+- Add idx_tenant_created_at on t_conversation
+
+Existing rows become the 'default' tenant (DEFAULT_TENANT). Safe to run more than once.
+"""
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import engine
+from sqlalchemy import inspect, text
+
+TABLES = ("t_prompt", "t_conversation", "t_prompt_change")
+
+# t_prompt as of this migration, for the SQLite rebuild. Pinned rather than
+# taken from the model so columns and indexes added later are left to their
+# own migrations.
+SQLITE_PROMPT_DDL = """
+CREATE TABLE t_prompt (
+    id INTEGER NOT NULL,
+    tenant VARCHAR(64) DEFAULT 'default' NOT NULL,
+    name VARCHAR(128) NOT NULL,
+    display_name VARCHAR(128) NOT NULL,
+    description VARCHAR(255),
+    version VARCHAR(32) NOT NULL,
+    template TEXT NOT NULL,
+    variables_meta JSON,
+    created_by VARCHAR(64),
+    comment VARCHAR(255),
+    is_enabled BOOLEAN NOT NULL,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL,
+    PRIMARY KEY (id),
+    CONSTRAINT uq_prompt_tenant_name_version UNIQUE (tenant, name, version)
+)
+"""
+PROMPT_COLUMNS = (
+    "id", "tenant", "name", "display_name", "description", "version", "template",
+    "variables_meta", "created_by", "comment", "is_enabled", "created_at", "updated_at",
+)
+
+def _add_tenant_columns(conn):
+    inspector = inspect(conn)
+    for table in TABLES:
+        if "tenant" in {column["name"] for column in inspector.get_columns(table)}:
+            print(f"✓ {table}.tenant already exists")
+            continue
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN tenant VARCHAR(64) NOT NULL DEFAULT 'default'"))
+        print(f"✓ Added {table}.tenant")
+
+def _replace_unique_constraint(conn, dialect: str):
+    constraints = inspect(conn).get_unique_constraints("t_prompt")
+    if any(c["column_names"] == ["tenant", "name", "version"] for c in constraints):
+        print("✓ uq_prompt_tenant_name_version already exists")
+        return
+
+    if dialect == "sqlite":
+        # SQLite can't drop a constraint: rebuild t_prompt with the new one
+        columns = ", ".join(PROMPT_COLUMNS)
+        conn.execute(text("ALTER TABLE t_prompt RENAME TO t_prompt_old"))
+        conn.execute(text(SQLITE_PROMPT_DDL))
+        conn.execute(text(f"INSERT INTO t_prompt ({columns}) SELECT {columns} FROM t_prompt_old"))
+        conn.execute(text("DROP TABLE t_prompt_old"))
+    elif dialect == "mysql":
+        conn.execute(text(
+            "ALTER TABLE t_prompt DROP INDEX uq_prompt_name_version, "
+            "ADD CONSTRAINT uq_prompt_tenant_name_version UNIQUE (tenant, name, version)"
+        ))
+    elif dialect == "postgresql":
+        conn.execute(text("ALTER TABLE t_prompt DROP CONSTRAINT IF EXISTS uq_prompt_name_version"))
+        conn.execute(text(
+            "ALTER TABLE t_prompt ADD CONSTRAINT uq_prompt_tenant_name_version UNIQUE (tenant, name, version)"
+        ))
+    else:
+        print(f"Warning: Unknown database type: {dialect}")
+        print("Please replace uq_prompt_name_version with UNIQUE (tenant, name, version) manually")
+        return
+    print("✓ Replaced uq_prompt_name_version with uq_prompt_tenant_name_version")
+
+def _add_conversation_index(conn):
+    existing = {index["name"] for index in inspect(conn).get_indexes("t_conversation")}
+    if "idx_tenant_created_at" in existing:
+        print("✓ idx_tenant_created_at already exists")
+        return
+    conn.execute(text("CREATE INDEX idx_tenant_created_at ON t_conversation (tenant, created_at)"))
+    print("✓ Created idx_tenant_created_at")
+
+def migrate():
+    print("Starting migration: Adding tenant namespaces...")
+
+    try:
+        with engine.begin() as conn:
+            _add_tenant_columns(conn)
+            _replace_unique_constraint(conn, engine.dialect.name)
+            _add_conversation_index(conn)
+    except Exception as e:
+        print(f"✗ Error during migration: {e}")
+        sys.exit(1)
+
+    print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Migration script to rewrite t_prompt.variables_meta in canonical form.
+
+Legacy list-format metadata and schemas without the version marker are
+converted to JSON Schema with "x-schema-version" (see
+normalize_variables_meta). Rows are processed in primary-key chunks, one
+transaction per chunk, so the table is never locked as a whole and the
+script can be interrupted and re-run; canonical rows are skipped.
+
+    python scripts/migrate_normalize_variables_meta.py --dry-run
+    python scripts/migrate_normalize_variables_meta.py --batch-size 500
+"""
+import argparse
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import engine
+from app.models.prompt import Prompt
+from app.models.schemas import is_canonical_variables_meta, normalize_variables_meta
+from sqlalchemy import bindparam, select, update
+
+def migrate(batch_size: int = 1000, dry_run: bool = False):
+    """Normalize variables_meta for every row, batch_size rows at a time."""
+    print("Starting migration: Normalizing t_prompt.variables_meta...")
+
+    # Core statements on the table bypass the ORM load-time normalizer,
+    # so we see what is actually stored
+    table = Prompt.__table__
+    last_id = 0
+    scanned = converted = 0
+    try:
+        while True:
+            with engine.begin() as connection:
+                rows = connection.execute(
+                    select(table.c.id, table.c.variables_meta)
+                    .where(table.c.id > last_id)
+                    .order_by(table.c.id)
+                    .limit(batch_size)
+                ).all()
+                if not rows:
+                    break
+                changed = [{"row_id": row.id, "meta": normalize_variables_meta(row.variables_meta)}
+                           for row in rows if not is_canonical_variables_meta(row.variables_meta)]
+                if changed and not dry_run:
+                    # updated_at is left as is: the content a reader sees does not change
+                    connection.execute(
+                        update(table).where(table.c.id == bindparam("row_id")).values(variables_meta=bindparam("meta")),
+                        changed,
+                    )
+            scanned += len(rows)
+            converted += len(changed)
+            last_id = rows[-1].id
+            print(f"  ... {scanned} rows scanned, {converted} {'to convert' if dry_run else 'converted'}")
+    except Exception as e:
+        print(f"✗ Error during migration: {e}")
+        sys.exit(1)
+
+    print(f"Migration completed successfully! {converted} of {scanned} rows {'need normalizing' if dry_run else 'normalized'}.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per chunk / transaction")
+    parser.add_argument("--dry-run", action="store_true", help="Only count rows that need converting")
+    args = parser.parse_args()
+    migrate(args.batch_size, args.dry_run)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Migration script to partition t_conversation by month of created_at (MySQL).
+
+MySQL requires the partitioning column in every unique key, so the primary
+key becomes (id, created_at) first; ids stay unique through AUTO_INCREMENT.
+Partitions are created from the oldest row's month to --months-ahead
+months from now, plus a catch-all pmax. Both ALTERs rebuild the table:
+run this during a maintenance window on large tables.
+
+Afterwards schedule scripts/conversation_retention.py (daily) to add
+upcoming partitions and archive/drop expired ones.
+"""
+import argparse
+import sys
+import os
+from datetime import datetime
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import engine
+from app.services.conversation_archive import (
+    ConversationPartitions, add_months, month_floor, partitioning_ddl,
+)
+from sqlalchemy import text
+
+def migrate(months_ahead: int = 3):
+    """Partition t_conversation by month."""
+    print("Starting migration: Partitioning t_conversation by month...")
+
+    partitions = ConversationPartitions(engine)
+    if not partitions.supported:
+        print(f"✓ {engine.dialect.name} has no table partitioning; retention deletes expired rows instead")
+        return
+    if partitions.months():
+        added = partitions.ensure(months_ahead)
+        print(f"✓ t_conversation is already partitioned; added {len(added)} upcoming partition(s)")
+        return
+
+    try:
+        with engine.begin() as connection:
+            oldest = connection.execute(text("SELECT MIN(created_at) FROM t_conversation")).scalar()
+            now = datetime.utcnow()
+            first = month_floor(oldest or now)
+            last = add_months(month_floor(now), months_ahead)
+
+            primary_key = connection.execute(text(
+                "SELECT COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 't_conversation' AND CONSTRAINT_NAME = 'PRIMARY'"
+            )).scalars().all()
+            if "created_at" not in primary_key:
+                connection.execute(text(
+                    "ALTER TABLE t_conversation DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)"
+                ))
+                print("✓ Primary key is now (id, created_at)")
+
+            connection.execute(text(partitioning_ddl(first, last)))
+            print(f"✓ Created monthly partitions {first:%Y-%m} .. {last:%Y-%m} and pmax")
+    except Exception as e:
+        print(f"✗ Error during migration: {e}")
+        sys.exit(1)
+
+    print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months-ahead", type=int, default=3, help="Future months to create partitions for")
+    args = parser.parse_args()
+    migrate(args.months_ahead)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Precompile all enabled prompt templates into a versioned on-disk artifact.
+
+Run it after init_db/migrations and on every deploy; workers started with
+PRECOMPILED_TEMPLATES_DIR pointing at the same directory load templates from
+the artifact instead of compiling them on first use. Templates created
+after the build are compiled at runtime as usual.
+
+    python scripts/precompile_templates.py precompiled/
+"""
+import argparse
+import sys
+import os
+import time
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import SessionLocal
+from app.models.prompt import Prompt
+from app.models.schemas import content_hash
+from app.services.template_loaders import build_artifact
+from config.settings import settings
+
+def precompile(directory: str, keep: int = 2, verbose: bool = False):
+    db = SessionLocal()
+    try:
+        # One module per distinct template source
+        sources = {}
+        for (template,) in db.query(Prompt.template).filter(Prompt.is_enabled == True).yield_per(1000):
+            sources.setdefault(content_hash(template), template)
+    finally:
+        db.close()
+
+    started = time.perf_counter()
+    manifest = build_artifact(directory, sources, keep=keep, log_function=print if verbose else None)
+    elapsed = time.perf_counter() - started
+
+    skipped = len(sources) - len(manifest["templates"])
+    print(f"✓ Compiled {len(manifest['templates'])} templates into {os.path.join(directory, manifest['artifact'])} "
+          f"in {elapsed:.2f}s")
+    if skipped:
+        print(f"  {skipped} template(s) with syntax errors were skipped (run with -v for details)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", default=settings.PRECOMPILED_TEMPLATES_DIR or "precompiled",
+                        help="Artifact directory (PRECOMPILED_TEMPLATES_DIR)")
+    parser.add_argument("--keep", type=int, default=2, help="Artifacts to keep, including the new one")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every compiled template")
+    args = parser.parse_args()
+    precompile(args.directory, args.keep, args.verbose)
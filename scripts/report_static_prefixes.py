@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Report how much of each prompt version's rendered system prompt is a
+byte-stable prefix that provider prompt caches can reuse.
+
+    python scripts/report_static_prefixes.py
+    python scripts/report_static_prefixes.py --name chat_summary --json
+
+"prefix" is the static text every normal render starts with; "static-first"
+is the prefix when rendering with STATIC_FIRST_RENDER (static lines first).
+"""
+import argparse
+import json
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db.session import SessionLocal
+from app.models.prompt import Prompt
+from app.services.template_engine import analyze_template
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--name", help="Only this prompt name")
+    parser.add_argument("--json", action="store_true", help="Print rows as JSON")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        query = db.query(Prompt.name, Prompt.version, Prompt.template).filter(Prompt.is_enabled == True)
+        if args.name:
+            query = query.filter(Prompt.name == args.name)
+        rows = []
+        for name, version, template in query.order_by(Prompt.name, Prompt.id).yield_per(1000):
+            layout = analyze_template(template)
+            rows.append({
+                "name": name,
+                "version": version,
+                "template_chars": len(template),
+                "prefix_chars": layout.prefix_chars,
+                "static_first_chars": layout.static_chars if layout.reorderable else layout.prefix_chars,
+                "reorderable": layout.reorderable,
+            })
+    finally:
+        db.close()
+
+    if args.json:
+        print(json.dumps(rows, ensure_ascii=False, indent=2))
+        return
+
+    print(f"{'name':<32} {'version':<10} {'template':>9} {'prefix':>9} {'static-first':>13}")
+    for row in rows:
+        share = row["prefix_chars"] / row["template_chars"] if row["template_chars"] else 0.0
+        print(f"{row['name'][:32]:<32} {row['version'][:10]:<10} {row['template_chars']:>9,} "
+              f"{row['prefix_chars']:>9,} {row['static_first_chars']:>13,}  ({share:.0%} cached as written)")
+
+if __name__ == "__main__":
+    main()
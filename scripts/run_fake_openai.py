@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Run the local fake OpenAI-compatible server.
+
+Point the app at it to exercise the Playground, Comparison page or batch
+tooling without API keys or spend:
+
+    python scripts/run_fake_openai.py --port 8787 --ttft 0.3 --tokens-per-second 40
+    OPENAI_API_BASE=http://127.0.0.1:8787/v1 OPENAI_API_KEY=sk-fake streamlit run main.py
+
+Scripted replies come from a JSON file: a list (cycled in order) or an
+object mapping a substring of the user message to the reply.
+"""
+import argparse
+import json
+import sys
+import os
+
+# Add the project root to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.llm.fake_openai import create_fake_server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--ttft", type=float, default=0.0, help="Seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between tokens")
+    parser.add_argument("--tokens-per-second", type=float, default=None, help="Overrides --token-delay")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- fraction applied to delays")
+    parser.add_argument("--mode", choices=["echo", "script", "match", "fixed"], default=None,
+                        help="Reply mode (default: echo, or script/match when --script is given)")
+    parser.add_argument("--script", default=None, help="JSON file with scripted replies")
+    parser.add_argument("--fixed-tokens", type=int, default=100, help="Reply length for --mode fixed")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of HTTP 500")
+    parser.add_argument("--stream-error-rate", type=float, default=0.0, help="Probability of a mid-stream disconnect")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Every Nth request gets 429")
+    parser.add_argument("--rate-limit-rps", type=float, default=0.0, help="Requests/second before 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = {
+        "ttft": args.ttft, "token_delay": args.token_delay, "tokens_per_second": args.tokens_per_second,
+        "jitter": args.jitter, "fixed_tokens": args.fixed_tokens, "error_rate": args.error_rate,
+        "stream_error_rate": args.stream_error_rate, "rate_limit_every": args.rate_limit_every,
+        "rate_limit_rps": args.rate_limit_rps, "retry_after": args.retry_after, "seed": args.seed,
+    }
+    mode = args.mode
+    if args.script:
+        with open(args.script) as f:
+            scripted = json.load(f)
+        if isinstance(scripted, list):
+            config["script"] = scripted
+            mode = mode or "script"
+        else:
+            config["responses"] = scripted
+            mode = mode or "match"
+    config["mode"] = mode or "echo"
+
+    server = create_fake_server(args.host, args.port, **config)
+    print(f"✓ Fake OpenAI server listening on {server.base_url}")
+    print(f"  export OPENAI_API_BASE={server.base_url} OPENAI_API_KEY=sk-fake")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopped.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+import pytest
+
+from app.services.evaluation import check_schema, json_validity, validate_json
+
+
+def test_nested_schema_that_is_not_an_object_matches_nothing():
+    assert not validate_json({"a": 1}, {"properties": {"a": 5}})
+    assert json_validity(['{"a": 1}', '{"b": 1}'], {"properties": {"a": 5}}).tolist() == [0.0, 1.0]
+
+
+def test_check_schema_rejects_nested_non_objects():
+    check_schema({"type": "object", "properties": {"a": {"type": "integer"}}, "items": {}})
+    with pytest.raises(ValueError, match=r"schema\.properties\.a"):
+        check_schema({"properties": {"a": 5}})
+    with pytest.raises(ValueError, match=r"schema\.items"):
+        check_schema({"items": []})
+    with pytest.raises(ValueError):
+        check_schema([])
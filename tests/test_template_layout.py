@@ -0,0 +1,19 @@
+from app.services.template_engine import analyze_template
+
+
+def test_inline_set_is_reorderable():
+    layout = analyze_template('Static line\n{% set greeting = "hi" %}\n{{ greeting }} {{ a }}\n')
+    assert layout.reorderable
+    assert layout.static_text == "Static line\n"
+
+
+def test_block_set_keeps_its_body_dynamic():
+    source = "Static line\n{% set body %}\nInside the block\n{% endset %}\n{{ body }} {{ a }}\n"
+    layout = analyze_template(source)
+    assert layout.reorderable
+    assert layout.static_text == "Static line\n"
+    assert "Inside the block" in layout.dynamic_source
+
+
+def test_unclosed_block_set_is_not_reorderable():
+    assert not analyze_template("Static line\n{% set body %}\nnever closed\n").reorderable